@@ -0,0 +1,100 @@
+"""Populate and filter timings for the notes list, model/view vs. QListWidget.
+
+Run from the repository root:
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_notes_list
+"""
+import json
+import random
+import string
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication, QListView, QListWidget
+
+from ui.notes_model import NotesListModel
+
+
+SIZES = (1_000, 10_000, 100_000)
+# What a user types, one keystroke at a time
+QUERY = "report"
+
+
+def make_names(count, seed=0):
+    rng = random.Random(seed)
+    words = ["meeting", "report", "draft", "todo", "ideas", "journal", "budget", "quarterly"]
+    names = set()
+    while len(names) < count:
+        stem = "_".join(rng.choice(words) for _ in range(2))
+        suffix = "".join(rng.choice(string.ascii_lowercase) for _ in range(6))
+        names.add(f"{stem}_{suffix}{rng.choice(['.txt', '.md', '.docx', '.csv'])}")
+    return sorted(names)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_model(app, names):
+    model = NotesListModel()
+    view = QListView()
+    view.setUniformItemSizes(True)
+    view.setModel(model)
+    view.resize(300, 600)
+    view.show()
+
+    populate = timed(lambda: (model.set_names(names), app.processEvents()))
+
+    def type_query():
+        for i in range(1, len(QUERY) + 1):
+            model.show_results(model.name_matches(QUERY[:i]))
+            app.processEvents()
+
+    filter_ms = timed(type_query) / len(QUERY)
+    view.close()
+    return populate, filter_ms
+
+
+def bench_list_widget(app, names):
+    widget = QListWidget()
+    widget.resize(300, 600)
+    widget.show()
+
+    populate = timed(lambda: (widget.addItems(names), app.processEvents()))
+
+    def type_query():
+        for i in range(1, len(QUERY) + 1):
+            term = QUERY[:i]
+            for row in range(widget.count()):
+                item = widget.item(row)
+                item.setHidden(term not in item.text().lower())
+            app.processEvents()
+
+    filter_ms = timed(type_query) / len(QUERY)
+    widget.close()
+    return populate, filter_ms
+
+
+def main():
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    for size in SIZES:
+        names = make_names(size)
+        for label, bench in (("model", bench_model), ("list_widget", bench_list_widget)):
+            populate, filter_ms = bench(app, names)
+            results.append({
+                "impl": label,
+                "entries": size,
+                "populate_ms": round(populate, 2),
+                "filter_per_key_ms": round(filter_ms, 2),
+            })
+            print(f"{label:12} {size:>7} entries  populate {populate:9.2f} ms  "
+                  f"filter/key {filter_ms:9.2f} ms")
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Synthetic note corpora for benchmarks.
+
+Corpora are fully determined by (count, mix, words, seed), so two runs on
+different commits measure the same input.
+"""
+import csv
+import json
+import os
+import random
+
+
+FORMATS = (".txt", ".md", ".csv", ".json", ".docx", ".html")
+DEFAULT_MIX = {".txt": 4, ".md": 3, ".csv": 1, ".json": 1, ".docx": 1, ".html": 1}
+
+TOPICS = {
+    "finance": "quarterly revenue budget forecast expenses profit margin invoice audit payroll".split(),
+    "travel": "flight hotel passport itinerary airport luggage booking visa train museum".split(),
+    "cooking": "recipe oven bake flour sugar butter dough yeast bread garlic".split(),
+    "software": "python function bug compile deploy server database query index release".split(),
+    "health": "doctor appointment vitamins sleep exercise blood pressure diet therapy".split(),
+}
+FILLER = "the and of to in for with on meeting note today review plan idea team next week".split()
+
+
+def parse_mix(text):
+    """'txt=4,md=1' -> {'.txt': 4, '.md': 1}"""
+    mix = {}
+    for part in text.split(","):
+        ext, _, weight = part.partition("=")
+        ext = "." + ext.strip().lstrip(".")
+        if ext not in FORMATS:
+            raise ValueError(f"Unsupported format in mix: {ext}")
+        mix[ext] = int(weight or 1)
+    return mix
+
+
+def _sentence(rng, topic, length):
+    words = [rng.choice(TOPICS[topic]) if rng.random() < 0.3 else rng.choice(FILLER) for _ in range(length)]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraphs(rng, topic, words):
+    paragraphs, remaining = [], words
+    while remaining > 0:
+        length = min(remaining, rng.randint(40, 120))
+        sentences = []
+        while length > 0:
+            size = min(length, rng.randint(6, 18))
+            sentences.append(_sentence(rng, topic, size))
+            length -= size
+        paragraphs.append(" ".join(sentences))
+        remaining -= sum(len(s.split()) for s in sentences)
+    return paragraphs
+
+
+def _write(path, ext, rng, topic, words):
+    paragraphs = _paragraphs(rng, topic, words)
+    if ext == ".txt":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+    elif ext == ".md":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# {topic.title()} notes\n\n")
+            for i, paragraph in enumerate(paragraphs):
+                f.write(f"## Section {i + 1}\n\n{paragraph}\n\n- {rng.choice(TOPICS[topic])}\n\n")
+    elif ext == ".html":
+        with open(path, "w", encoding="utf-8") as f:
+            body = "".join(f"<p>{p}</p>" for p in paragraphs)
+            f.write(f"<html><head><title>{topic}</title></head><body><h1>{topic}</h1>{body}</body></html>")
+    elif ext == ".csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["date", "item", "amount", "comment"])
+            for i in range(max(1, words // 8)):
+                writer.writerow([
+                    f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    rng.choice(TOPICS[topic]), f"{rng.uniform(1, 5000):.2f}", _sentence(rng, topic, 4),
+                ])
+    elif ext == ".json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"topic": topic, "sections": [{"id": i, "text": p} for i, p in enumerate(paragraphs)]}, f)
+    elif ext == ".docx":
+        from docx import Document
+        doc = Document()
+        doc.add_heading(topic.title(), 1)
+        for paragraph in paragraphs:
+            doc.add_paragraph(paragraph)
+        doc.save(path)
+
+
+def generate_corpus(folder, count, mix=None, words=300, seed=0):
+    """Write count notes into folder; returns the list of file names."""
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    extensions = [ext for ext, weight in mix.items() for _ in range(weight)]
+    os.makedirs(folder, exist_ok=True)
+    names = []
+    for i in range(count):
+        ext = rng.choice(extensions)
+        topic = rng.choice(list(TOPICS))
+        name = f"{topic}_{i:06d}{ext}"
+        # Note sizes vary around the requested mean
+        _write(os.path.join(folder, name), ext, rng, topic, max(10, int(rng.expovariate(1 / words))))
+        names.append(name)
+    return names
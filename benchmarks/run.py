@@ -0,0 +1,280 @@
+"""Reproducible, headless benchmark suite for NoteNinja.
+
+Generates a synthetic corpus, drives the real widgets on Qt's offscreen
+platform and writes one JSON file of timings that can be compared with a
+run from another commit:
+
+    python -m benchmarks.run --notes 2000 --out before.json
+    python -m benchmarks.run --notes 2000 --out after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Must be set before the QApplication exists
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtWidgets import QApplication
+
+from benchmarks.corpus import DEFAULT_MIX, generate_corpus, parse_mix
+from core.cache import ContentCache
+from core.index import NoteIndex, load_catalog, update_index
+from core.preview import preview_html
+from core.timing import elapsed_ms, summarize
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TYPED_QUERIES = ("quarterly report", "passport", "bread recipe", "deploy server")
+SAVE_SIZES = (10_000, 1_000_000, 5_000_000)
+# --compare flags a metric that got this much worse, ignoring sub-millisecond jitter
+REGRESSION_THRESHOLD = 0.10
+MIN_DELTA_MS = 0.5
+# Counts and single worst cases are reported but never flagged
+UNFLAGGED_SUFFIXES = (".runs", ".files", ".entries", ".max_ms")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def spin(app, msecs):
+    loop = QEventLoop()
+    QTimer.singleShot(msecs, loop.quit)
+    loop.exec_()
+
+
+def bench_index(folder):
+    catalog = load_catalog(folder)
+    total_bytes = sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+    start = time.perf_counter()
+    update = update_index(folder, catalog)
+    ms = elapsed_ms(start)
+    files = len(update.delta.added)
+    return {
+        "files": files,
+        "ms": ms,
+        "files_per_s": round(files / (ms / 1000), 1) if ms else None,
+        "mb_per_s": round(total_bytes / 1e6 / (ms / 1000), 2) if ms else None,
+    }
+
+
+def bench_queries(folder, count=50, repeat=5):
+    index = NoteIndex(folder)
+    terms = index.sample_terms(count)
+    timings = []
+    start = time.perf_counter()
+    for term in terms:
+        for _ in range(repeat):
+            query_start = time.perf_counter()
+            index.search(term)
+            timings.append(elapsed_ms(query_start))
+    seconds = time.perf_counter() - start
+    index.close()
+    result = summarize(timings)
+    result["queries_per_s"] = round(len(timings) / seconds, 1) if seconds else None
+    return result
+
+
+def bench_list_and_filter(app):
+    from ui.search_tab import NotesSearchTab
+
+    start = time.perf_counter()
+    tab = NotesSearchTab()
+    tab.resize(1000, 700)
+    tab.show()
+    app.processEvents()
+    construct_ms = elapsed_ms(start)
+    tab.index_tasks.wait()
+    spin(app, 50)
+
+    start = time.perf_counter()
+    tab.load_notes()
+    app.processEvents()
+    populate_ms = elapsed_ms(start)
+    # Keystrokes are timed against the fuzzy name index, which builds in the background
+    start = time.perf_counter()
+    tab.notes_model.fuzzy_tasks.wait()
+    app.processEvents()
+    fuzzy_build_ms = elapsed_ms(start)
+
+    keystrokes = []
+    for query in TYPED_QUERIES:
+        for i in range(1, len(query) + 1):
+            start = time.perf_counter()
+            tab.search_bar.setText(query[:i])
+            app.processEvents()
+            keystrokes.append(elapsed_ms(start))
+        tab.search_bar.setText("")
+        app.processEvents()
+    # The tab starts processing the notes in the background; nothing may outlive it
+    tab.stop_processing()
+    tab.close()
+    return {
+        "construct_ms": construct_ms,
+        "populate_ms": populate_ms,
+        "fuzzy_build_ms": fuzzy_build_ms,
+        "entries": len(tab.notes_model.names),
+        "filter_keystroke": summarize(keystrokes),
+    }
+
+
+def bench_open(folder, names, per_format=20, seed=0):
+    rng = random.Random(seed)
+    by_ext = {}
+    for name in names:
+        by_ext.setdefault(os.path.splitext(name)[1], []).append(name)
+
+    results = {}
+    cache = ContentCache()
+    for ext, group in sorted(by_ext.items()):
+        sample = rng.sample(group, min(per_format, len(group)))
+        cold, warm = [], []
+        for name in sample:
+            path = os.path.join(folder, name)
+            start = time.perf_counter()
+            cache.get_or_compute(path, "rendered", preview_html)
+            cold.append(elapsed_ms(start))
+            start = time.perf_counter()
+            cache.get_or_compute(path, "rendered", preview_html)
+            warm.append(elapsed_ms(start))
+        results[ext.lstrip(".")] = {"cold": summarize(cold), "cached": summarize(warm)}
+    return results
+
+
+def bench_save(app, workdir):
+    from ui.editor_tab import TextEditorTab
+
+    editor = TextEditorTab()
+    results = {}
+    for size in SAVE_SIZES:
+        editor.current_filename = os.path.join(workdir, f"save_{size}.txt")
+        editor.text_editor.setPlainText("lorem ipsum dolor sit amet\n" * (size // 27))
+        editor.text_editor.document().setModified(True)
+
+        done = []
+        editor.autosaver.saved.connect(lambda path, written: done.append(time.perf_counter()))
+        start = time.perf_counter()
+        editor.autosaver.save_now()
+        gui_ms = elapsed_ms(start)
+        while not done:
+            spin(app, 1)
+        editor.autosaver.saved.disconnect()
+        results[str(size)] = {
+            "gui_thread_ms": gui_ms,
+            "until_on_disk_ms": round((done[0] - start) * 1000, 3),
+        }
+    editor.close()
+    return results
+
+
+def flatten(metrics, prefix=""):
+    flat = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(previous, current):
+    # Throughput metrics are better when larger; everything else is a duration
+    old, new = flatten(previous["metrics"]), flatten(current["metrics"])
+    lines, regressions = [], 0
+    for name in sorted(set(old) & set(new)):
+        if not old[name]:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        throughput = name.endswith("_per_s")
+        worse = -change if throughput else change
+        significant = throughput or abs(new[name] - old[name]) >= MIN_DELTA_MS
+        flag = ""
+        if worse > REGRESSION_THRESHOLD and significant and not name.endswith(UNFLAGGED_SUFFIXES):
+            flag = "  REGRESSION"
+            regressions += 1
+        lines.append(f"{name:55} {old[name]:>12} -> {new[name]:>12}  {change:+7.1%}{flag}")
+    return "\n".join(lines), regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000, help="number of synthetic notes")
+    parser.add_argument("--mix", default=None, help="format weights, e.g. txt=4,md=2,docx=1")
+    parser.add_argument("--words", type=int, default=300, help="mean words per note")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier result file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the generated corpus")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    workdir = tempfile.mkdtemp(prefix="noteninja-bench-")
+    folder = os.path.join(workdir, "database")
+    cwd = os.getcwd()
+    try:
+        start = time.perf_counter()
+        names = generate_corpus(folder, args.notes, mix, args.words, args.seed)
+        print(f"Generated {len(names)} notes in {elapsed_ms(start):.0f} ms", file=sys.stderr)
+
+        # The tabs use the relative "database" folder, like the app
+        os.chdir(workdir)
+        metrics = {
+            "index_build": bench_index("database"),
+            "query": bench_queries("database"),
+            "list": bench_list_and_filter(app),
+            "open": bench_open("database", names),
+            "save": bench_save(app, workdir),
+        }
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    result = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "notes": args.notes,
+            "mix": mix,
+            "words": args.words,
+            "seed": args.seed,
+        },
+        "metrics": metrics,
+    }
+
+    out = args.out or os.path.join(REPO_ROOT, "benchmarks", "results", f"{commit or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(metrics, indent=2))
+    print(f"Results written to {out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report, regressions = compare(json.load(f), result)
+        print(report)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
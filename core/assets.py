@@ -0,0 +1,149 @@
+import hashlib
+import os
+import re
+import time
+
+from core.atomic import atomic_write
+from core.catalog import iter_note_files
+from core.history import VersionStore
+from core.index import INDEX_DIRNAME
+
+
+ASSETS_DIRNAME = "assets"
+THUMBS_DIRNAME = "thumbs"
+ASSET_SCHEME = "asset"
+# Assets this recent may belong to a note that hasn't been saved yet
+GC_MIN_AGE_S = 24 * 60 * 60
+# The app sweeps unused assets in the background at most this often
+GC_INTERVAL_S = 24 * 60 * 60
+GC_STAMP_FILENAME = "assets-gc"
+
+_ASSET_NAME_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]+$")
+_ASSET_REF_RE = re.compile(ASSET_SCHEME + r":([0-9a-f]{64}\.[a-z0-9]+)")
+_REFERENCING_EXTS = (".html", ".htm", ".md", ".txt", ".json")
+
+
+def asset_url(name):
+    return f"{ASSET_SCHEME}:{name}"
+
+
+def find_references(text):
+    return set(_ASSET_REF_RE.findall(text))
+
+
+class AssetStore:
+    """Content-addressed files: each asset is named by the SHA-256 of its bytes.
+
+    Importing the same image twice stores it once, and notes refer to assets
+    as ``asset:<name>`` so they keep working wherever the store lives.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path_for(self, name):
+        if not _ASSET_NAME_RE.match(name):
+            raise ValueError(f"Not an asset name: {name!r}")
+        return os.path.join(self.root, name[:2], name)
+
+    def thumbnail_path(self, name, width):
+        # Thumbnails are always PNG, whatever the original format
+        stem = os.path.splitext(name)[0]
+        return os.path.join(self.root, THUMBS_DIRNAME, f"{stem}_{width}.png")
+
+    def exists(self, name):
+        return os.path.exists(self.path_for(name))
+
+    def put_bytes(self, data, ext):
+        name = f"{hashlib.sha256(data).hexdigest()}.{ext.lower().lstrip('.')}"
+        path = self.path_for(name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, data)
+        else:
+            # Used again: it is as new as a fresh copy to the garbage collector
+            os.utime(path)
+        return name
+
+    def put_file(self, file_path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        ext = os.path.splitext(file_path)[1] or ".bin"
+        return self.put_bytes(data, ext)
+
+    def names(self):
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or shard.name == THUMBS_DIRNAME:
+                continue
+            for entry in os.scandir(shard.path):
+                if _ASSET_NAME_RE.match(entry.name):
+                    yield entry.name
+
+    def collect_garbage(self, referenced, min_age=GC_MIN_AGE_S):
+        """Delete assets (and their thumbnails) not in referenced; returns the removed names."""
+        cutoff = time.time() - min_age
+        removed = []
+        for name in list(self.names()):
+            path = self.path_for(name)
+            if name in referenced or os.path.getmtime(path) > cutoff:
+                continue
+            os.remove(path)
+            removed.append(name)
+
+        thumbs = os.path.join(self.root, THUMBS_DIRNAME)
+        if removed and os.path.isdir(thumbs):
+            gone = {os.path.splitext(name)[0] for name in removed}
+            for entry in os.scandir(thumbs):
+                if entry.name.rsplit("_", 1)[0] in gone:
+                    os.remove(entry.path)
+        return removed
+
+
+def _referenced_in_files(paths):
+    referenced = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            referenced |= find_references(f.read())
+    return referenced
+
+
+def referenced_in_folder(folder):
+    """Asset names referenced by any note in folder or its shard subfolders."""
+    notes = iter_note_files(folder, lambda name: name.lower().endswith(_REFERENCING_EXTS))
+    return _referenced_in_files(entry.path for _, entry in notes)
+
+
+def referenced_in_history(history):
+    """Asset names referenced by a stored revision or a note in the trash."""
+    trashed = []
+    if os.path.isdir(history.trash_dir):
+        trashed = [entry.path for entry in os.scandir(history.trash_dir) if entry.name.lower().endswith(_REFERENCING_EXTS)]
+    return history.referenced_assets() | _referenced_in_files(trashed)
+
+
+def collect_unused_assets(database_folder, min_age=GC_MIN_AGE_S):
+    """Remove assets of the notes folder's store that no note, revision or trashed note references."""
+    store = AssetStore(os.path.join(database_folder, ASSETS_DIRNAME))
+    referenced = referenced_in_folder(database_folder)
+    history = VersionStore(database_folder)
+    try:
+        # Restoring an old version or a deleted note brings its pictures back too
+        referenced |= referenced_in_history(history)
+    finally:
+        history.close()
+    removed = store.collect_garbage(referenced, min_age)
+    stamp = os.path.join(database_folder, INDEX_DIRNAME, GC_STAMP_FILENAME)
+    os.makedirs(os.path.dirname(stamp), exist_ok=True)
+    atomic_write(stamp, str(len(removed)))
+    return removed
+
+
+def assets_gc_due(database_folder, interval=GC_INTERVAL_S):
+    if not os.path.isdir(os.path.join(database_folder, ASSETS_DIRNAME)):
+        return False
+    try:
+        return time.time() - os.path.getmtime(os.path.join(database_folder, INDEX_DIRNAME, GC_STAMP_FILENAME)) >= interval
+    except OSError:
+        return True
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+from core.trace import traced
+
+
+def _current_umask():
+    # os.umask can only be read by setting it, so this runs once, at import
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp creates files as 0600; replacements get the mode the file had, new files the usual one
+_NEW_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def content_digest(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def atomic_write(file_path, data, encoding="utf-8"):
+    """Replace file_path with data so readers see either the old or the new file, never half."""
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    with atomic_file(file_path) as f:
+        f.write(data)
+
+
+@contextmanager
+def atomic_file(file_path):
+    """Binary file object whose contents replace file_path only once the block completes."""
+    folder = os.path.dirname(os.path.abspath(file_path))
+    try:
+        mode = stat.S_IMODE(os.stat(file_path).st_mode)
+    except OSError:
+        mode = _NEW_FILE_MODE
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(folder)
+
+
+def _fsync_dir(folder):
+    # Makes the rename itself durable; not possible (or needed) on Windows
+    if os.name != "posix":
+        return
+    fd = os.open(folder, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@traced("save.write")
+def write_if_changed(file_path, data, previous_digest=None):
+    """Atomically write data unless it hashes to previous_digest; returns (digest, written)."""
+    digest = content_digest(data)
+    if digest == previous_digest and os.path.exists(file_path):
+        return digest, False
+    atomic_write(file_path, data)
+    return digest, True
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+CACHE_DIRNAME = "cache"
+
+CacheKey = namedtuple("CacheKey", ["kind", "path", "mtime_ns", "size"])
+
+
+def cache_key(file_path, kind):
+    stat = os.stat(file_path)
+    return CacheKey(kind, os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+
+class ContentCache:
+    """LRU cache of extracted text/HTML keyed by file revision, bounded in bytes.
+
+    With a cache_dir, entries stored with persist=True are also written to
+    disk so expensive extractions (.docx) survive restarts. Safe to share
+    between the GUI thread and workers.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def peek(self, key):
+        """Memory-only lookup, cheap enough for the GUI thread."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def get(self, key):
+        value = self.peek(key)
+        if value is not None:
+            return value
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key, value, persist=False):
+        with self._lock:
+            self._store(key, value)
+        if persist:
+            self._write_disk(key, value)
+
+    def get_or_compute(self, file_path, kind, compute, persist=False):
+        key = cache_key(file_path, kind)
+        value = self.get(key)
+        if value is None:
+            value = compute(file_path)
+            self.put(key, value, persist)
+        return value
+
+    def invalidate(self, file_path):
+        path = os.path.abspath(file_path)
+        with self._lock:
+            for key in [key for key in self._entries if key.path == path]:
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _store(self, key, value):
+        size = sys.getsizeof(value)
+        if key in self._entries:
+            self._discard(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = value
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key):
+        value = self._entries.pop(key)
+        self.current_bytes -= sys.getsizeof(value)
+
+    # One file per (kind, path): a newer revision overwrites the old one, and
+    # the first line records which revision the body belongs to.
+    def _disk_path(self, key):
+        name = hashlib.blake2b(f"{key.kind}\0{key.path}".encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, name[:2], name)
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header != [key.mtime_ns, key.size]:
+                    return None
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, value):
+        if not self.cache_dir:
+            return
+        disk_path = self._disk_path(key)
+        tmp_path = f"{disk_path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps([key.mtime_ns, key.size]) + "\n")
+                f.write(value)
+            os.replace(tmp_path, disk_path)
+        except OSError:
+            # The disk cache is best-effort
+            pass
@@ -0,0 +1,248 @@
+import hashlib
+import os
+import sqlite3
+import threading
+
+from core.extract import is_supported
+from core.manifest import Delta, Fingerprint, file_digest, load_manifest
+
+
+CATALOG_FILENAME = "catalog.sqlite"
+# Rows are written in batches so a large import never holds one huge transaction
+IMPORT_BATCH = 5000
+SORT_COLUMNS = {"name": "name", "ext": "ext, name", "mtime": "mtime DESC, name", "size": "size DESC, name"}
+
+
+def shard_for(name):
+    # 256 two-hex-digit subfolders keep every directory small
+    return hashlib.blake2b(name.encode("utf-8"), digest_size=1).hexdigest()
+
+
+def is_shard_dir(name):
+    return len(name) == 2 and all(c in "0123456789abcdef" for c in name)
+
+
+def iter_note_files(folder, accept=is_supported):
+    """Yield (subfolder, DirEntry) for every note, stored flat or in a shard subfolder."""
+    if not os.path.isdir(folder):
+        return
+    shards = []
+    for entry in os.scandir(folder):
+        if entry.is_file():
+            if accept(entry.name):
+                yield "", entry
+        elif is_shard_dir(entry.name) and entry.is_dir():
+            shards.append(entry.name)
+    for shard in shards:
+        for entry in os.scandir(os.path.join(folder, shard)):
+            if entry.is_file() and accept(entry.name):
+                yield shard, entry
+
+
+def _batches(rows, size=IMPORT_BATCH):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class Catalog:
+    """SQLite catalog of the notes folder: where each note is stored, its fingerprint and tags.
+
+    Listing and sorting read the catalog instead of the folder. scan() diffs the
+    folder against the catalog and save() commits that diff.
+    """
+
+    def __init__(self, folder, catalog_path, accept=is_supported):
+        self.folder = folder
+        self.catalog_path = catalog_path
+        self.accept = accept
+        self.pending = None
+        # SQLite connections can't be shared between threads, and the GUI lists
+        # notes while the index thread scans
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.catalog_path), exist_ok=True)
+            conn = sqlite3.connect(self.catalog_path)
+            conn.executescript("""
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                CREATE TABLE IF NOT EXISTS notes (
+                    name TEXT PRIMARY KEY,
+                    shard TEXT NOT NULL DEFAULT '',
+                    ext TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    digest TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS notes_ext ON notes(ext);
+                CREATE INDEX IF NOT EXISTS notes_mtime ON notes(mtime);
+                CREATE INDEX IF NOT EXISTS notes_size ON notes(size);
+                CREATE TABLE IF NOT EXISTS tags (
+                    tag TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    PRIMARY KEY (tag, name)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS tags_name ON tags(name);
+                CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def names(self):
+        return [name for (name,) in self.conn.execute("SELECT name FROM notes ORDER BY name")]
+
+    def listing(self, sort="name", ext=None, tag=None):
+        """Note names filtered by extension and/or tag, sorted by name, ext, mtime or size."""
+        query = "SELECT name FROM notes"
+        where, params = [], []
+        if ext is not None:
+            where.append("ext = ?")
+            params.append(ext.lower())
+        if tag is not None:
+            where.append("name IN (SELECT name FROM tags WHERE tag = ?)")
+            params.append(tag)
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY " + SORT_COLUMNS[sort]
+        return [name for (name,) in self.conn.execute(query, params)]
+
+    def path_for(self, name):
+        row = self.conn.execute("SELECT shard FROM notes WHERE name = ?", (name,)).fetchone()
+        if row is None or not row[0]:
+            return os.path.join(self.folder, name)
+        return os.path.join(self.folder, row[0], name)
+
+    def new_note_path(self, name):
+        """Where a note that doesn't exist yet should be written."""
+        if self.sharded:
+            return os.path.join(self.folder, shard_for(name), name)
+        return os.path.join(self.folder, name)
+
+    def storage_dirs(self):
+        dirs = [self.folder]
+        if os.path.isdir(self.folder):
+            dirs += sorted(
+                entry.path for entry in os.scandir(self.folder)
+                if is_shard_dir(entry.name) and entry.is_dir()
+            )
+        return dirs
+
+    @property
+    def sharded(self):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'sharded'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def tags(self, name):
+        return [tag for (tag,) in self.conn.execute("SELECT tag FROM tags WHERE name = ? ORDER BY tag", (name,))]
+
+    def set_tags(self, name, tags):
+        with self.conn:
+            self.conn.execute("DELETE FROM tags WHERE name = ?", (name,))
+            self.conn.executemany("INSERT OR IGNORE INTO tags(tag, name) VALUES (?, ?)", [(t, name) for t in tags])
+
+    def fingerprints(self):
+        rows = self.conn.execute("SELECT name, shard, size, mtime, digest FROM notes")
+        return {name: (shard, Fingerprint(size, mtime, digest)) for name, shard, size, mtime, digest in rows}
+
+    def load(self):
+        # Drops an unsaved scan, so its changes are reported again next time
+        self.pending = None
+
+    def scan(self):
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+        known = self.fingerprints()
+        added, modified, upserts, seen = [], [], [], set()
+        for shard, entry in iter_note_files(self.folder, self.accept):
+            name = entry.name
+            if name in seen:
+                continue
+            try:
+                stat = entry.stat()
+                old_shard, old = known.get(name, ("", None))
+                if old is not None and old.size == stat.st_size and old.mtime == stat.st_mtime:
+                    if old_shard != shard:
+                        # Moved between shards with its content untouched
+                        upserts.append((name, shard, old))
+                    seen.add(name)
+                    continue
+                digest = file_digest(entry.path)
+            except OSError:
+                # Vanished or locked mid-scan; the next event will pick it up
+                continue
+
+            seen.add(name)
+            upserts.append((name, shard, Fingerprint(stat.st_size, stat.st_mtime, digest)))
+            if old is None:
+                added.append(name)
+            elif old.digest != digest:
+                modified.append(name)
+
+        deleted = [name for name in known if name not in seen]
+        self.pending = (upserts, deleted)
+        return Delta(sorted(added), sorted(modified), sorted(deleted))
+
+    def save(self):
+        if self.pending is None:
+            return
+        upserts, deleted = self.pending
+        rows = [
+            (name, shard, os.path.splitext(name)[1].lower(), fp.size, fp.mtime, fp.digest)
+            for name, shard, fp in upserts
+        ]
+        for batch in _batches(rows):
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?, ?, ?)", batch)
+        for batch in _batches(deleted):
+            with self.conn:
+                self.conn.executemany("DELETE FROM notes WHERE name = ?", [(name,) for name in batch])
+                self.conn.executemany("DELETE FROM tags WHERE name = ?", [(name,) for name in batch])
+        self.pending = None
+
+    def import_manifest(self, manifest_path):
+        """Seed an empty catalog from the JSON manifest older versions kept, to skip rehashing."""
+        rows = [
+            (name, "", os.path.splitext(name)[1].lower(), fp.size, fp.mtime, fp.digest)
+            for name, fp in load_manifest(manifest_path).items()
+        ]
+        for batch in _batches(rows):
+            with self.conn:
+                self.conn.executemany("INSERT OR IGNORE INTO notes VALUES (?, ?, ?, ?, ?, ?)", batch)
+        return len(rows)
+
+    def shard_existing(self):
+        """Move every flat note into its shard subfolder and store new notes sharded from now on."""
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO settings VALUES ('sharded', '1')")
+        moved = []
+        for name in [name for (name,) in self.conn.execute("SELECT name FROM notes WHERE shard = ''")]:
+            shard = shard_for(name)
+            target_dir = os.path.join(self.folder, shard)
+            target = os.path.join(target_dir, name)
+            if os.path.exists(target):
+                continue
+            os.makedirs(target_dir, exist_ok=True)
+            try:
+                # A rename keeps the mtime, so the search index is not invalidated
+                os.replace(os.path.join(self.folder, name), target)
+            except OSError:
+                continue
+            moved.append((shard, name))
+        for batch in _batches(moved):
+            with self.conn:
+                self.conn.executemany("UPDATE notes SET shard = ? WHERE name = ?", batch)
+        return len(moved)
+
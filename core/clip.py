@@ -0,0 +1,152 @@
+import html
+import os
+import re
+import time
+from collections import namedtuple
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+from core.atomic import atomic_write
+from core.trace import traced
+
+
+CLIP_EXT = ".html"
+SLUG_CHARS = 60
+
+Clip = namedtuple("Clip", ["title", "url", "html", "clipped_at"])
+
+# Clips are read offline: nothing in them should run or phone home
+_ACTIVE_TAGS = {"script", "noscript", "iframe", "frame", "frameset", "object", "embed", "applet", "base"}
+_URL_ATTRS = {"href", "src", "action", "formaction", "poster", "background", "cite", "data", "xlink:href"}
+_UNSAFE_SCHEMES = ("javascript:", "vbscript:", "data:text/html")
+_LINK_ATTRS = {"href", "cite"}
+_VOID_TAGS = {"area", "br", "col", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_URL_JUNK_RE = re.compile(r"[\x00-\x20]+")
+_HEAD_RE = re.compile(r"<head\b[^>]*>", re.IGNORECASE)
+_BODY_RE = re.compile(r"<body\b[^>]*>", re.IGNORECASE)
+_SLUG_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def clip_name(clip):
+    title = clip.title or urlparse(clip.url).netloc
+    slug = _SLUG_RE.sub("-", title.lower()).strip("-")[:SLUG_CHARS].rstrip("-") or "page"
+    return f"clip-{time.strftime('%Y-%m-%d', time.localtime(clip.clipped_at))}-{slug}{CLIP_EXT}"
+
+
+class _ClipSanitizer(HTMLParser):
+    """Re-emits a page without active elements, event handlers or script URLs.
+
+    Links are made absolute against the page URL, so the clip needs no <base> that
+    would send every relative image and stylesheet to the network.
+    """
+
+    def __init__(self, url):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.out = []
+        self._skip = []
+        self._raw = False
+
+    def _attrs(self, attrs):
+        kept = []
+        for name, value in attrs:
+            if name.startswith("on") or name == "srcdoc" or name == "srcset":
+                continue
+            if name == "http-equiv" and (value or "").lower() == "refresh":
+                return None
+            if value is not None and name in _URL_ATTRS:
+                if _URL_JUNK_RE.sub("", value).lower().startswith(_UNSAFE_SCHEMES):
+                    continue
+                if name in _LINK_ATTRS:
+                    value = urljoin(self.url, value)
+            kept.append(name if value is None else f'{name}="{html.escape(value, quote=True)}"')
+        return kept
+
+    def _tag(self, tag, attrs, close):
+        if self._skip:
+            if tag == self._skip[-1] and not close:
+                self._skip.append(tag)
+            return
+        if tag in _ACTIVE_TAGS:
+            if not close and tag not in _VOID_TAGS:
+                self._skip.append(tag)
+            return
+        kept = self._attrs(attrs)
+        if kept is None:
+            return
+        self.out.append(f"<{' '.join([tag] + kept)}{' /' if close else ''}>")
+        self._raw = tag == "style" and not close
+
+    def handle_starttag(self, tag, attrs):
+        self._tag(tag, attrs, False)
+
+    def handle_startendtag(self, tag, attrs):
+        # <script src=…/> is an open tag to a browser; dropping it here is enough
+        self._tag(tag, attrs, True)
+
+    def handle_endtag(self, tag):
+        if self._skip:
+            if tag == self._skip[-1]:
+                self._skip.pop()
+            return
+        if tag not in _ACTIVE_TAGS:
+            self.out.append(f"</{tag}>")
+        self._raw = False
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.out.append(data if self._raw else html.escape(data, quote=False))
+
+    def handle_decl(self, decl):
+        self.out.append(f"<!{decl}>")
+
+
+def sanitize_html(markup, url):
+    parser = _ClipSanitizer(url)
+    parser.feed(markup)
+    parser.close()
+    return "".join(parser.out)
+
+
+def clip_document(clip):
+    """The page's HTML with scripts and handlers removed, links made absolute and a source line."""
+    url = html.escape(clip.url, quote=True)
+    title = html.escape(clip.title or clip.url)
+    when = time.strftime("%Y-%m-%d %H:%M", time.localtime(clip.clipped_at))
+    head = '<meta charset="utf-8">'
+    source = f'<p class="noteninja-clip">Clipped from <a href="{url}">{title}</a> on {when}</p>'
+
+    markup = sanitize_html(clip.html, clip.url)
+    if _HEAD_RE.search(markup):
+        markup = _HEAD_RE.sub(lambda m: m.group(0) + head, markup, count=1)
+    else:
+        markup = f"<head>{head}<title>{title}</title></head>" + markup
+    if _BODY_RE.search(markup):
+        return _BODY_RE.sub(lambda m: m.group(0) + source, markup, count=1)
+    return markup + source
+
+
+def _in_use(catalog, name, taken):
+    return name in taken or os.path.exists(catalog.path_for(name)) or os.path.exists(catalog.new_note_path(name))
+
+
+def _unused_name(catalog, name, taken):
+    stem, ext = os.path.splitext(name)
+    candidate, number = name, 1
+    while _in_use(catalog, candidate, taken):
+        number += 1
+        candidate = f"{stem}-{number}{ext}"
+    return candidate
+
+
+@traced("clip.write")
+def write_clips(catalog, clips):
+    """Write clips as HTML notes where the catalog places new notes; returns their names."""
+    names = []
+    for clip in clips:
+        name = _unused_name(catalog, clip_name(clip), set(names))
+        path = catalog.new_note_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, clip_document(clip))
+        names.append(name)
+    return names
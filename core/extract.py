@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+
+SUPPORTED_EXTS = (".txt", ".docx", ".pdf", ".html", ".htm", ".md", ".json", ".csv", ".nnote")
+TEXT_EXTS = (".txt", ".md", ".json", ".csv")
+# Below this many files, spawning worker processes costs more than it saves
+PARALLEL_THRESHOLD = 32
+HTML_EXTS = (".html", ".htm")
+
+
+class _HTMLTextParser(HTMLParser):
+    skipped_tags = ("script", "style", "head", "title")
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skipped_tags:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.skipped_tags and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def is_supported(filename):
+    return filename.lower().endswith(SUPPORTED_EXTS) and not filename.startswith(".")
+
+
+def read_text_file(file_path):
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def docx_paragraphs(file_path):
+    # python-docx is slow to import, only pay for it when a .docx is opened
+    from docx import Document
+    return [p.text for p in Document(file_path).paragraphs]
+
+
+def html_to_text(html):
+    parser = _HTMLTextParser()
+    parser.feed(html)
+    parser.close()
+    return " ".join(parser.parts)
+
+
+def extract_text(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in TEXT_EXTS:
+        return read_text_file(file_path)
+    if ext in HTML_EXTS:
+        return html_to_text(read_text_file(file_path))
+    if ext == ".docx":
+        return "\n".join(docx_paragraphs(file_path))
+    if ext == ".nnote":
+        # Imported here: core.note_archive depends on core.assets, which imports this module
+        from core.note_archive import read_note_body
+        return html_to_text(read_note_body(file_path))
+    if ext == ".pdf":
+        # Imported here so extraction workers only load PyMuPDF when they meet a PDF
+        from core.pdf import extract_pdf_text, pdf_supported
+        return extract_pdf_text(file_path) if pdf_supported() else ""
+    return ""
+
+
+def _extract_or_empty(file_path):
+    try:
+        return extract_text(file_path)
+    except Exception:
+        return ""
+
+
+def extract_many(file_paths, workers=None):
+    """Yield (file_path, text) pairs, parsing across processes for large batches."""
+    file_paths = list(file_paths)
+    # PDFs always go to worker processes: they are slow to parse and a crash in
+    # the native parser must not take the app down with it
+    has_pdf = any(path.lower().endswith(".pdf") for path in file_paths)
+    if workers == 1 or (len(file_paths) < PARALLEL_THRESHOLD and not has_pdf):
+        for file_path in file_paths:
+            yield file_path, _extract_or_empty(file_path)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(file_paths) // (workers * 4))
+    # spawn, not fork: the GUI process has Qt threads running
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        yield from zip(file_paths, pool.map(_extract_or_empty, file_paths, chunksize=chunksize))
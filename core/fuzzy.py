@@ -0,0 +1,190 @@
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import accumulate
+
+import numpy as np
+
+from core.trace import traced
+
+
+NGRAM = 3
+# Longer terms are allowed a second typo
+SECOND_EDIT_LENGTH = 8
+# Only this many of the best candidates (by overlap and length) are ranked in Python
+CANDIDATE_LIMIT = 500
+LENGTH_PENALTY = 0.001
+# Removed names stay in the postings until they make up this share of the index
+COMPACT_RATIO = 0.5
+
+# Word separators in file names all match a space in the query
+_SEPARATORS = str.maketrans("_-.", "   ")
+
+FuzzyMatch = namedtuple("FuzzyMatch", ["name", "score", "positions"])
+
+
+def normalize(text):
+    return text.lower().translate(_SEPARATORS)
+
+
+def trigrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def match_positions(term, lowered):
+    """Character positions in lowered to highlight for term: the substring, else every shared trigram."""
+    start = lowered.find(term)
+    if start >= 0:
+        return tuple(range(start, start + len(term)))
+    positions = set()
+    for gram in trigrams(term):
+        start = lowered.find(gram)
+        if start >= 0:
+            positions.update(range(start, start + NGRAM))
+    return tuple(sorted(positions))
+
+
+def _rank(term, lowered, overlap):
+    # Trigram overlap decides typo matches; exact substrings and prefixes come first,
+    # and shorter names win ties the way quick-open dialogs do
+    score = overlap
+    start = lowered.find(term)
+    if start >= 0:
+        score += 1.0 + (0.5 if start == 0 else 0.0)
+    return score - len(lowered) * LENGTH_PENALTY
+
+
+class TrigramIndex:
+    """Typo-tolerant name lookup for quick-open style filtering.
+
+    Every name is broken into its distinct lowercase trigrams, and a query
+    counts, per name, how many of its own trigrams it shares (one NumPy
+    bincount over the relevant postings). A single typo destroys at most three
+    trigrams, which sets the overlap a name needs to be a candidate. Terms
+    shorter than a trigram are found with str.find over all names joined.
+    Building is linear but not instant for 100k names, so do it off the GUI thread.
+    """
+
+    def __init__(self, names=()):
+        self.clear()
+        for name in names:
+            self.add(name)
+
+    def clear(self):
+        self.names = []
+        self.lowered = []
+        self.ids = {}
+        # array('i') rather than lists: 4 bytes per entry, and NumPy reads it without copying
+        self.postings = {}
+        self.removed = 0
+        self._lengths = None
+        self._joined = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def add(self, name):
+        if name in self.ids:
+            return
+        name_id = len(self.names)
+        lowered = normalize(name)
+        self.ids[name] = name_id
+        self.names.append(name)
+        self.lowered.append(lowered)
+        postings = self.postings
+        for gram in trigrams(lowered):
+            entries = postings.get(gram)
+            if entries is None:
+                entries = postings[gram] = array("i")
+            entries.append(name_id)
+        self._lengths = self._joined = None
+
+    def remove(self, name):
+        name_id = self.ids.pop(name, None)
+        if name_id is None:
+            return
+        # Postings keep the id; lookups skip names that are gone
+        self.names[name_id] = None
+        self.lowered[name_id] = None
+        self.removed += 1
+        self._joined = None
+        if self.removed > len(self.names) * COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        names = [name for name in self.names if name is not None]
+        self.clear()
+        for name in names:
+            self.add(name)
+
+    def lengths(self):
+        if self._lengths is None:
+            self._lengths = np.fromiter((len(name or "") for name in self.lowered), np.int32, len(self.lowered))
+        return self._lengths
+
+    def joined(self):
+        """All names in one string, each after a newline, with the offset where each one starts."""
+        if self._joined is None:
+            text = "".join("\n" + (lowered or "") for lowered in self.lowered)
+            starts = list(accumulate((len(lowered or "") + 1 for lowered in self.lowered), initial=1))
+            self._joined = (text, starts)
+        return self._joined
+
+    @traced("search.fuzzy")
+    def search(self, term, limit=100):
+        """Best-matching names for term, as FuzzyMatch(name, score, positions to highlight)."""
+        term = normalize(term).strip()
+        if not term:
+            return []
+        grams = trigrams(term)
+        if grams:
+            scored = self._trigram_candidates(term, grams)
+        else:
+            scored = self._substring_candidates(term, limit)
+
+        ranked = sorted((-score, self.names[name_id], name_id) for score, name_id in scored)[:limit]
+        return [
+            FuzzyMatch(name, -score, match_positions(term, self.lowered[name_id]))
+            for score, name, name_id in ranked
+        ]
+
+    def _substring_candidates(self, term, limit):
+        # One or two characters match too many names to rank them all: prefixes
+        # first, then other substrings, stopping once there are enough
+        text, starts = self.joined()
+        found = {}
+        for needle in ("\n" + term, term):
+            position = text.find(needle)
+            while position >= 0 and len(found) < limit:
+                name_id = bisect_right(starts, position + (needle[0] == "\n")) - 1
+                lowered = self.lowered[name_id]
+                if lowered is not None and name_id not in found:
+                    found[name_id] = _rank(term, lowered, 0.0)
+                # Carry on from the next name
+                position = text.find(needle, starts[name_id + 1] - 1)
+        return [(score, name_id) for name_id, score in found.items()]
+
+    def _trigram_candidates(self, term, grams):
+        arrays = [np.frombuffer(self.postings[gram], np.int32) for gram in grams if gram in self.postings]
+        if not arrays:
+            return []
+        edits = 2 if len(term) >= SECOND_EDIT_LENGTH else 1
+        need = max(1, len(grams) - NGRAM * edits)
+        counts = np.bincount(np.concatenate(arrays), minlength=len(self.names))
+        candidates = np.flatnonzero(counts >= need)
+        overlaps = counts[candidates] / len(grams)
+        if len(candidates) > CANDIDATE_LIMIT:
+            # The same order _rank gives, short of the substring bonus
+            base = overlaps - self.lengths()[candidates] * LENGTH_PENALTY
+            best = np.argpartition(base, -CANDIDATE_LIMIT)[-CANDIDATE_LIMIT:]
+            candidates, overlaps = candidates[best], overlaps[best]
+
+        scored = []
+        for name_id, overlap in zip(candidates.tolist(), overlaps.tolist()):
+            lowered = self.lowered[name_id]
+            if lowered is not None:
+                scored.append((_rank(term, lowered, overlap), name_id))
+        return scored
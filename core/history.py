@@ -0,0 +1,433 @@
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+from core.atomic import atomic_write, content_digest
+from core.catalog import CATALOG_FILENAME, Catalog, is_shard_dir
+from core.index import INDEX_DIRNAME
+from core.trace import traced
+
+
+HISTORY_FILENAME = "history.sqlite"
+TRASH_DIRNAME = "trash"
+# Saves of a note this soon after its latest revision was started update that
+# revision instead of adding one, so autosave every few seconds isn't a revision each
+MERGE_WINDOW_S = 10 * 60
+# A full snapshot is stored once the deltas since the last one add up to its
+# compressed size, or there are this many of them; reading any revision then
+# costs at most about two snapshots' worth of work
+MAX_CHAIN = 100
+# Deflate only looks back 32 KB, so that much of the replaced text primes the literals
+DICT_BYTES = 32 * 1024
+COMPARE_CHUNK = 64 * 1024
+# Shorter lines are cheaper to store than to point at
+MIN_COPY = 16
+# Recently written revisions are kept in memory, so the next save's delta needs no rebuild
+CACHED_REVISIONS = 4
+TRASH_KEEP_DAYS = 30
+
+Revision = namedtuple("Revision", ["id", "path", "saved", "size", "digest"])
+TrashEntry = namedtuple("TrashEntry", ["id", "note", "deleted", "size"])
+
+_DELTA_HEADER = struct.Struct("<QQ")
+_COPY = struct.Struct("<cQQ")
+_LITERAL = struct.Struct("<cQ")
+
+
+def _common_prefix(a, b):
+    # Compare in chunks, then narrow down inside the first chunk that differs
+    n = min(len(a), len(b))
+    start = 0
+    while start < n and a[start:start + COMPARE_CHUNK] == b[start:start + COMPARE_CHUNK]:
+        start += COMPARE_CHUNK
+    if start >= n:
+        return n
+    lo, hi = start, min(start + COMPARE_CHUNK, n)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[start:mid] == b[start:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    return _common_prefix(a[::-1][:limit], b[::-1][:limit])
+
+
+def _line_ops(old, new):
+    # Lines of new that also occur in old become copies, the rest literals;
+    # consecutive copies of consecutive old lines are merged into one
+    offsets = {}
+    position = 0
+    for line in old.splitlines(True):
+        if len(line) >= MIN_COPY:
+            offsets.setdefault(line, position)
+        position += len(line)
+
+    ops = []
+    literal = bytearray()
+    copy_start = copy_end = None
+    for line in new.splitlines(True):
+        if copy_end is not None and old.startswith(line, copy_end):
+            copy_end += len(line)
+            continue
+        at = offsets.get(line)
+        if copy_end is not None:
+            ops.append(_COPY.pack(b"C", copy_start, copy_end - copy_start))
+            copy_start = copy_end = None
+        if at is None:
+            literal += line
+            continue
+        if literal:
+            ops.append(_LITERAL.pack(b"L", len(literal)) + literal)
+            literal = bytearray()
+        copy_start, copy_end = at, at + len(line)
+    if copy_end is not None:
+        ops.append(_COPY.pack(b"C", copy_start, copy_end - copy_start))
+    if literal:
+        ops.append(_LITERAL.pack(b"L", len(literal)) + literal)
+    return b"".join(ops)
+
+
+def _apply_ops(old, ops):
+    parts = []
+    position = 0
+    while position < len(ops):
+        if ops[position:position + 1] == b"C":
+            _, start, length = _COPY.unpack_from(ops, position)
+            parts.append(old[start:start + length])
+            position += _COPY.size
+        else:
+            _, length = _LITERAL.unpack_from(ops, position)
+            position += _LITERAL.size
+            parts.append(ops[position:position + length])
+            position += length
+    return b"".join(parts)
+
+
+def _dictionary(old, prefix, suffix):
+    return old[prefix:len(old) - suffix][-DICT_BYTES:]
+
+
+def make_delta(old, new):
+    """new as an unchanged prefix and suffix of old, and line copies and literals in between, deflated."""
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    ops = _line_ops(old[prefix:len(old) - suffix], new[prefix:len(new) - suffix])
+    zdict = _dictionary(old, prefix, suffix)
+    compressor = zlib.compressobj(zdict=zdict) if zdict else zlib.compressobj()
+    return _DELTA_HEADER.pack(prefix, suffix) + compressor.compress(ops) + compressor.flush()
+
+
+def apply_delta(old, delta):
+    prefix, suffix = _DELTA_HEADER.unpack_from(delta)
+    zdict = _dictionary(old, prefix, suffix)
+    decompressor = zlib.decompressobj(zdict=zdict) if zdict else zlib.decompressobj()
+    ops = decompressor.decompress(delta[_DELTA_HEADER.size:]) + decompressor.flush()
+    return old[:prefix] + _apply_ops(old[prefix:len(old) - suffix], ops) + old[len(old) - suffix:]
+
+
+class VersionStore:
+    """Revision history and a soft-delete trash for notes, kept in the notes folder's .noteninja.
+
+    Each save is stored as a delta against the revision before it, with full
+    snapshots often enough that rebuilding any revision stays cheap. Saves
+    that follow each other within MERGE_WINDOW_S fold into one revision.
+    Deleted notes are moved into the trash instead of removed, and stay there
+    for TRASH_KEEP_DAYS.
+
+    Notes in the folder are keyed by their catalog name, so history survives
+    sharding and moves; notes saved elsewhere are keyed by absolute path.
+    """
+
+    def __init__(self, folder, history_path=None):
+        self.folder = folder
+        self.history_path = history_path or os.path.join(folder, INDEX_DIRNAME, HISTORY_FILENAME)
+        self.trash_dir = os.path.join(folder, INDEX_DIRNAME, TRASH_DIRNAME)
+        # Only read here, to find where a note named in the history is stored now
+        self.catalog = Catalog(folder, os.path.join(folder, INDEX_DIRNAME, CATALOG_FILENAME))
+        # Saves are recorded on the autosaver's thread while the GUI browses revisions
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+            conn = sqlite3.connect(self.history_path)
+            conn.executescript("""
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                CREATE TABLE IF NOT EXISTS revisions (
+                    -- The latest revision is rewritten in place while saves merge into it,
+                    -- so content cached in memory is keyed by (id, digest)
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    -- The note key: its catalog name, or an absolute path outside the folder
+                    path TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    saved REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    digest TEXT NOT NULL,
+                    base INTEGER,
+                    chain INTEGER NOT NULL,
+                    chain_bytes INTEGER NOT NULL,
+                    snapshot_bytes INTEGER NOT NULL,
+                    sealed INTEGER NOT NULL DEFAULT 0,
+                    data BLOB NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS revisions_path ON revisions(path, id);
+                CREATE TABLE IF NOT EXISTS trash (
+                    id INTEGER PRIMARY KEY,
+                    note TEXT NOT NULL,
+                    stored TEXT NOT NULL,
+                    deleted REAL NOT NULL,
+                    size INTEGER NOT NULL
+                );
+            """)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def note_key(self, file_path):
+        folder = os.path.normcase(os.path.abspath(self.folder))
+        parent = os.path.normcase(os.path.dirname(os.path.abspath(file_path)))
+        if parent == folder or (os.path.dirname(parent) == folder and is_shard_dir(os.path.basename(parent))):
+            return os.path.basename(file_path)
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def path_for(self, key):
+        if os.path.isabs(key):
+            return key
+        file_path = self.catalog.path_for(key)
+        if not os.path.exists(file_path) and os.path.exists(self.catalog.new_note_path(key)):
+            # Saved since the last scan, into the shard it will be catalogued in
+            return self.catalog.new_note_path(key)
+        return file_path
+
+    def has_history(self, file_path):
+        row = self.conn.execute("SELECT 1 FROM revisions WHERE path = ? LIMIT 1", (self.note_key(file_path),)).fetchone()
+        return row is not None
+
+    def revisions(self, file_path):
+        """Every revision of the note, newest first."""
+        rows = self.conn.execute(
+            "SELECT id, path, saved, size, digest FROM revisions WHERE path = ? ORDER BY id DESC", (self.note_key(file_path),)
+        )
+        return [Revision(*row) for row in rows]
+
+    @traced("history.record")
+    def record(self, file_path, data, saved=None):
+        """Add data as the note's newest revision; returns its id, or None if it matches the latest one."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        key = self.note_key(file_path)
+        saved = time.time() if saved is None else saved
+        digest = content_digest(data)
+        with self.conn:
+            # Taken before reading, so a save on another thread can't rewrite the
+            # revision this one is about to be encoded against
+            self.conn.execute("BEGIN IMMEDIATE")
+            latest, previous = (self.conn.execute(
+                """
+                SELECT id, created, digest, sealed, chain, chain_bytes, snapshot_bytes FROM revisions
+                WHERE path = ? ORDER BY id DESC LIMIT 2
+                """,
+                (key,),
+            ).fetchall() + [None, None])[:2]
+            if latest is not None and latest[2] == digest:
+                return None
+
+            # The first revision is never rewritten: it is what the note was before any edit
+            if previous is not None and not latest[3] and saved - latest[1] < MERGE_WINDOW_S:
+                base, chain, chain_bytes, snapshot_bytes, blob = self._encode(previous, data)
+                self.conn.execute(
+                    """
+                    UPDATE revisions SET saved = ?, size = ?, digest = ?, base = ?, chain = ?,
+                           chain_bytes = ?, snapshot_bytes = ?, data = ?
+                    WHERE id = ?
+                    """,
+                    (saved, len(data), digest, base, chain, chain_bytes, snapshot_bytes, blob, latest[0]),
+                )
+                self._remember(latest[0], digest, data)
+                return latest[0]
+
+            cursor = self.conn.execute(
+                """
+                INSERT INTO revisions(path, created, saved, size, digest, base, chain, chain_bytes, snapshot_bytes, data)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, saved, saved, len(data), digest, *self._encode(latest, data)),
+            )
+            self._remember(cursor.lastrowid, digest, data)
+            return cursor.lastrowid
+
+    def _encode(self, parent, data):
+        # (base, chain, chain_bytes, snapshot_bytes, data) for data stored after parent
+        if parent is not None and parent[4] < MAX_CHAIN:
+            try:
+                base = self._content(parent[0], parent[2])
+            except ValueError as e:
+                # Never build on a base that doesn't rebuild to its digest
+                print(f"History: {e}; storing a full snapshot")
+                base = None
+            if base is not None:
+                delta = make_delta(base, data)
+                if parent[5] + len(delta) < parent[6]:
+                    return parent[0], parent[4] + 1, parent[5] + len(delta), parent[6], delta
+        snapshot = zlib.compress(data)
+        return None, 0, 0, len(snapshot), snapshot
+
+    def seal(self, file_path):
+        """Keep the note's latest revision as it is; the next save starts a new one."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE revisions SET sealed = 1 WHERE id = (SELECT MAX(id) FROM revisions WHERE path = ?)",
+                (self.note_key(file_path),),
+            )
+
+    def _remember(self, rev_id, digest, content):
+        cache = self._cache()
+        cache.pop((rev_id, digest), None)
+        cache[(rev_id, digest)] = content
+        while len(cache) > CACHED_REVISIONS:
+            del cache[next(iter(cache))]
+
+    def _cache(self):
+        cache = getattr(self._local, "cache", None)
+        if cache is None:
+            cache = self._local.cache = {}
+        return cache
+
+    def _content(self, rev_id, digest):
+        cached = self._cache().get((rev_id, digest))
+        if cached is not None:
+            return cached
+        rows = self.conn.execute(
+            """
+            WITH RECURSIVE chain(id, base, data) AS (
+                SELECT id, base, data FROM revisions WHERE id = ?
+                UNION ALL
+                SELECT r.id, r.base, r.data FROM revisions r JOIN chain c ON r.id = c.base
+            )
+            SELECT base, data FROM chain
+            """,
+            (rev_id,),
+        ).fetchall()
+        if not rows:
+            raise KeyError(f"No such revision: {rev_id}")
+        # The snapshot comes last; the deltas are applied from there forwards
+        content = zlib.decompress(rows[-1][1])
+        for _, delta in reversed(rows[:-1]):
+            content = apply_delta(content, delta)
+        if content_digest(content) != digest:
+            raise ValueError(f"revision {rev_id} does not match its digest")
+        self._remember(rev_id, digest, content)
+        return content
+
+    @traced("history.read")
+    def read(self, rev_id):
+        with self.conn:
+            # One snapshot of the table, in case a save is rewriting this revision
+            self.conn.execute("BEGIN")
+            row = self.conn.execute("SELECT digest FROM revisions WHERE id = ?", (rev_id,)).fetchone()
+            if row is None:
+                raise KeyError(f"No such revision: {rev_id}")
+            return self._content(rev_id, row[0]).decode("utf-8")
+
+    def restore(self, rev_id):
+        """Write a revision back over its note; the restore is itself recorded, so it can be undone."""
+        row = self.conn.execute("SELECT path FROM revisions WHERE id = ?", (rev_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No such revision: {rev_id}")
+        file_path, text = self.path_for(row[0]), self.read(rev_id)
+        # The version being replaced stays in the history
+        self.seal(file_path)
+        # Imported here: only archive notes need the asset store
+        from core.assets import ASSETS_DIRNAME, AssetStore
+        from core.note_archive import is_note_archive, save_note_archive
+        if is_note_archive(file_path):
+            save_note_archive(file_path, text, None, AssetStore(os.path.join(self.folder, ASSETS_DIRNAME)))
+        else:
+            atomic_write(file_path, text)
+        self.record(file_path, text)
+        return file_path
+
+    def referenced_assets(self):
+        """Asset names used by any stored revision."""
+        # Imported here: core.assets imports this module for its garbage collection
+        from core.assets import find_references
+        referenced = set()
+        # Each note's chain is rebuilt once, in order, rather than revision by revision
+        key, contents = None, {}
+        for rev_id, path, base, data in self.conn.execute("SELECT id, path, base, data FROM revisions ORDER BY path, id"):
+            if path != key:
+                key, contents = path, {}
+            content = zlib.decompress(data) if base is None else apply_delta(contents[base], data)
+            contents[rev_id] = content
+            referenced |= find_references(content.decode("utf-8", errors="replace"))
+        return referenced
+
+    def trash(self, file_path):
+        """Move a note into the trash; returns the trash entry's id."""
+        os.makedirs(self.trash_dir, exist_ok=True)
+        size = os.path.getsize(file_path)
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO trash(note, stored, deleted, size) VALUES (?, '', ?, ?)",
+                (self.note_key(file_path), time.time(), size),
+            )
+            stored = f"{cursor.lastrowid}-{os.path.basename(file_path)}"
+            self.conn.execute("UPDATE trash SET stored = ? WHERE id = ?", (stored, cursor.lastrowid))
+            # Inside the transaction, so a failed move leaves no entry behind
+            os.replace(file_path, os.path.join(self.trash_dir, stored))
+        self.purge_trash()
+        return cursor.lastrowid
+
+    def trashed(self):
+        rows = self.conn.execute("SELECT id, note, deleted, size FROM trash ORDER BY deleted DESC")
+        return [TrashEntry(*row) for row in rows]
+
+    def untrash(self, entry_id):
+        """Move a trashed note back; returns where it went, next to its old name if that is taken."""
+        row = self.conn.execute("SELECT note, stored FROM trash WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No such trash entry: {entry_id}")
+        key, stored = row
+        # The catalog forgot the note when it was deleted; it goes where a new note would
+        file_path = key if os.path.isabs(key) else self.catalog.new_note_path(key)
+        stem, ext = os.path.splitext(file_path)
+        number = 1
+        while os.path.exists(file_path):
+            number += 1
+            file_path = f"{stem}-{number}{ext}"
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with self.conn:
+            os.replace(os.path.join(self.trash_dir, stored), file_path)
+            self.conn.execute("DELETE FROM trash WHERE id = ?", (entry_id,))
+        return file_path
+
+    def purge_trash(self, max_age_s=TRASH_KEEP_DAYS * 24 * 3600):
+        """Remove trashed notes older than max_age_s for good, with their history; returns how many."""
+        cutoff = time.time() - max_age_s
+        expired = self.conn.execute("SELECT id, note, stored FROM trash WHERE deleted < ?", (cutoff,)).fetchall()
+        for entry_id, key, stored in expired:
+            try:
+                os.remove(os.path.join(self.trash_dir, stored))
+            except OSError:
+                pass
+            with self.conn:
+                self.conn.execute("DELETE FROM trash WHERE id = ?", (entry_id,))
+                if not os.path.exists(self.path_for(key)):
+                    self.conn.execute("DELETE FROM revisions WHERE path = ?", (key,))
+        return len(expired)
@@ -0,0 +1,287 @@
+import hashlib
+import html
+import json
+import os
+import re
+import sqlite3
+from collections import namedtuple
+
+from core.catalog import CATALOG_FILENAME, Catalog, iter_note_files
+from core.extract import extract_many, extract_text
+from core.manifest import MANIFEST_FILENAME, Delta, delta_is_empty
+from core.trace import traced
+
+
+INDEX_DIRNAME = ".noteninja"
+INDEX_FILENAME = "index.sqlite"
+
+# Column weights for bm25(): a hit in the file name outranks a hit in the body
+NAME_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+# SQLite limits how many values one statement can bind
+NAMES_PER_QUERY = 500
+
+# Control characters never occur in extracted text, so they are safe snippet markers
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+SearchHit = namedtuple("SearchHit", ["name", "score", "snippet"])
+IndexUpdate = namedtuple("IndexUpdate", ["delta", "error"])
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def default_index_path(database_folder):
+    return os.path.join(database_folder, INDEX_DIRNAME, INDEX_FILENAME)
+
+
+def load_catalog(database_folder):
+    data_dir = os.path.join(database_folder, INDEX_DIRNAME)
+    catalog = Catalog(database_folder, os.path.join(data_dir, CATALOG_FILENAME))
+    # Folders indexed by older versions carry a JSON manifest; reuse its hashes once
+    manifest_path = os.path.join(data_dir, MANIFEST_FILENAME)
+    if os.path.exists(manifest_path) and len(catalog) == 0:
+        catalog.import_manifest(manifest_path)
+        os.remove(manifest_path)
+    return catalog
+
+
+def build_match_query(text, prefix_last=True):
+    terms = _TOKEN_RE.findall(text.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    if prefix_last:
+        # The last term is usually still being typed
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def snippet_to_html(snippet):
+    escaped = html.escape(snippet)
+    return escaped.replace(_MARK_START, "<b>").replace(_MARK_END, "</b>")
+
+
+def snippet_to_text(snippet):
+    return snippet.replace(_MARK_START, "").replace(_MARK_END, "")
+
+
+class NoteIndex:
+    """Full-text index of the notes folder, stored as SQLite FTS5 next to the notes.
+
+    The database is opened on first use, so constructing a NoteIndex is free.
+    """
+
+    def __init__(self, database_folder, index_path=None, locate=None):
+        self.database_folder = database_folder
+        self.index_path = index_path or default_index_path(database_folder)
+        # Maps a note name to its file; notes may live in shard subfolders
+        self.locate = locate or (lambda name: os.path.join(database_folder, name))
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            # Searches run on a worker thread; callers serialize access to one NoteIndex
+            self._conn = sqlite3.connect(self.index_path, check_same_thread=False)
+            self._create_schema()
+        return self._conn
+
+    def _create_schema(self):
+        self._conn.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS notes USING fts5(
+                name, body, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM notes")
+            self.conn.execute("DELETE FROM documents")
+
+    def sample_terms(self, count, min_docs=2):
+        """Random indexed terms that occur in at least min_docs notes, for benchmarks."""
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS temp.vocab USING fts5vocab(main, notes, 'row')"
+        )
+        rows = self.conn.execute(
+            "SELECT term FROM temp.vocab WHERE doc >= ? ORDER BY random() LIMIT ?", (min_docs, count)
+        )
+        return [term for (term,) in rows]
+
+    def add(self, name, text, size=0, mtime=0.0):
+        with self.conn:
+            self._delete(name)
+            self._insert(name, text, size, mtime)
+
+    def remove(self, name):
+        with self.conn:
+            self._delete(name)
+
+    def _delete(self, name):
+        self.conn.execute("DELETE FROM notes WHERE name = ?", (name,))
+        self.conn.execute("DELETE FROM documents WHERE name = ?", (name,))
+
+    def _insert(self, name, text, size, mtime):
+        self.conn.execute("INSERT INTO notes(name, body) VALUES (?, ?)", (name, text))
+        self.conn.execute(
+            "INSERT INTO documents(name, size, mtime) VALUES (?, ?, ?)", (name, size, mtime)
+        )
+
+    def index_file(self, name):
+        file_path = self.locate(name)
+        stat = os.stat(file_path)
+        self.add(name, extract_text(file_path), stat.st_size, stat.st_mtime)
+
+    def indexed(self):
+        rows = self.conn.execute("SELECT name, size, mtime FROM documents")
+        return {name: (size, mtime) for name, size, mtime in rows}
+
+    def documents(self, names=None):
+        # FTS5 keeps the extracted text, so other engines can build from it without re-parsing
+        if names is None:
+            yield from self.conn.execute("SELECT name, body FROM notes ORDER BY name")
+            return
+        names = list(names)
+        for i in range(0, len(names), NAMES_PER_QUERY):
+            batch = names[i:i + NAMES_PER_QUERY]
+            yield from self.conn.execute(
+                f"SELECT name, body FROM notes WHERE name IN ({','.join('?' * len(batch))}) ORDER BY name", batch
+            )
+
+    def signature(self):
+        digest = hashlib.blake2b(digest_size=16)
+        for name, size, mtime in self.conn.execute(
+            "SELECT name, size, mtime FROM documents ORDER BY name"
+        ):
+            digest.update(f"{name}\0{size}\0{mtime}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def sync(self, workers=None):
+        """Bring the index up to date with the folder; returns (updated, removed) counts."""
+        known = self.indexed()
+        on_disk, paths = {}, {}
+        for _, entry in iter_note_files(self.database_folder):
+            stat = entry.stat()
+            on_disk[entry.name] = (stat.st_size, stat.st_mtime)
+            paths[entry.name] = entry.path
+
+        stale = [name for name, sig in on_disk.items() if known.get(name) != sig]
+        removed = [name for name in known if name not in on_disk]
+        self._reindex(stale, removed, workers, paths.get)
+        return len(stale), len(removed)
+
+    def apply(self, delta, workers=None):
+        """Index only the files a catalog scan reported as added, modified or deleted."""
+        self._reindex(delta.added + delta.modified, delta.deleted, workers)
+
+    def _reindex(self, names, removed, workers=None, locate=None):
+        locate = locate or self.locate
+        signatures = {}
+        file_paths = []
+        for name in names:
+            file_path = locate(name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                removed = list(removed) + [name]
+                continue
+            signatures[name] = (stat.st_size, stat.st_mtime)
+            file_paths.append(file_path)
+
+        with self.conn:
+            for name in removed:
+                self._delete(name)
+            # Unreadable files come back as "" and stay findable by name
+            for file_path, text in extract_many(file_paths, workers):
+                name = os.path.basename(file_path)
+                self._delete(name)
+                self._insert(name, text, *signatures[name])
+
+    @traced("index.search")
+    def search(self, text, limit=100, within=None):
+        return [hit for batch in self.iter_search(text, limit, within) for hit in batch]
+
+    def iter_search(self, text, limit=100, within=None, cancelled=None, batch_size=25):
+        """Yield ranked hits in batches.
+
+        within restricts the search to those note names, and cancelled is polled
+        while SQLite works so a superseded query stops early instead of finishing.
+        """
+        query = build_match_query(text)
+        if query is None or (within is not None and not within):
+            return
+        where = "notes MATCH ?"
+        params = [query]
+        if within is not None:
+            where += " AND name IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(within)))
+        params.append(limit)
+
+        if cancelled is not None:
+            self.conn.set_progress_handler(cancelled, 1000)
+        try:
+            cursor = self.conn.execute(
+                f"""
+                SELECT name, bm25(notes, {NAME_WEIGHT}, {BODY_WEIGHT}) AS score,
+                       snippet(notes, -1, char(2), char(3), '…', 12)
+                FROM notes WHERE {where}
+                ORDER BY score LIMIT ?
+                """,
+                params,
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [SearchHit(name, -score, snippet) for name, score, snippet in rows]
+        except sqlite3.OperationalError:
+            if cancelled is None or not cancelled():
+                raise
+        finally:
+            if cancelled is not None:
+                self.conn.set_progress_handler(None, 0)
+
+
+@traced("index.update")
+def update_index(database_folder, catalog, index_path=None, workers=None):
+    """Scan the folder for changes and index just those; safe to run off the GUI thread.
+
+    The returned delta is valid even when the index could not be written, so
+    callers can still refresh their listings.
+    """
+    delta = catalog.scan()
+    index = NoteIndex(database_folder, index_path, catalog.path_for)
+    try:
+        index_delta = delta
+        if len(index) == 0:
+            # The catalog only knows paths once saved, so a first build looks them up here
+            catalog.save()
+            index_delta = Delta(catalog.names(), [], [])
+        if not delta_is_empty(index_delta):
+            index.apply(index_delta, workers)
+    except Exception as e:
+        # Forget this scan so the same changes are retried next time
+        catalog.load()
+        return IndexUpdate(delta, e)
+    finally:
+        index.close()
+    # Also records notes that only moved between shard folders
+    catalog.save()
+    return IndexUpdate(delta, None)
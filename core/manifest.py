@@ -0,0 +1,36 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+
+MANIFEST_FILENAME = "manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+Fingerprint = namedtuple("Fingerprint", ["size", "mtime", "digest"])
+Delta = namedtuple("Delta", ["added", "modified", "deleted"])
+
+
+def file_digest(file_path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def delta_is_empty(delta):
+    return not (delta.added or delta.modified or delta.deleted)
+
+
+def load_manifest(manifest_path):
+    """Fingerprints from the JSON manifest older versions kept, keyed by note name."""
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        # A damaged manifest only costs a rehash
+        return {}
+    return {name: Fingerprint(*values) for name, values in raw.items()}
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import zipfile
+
+from core.assets import find_references
+from core.atomic import atomic_file, content_digest
+from core.trace import traced
+
+
+NOTE_EXT = ".nnote"
+FORMAT_VERSION = 1
+INDEX_MEMBER = "index.json"
+BODY_MEMBER = "note.html"
+ASSETS_PREFIX = "assets/"
+THUMBS_PREFIX = "thumbs/"
+
+
+def is_note_archive(file_path):
+    return file_path.lower().endswith(NOTE_EXT)
+
+
+class NoteArchive:
+    """A .nnote file: a zip holding the HTML body, the images it shows and an index.
+
+    The zip's central directory lets any member be read without touching the
+    others, so opening a note costs the same with two images or two hundred:
+    only the index and the body are read up front, and each image (usually its
+    stored thumbnail) is read when the editor first paints it.
+    Reads may come from several worker threads and are serialized here.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._zip = None
+        self._index = None
+        self.lock = threading.RLock()
+
+    def _open(self):
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.file_path, "r")
+        return self._zip
+
+    def close(self):
+        with self.lock:
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+            self._index = None
+
+    def index(self):
+        with self.lock:
+            if self._index is None:
+                self._index = json.loads(self._open().read(INDEX_MEMBER))
+            return self._index
+
+    def read_body(self):
+        with self.lock:
+            return self._open().read(self.index().get("body", BODY_MEMBER)).decode("utf-8", errors="replace")
+
+    def assets(self):
+        return self.index().get("assets", {})
+
+    def has_asset(self, name):
+        return name in self.assets()
+
+    def read_asset(self, name):
+        with self.lock:
+            return self._open().read(ASSETS_PREFIX + name)
+
+    def read_thumbnail(self, name):
+        """Bytes of the stored PNG thumbnail, or None if the note was saved without one."""
+        thumb = self.assets().get(name, {}).get("thumbnail")
+        if not thumb:
+            return None
+        with self.lock:
+            return self._open().read(thumb)
+
+
+def read_note_body(file_path):
+    archive = NoteArchive(file_path)
+    try:
+        return archive.read_body()
+    finally:
+        archive.close()
+
+
+@traced("save.archive")
+def save_note_archive(file_path, body, previous_digest, asset_store, archive=None, thumb_width=300):
+    """Write body and every asset it references to a .nnote; returns (digest, written) like write_if_changed.
+
+    Assets are taken from the asset store, or from archive (the note as it was
+    opened) for images that only exist inside it. Asset names are content
+    hashes, so the body alone decides whether anything changed.
+    """
+    digest = content_digest(body)
+    if digest == previous_digest and os.path.exists(file_path):
+        return digest, False
+
+    lock = archive.lock if archive is not None else threading.RLock()
+    with lock:
+        table = {}
+        with atomic_file(file_path) as f:
+            # Images are already compressed; only the text members are deflated
+            with zipfile.ZipFile(f, "w", zipfile.ZIP_STORED) as out:
+                for name in sorted(find_references(body)):
+                    entry = _copy_asset(out, name, asset_store, archive, thumb_width)
+                    if entry is not None:
+                        table[name] = entry
+                out.writestr(BODY_MEMBER, body, zipfile.ZIP_DEFLATED)
+                index = {"version": FORMAT_VERSION, "body": BODY_MEMBER, "assets": table}
+                out.writestr(INDEX_MEMBER, json.dumps(index), zipfile.ZIP_DEFLATED)
+        if archive is not None and os.path.abspath(archive.file_path) == os.path.abspath(file_path):
+            # The old zip was replaced underneath it; reopen on next read
+            archive.close()
+    return digest, True
+
+
+def _copy_asset(out, name, asset_store, archive, thumb_width):
+    thumb_member = f"{THUMBS_PREFIX}{os.path.splitext(name)[0]}.png"
+    try:
+        path = asset_store.path_for(name)
+    except ValueError:
+        return None
+    if os.path.exists(path):
+        out.write(path, ASSETS_PREFIX + name)
+        thumb_path = asset_store.thumbnail_path(name, thumb_width)
+        if os.path.exists(thumb_path):
+            out.write(thumb_path, thumb_member)
+            return {"size": os.path.getsize(path), "thumbnail": thumb_member}
+        return {"size": os.path.getsize(path)}
+    if archive is not None and archive.has_asset(name):
+        data = archive.read_asset(name)
+        out.writestr(ASSETS_PREFIX + name, data)
+        thumb = archive.read_thumbnail(name)
+        if thumb is not None:
+            out.writestr(thumb_member, thumb)
+            return {"size": len(data), "thumbnail": thumb_member}
+        return {"size": len(data)}
+    # Referenced but lost; the note still opens, without that picture
+    return None
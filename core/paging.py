@@ -0,0 +1,50 @@
+import mmap
+import os
+
+
+# Files at or above this size are shown page by page instead of in one document
+LARGE_FILE_BYTES = 1024 * 1024
+PAGE_BYTES = 256 * 1024
+
+
+class PagedTextFile:
+    """Memory-mapped UTF-8 text file read in newline-aligned pages.
+
+    Reading a page only touches that window of the file, so the cost of
+    showing the first screen does not depend on the file size.
+    """
+
+    def __init__(self, file_path, page_bytes=PAGE_BYTES):
+        self.file_path = file_path
+        self.page_bytes = page_bytes
+        self._file = open(file_path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_page(self, offset):
+        """Return (text, next_offset); next_offset is -1 once the end is reached."""
+        if self._map is None or offset >= self.size:
+            return "", -1
+        end = min(offset + self.page_bytes, self.size)
+        if end < self.size:
+            # Prefer to break after a newline, else at least not inside a UTF-8 sequence
+            newline = self._map.rfind(b"\n", offset, end)
+            if newline >= 0:
+                end = newline + 1
+            else:
+                while end > offset and (self._map[end] & 0xC0) == 0x80:
+                    end -= 1
+        text = self._map[offset:end].decode("utf-8", errors="replace")
+        return text, (end if end < self.size else -1)
@@ -0,0 +1,57 @@
+import base64
+import importlib.util
+import json
+
+
+PREVIEW_WIDTH = 600
+
+
+def pdf_supported():
+    # PDF text and previews are optional; PyMuPDF itself takes ~150 ms to import,
+    # so it is only loaded by the functions below, the first time one runs
+    return importlib.util.find_spec("pymupdf") is not None
+
+
+def _backend():
+    try:
+        import pymupdf
+    except ImportError:
+        raise RuntimeError("PDF support needs PyMuPDF (pip install pymupdf)") from None
+    return pymupdf
+
+
+def pdf_page_count(file_path):
+    with _backend().open(file_path) as doc:
+        return doc.page_count
+
+
+def iter_pdf_pages(file_path, start=0, stop=None):
+    """Yield the text of each page in [start, stop), one page in memory at a time."""
+    with _backend().open(file_path) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for index in range(start, stop):
+            yield doc.load_page(index).get_text("text")
+
+
+def extract_pdf_text(file_path):
+    return "\n".join(iter_pdf_pages(file_path))
+
+
+def render_pdf_page(file_path, index, width=PREVIEW_WIDTH):
+    """Return (page_count, text, png_bytes) for one page rendered at the given pixel width."""
+    pymupdf = _backend()
+    with pymupdf.open(file_path) as doc:
+        page = doc.load_page(index)
+        zoom = width / max(page.rect.width, 1)
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return doc.page_count, page.get_text("text"), pixmap.tobytes("png")
+
+
+def png_data_url(png_bytes):
+    return "data:image/png;base64," + base64.b64encode(png_bytes).decode("ascii")
+
+
+def render_page_json(file_path, index):
+    """One page as the JSON reply the PDF viewer's JavaScript expects."""
+    count, text, png = render_pdf_page(file_path, index, PREVIEW_WIDTH)
+    return json.dumps({"index": index, "count": count, "text": text, "image": png_data_url(png)})
@@ -0,0 +1,410 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+
+from core.assets import ASSETS_DIRNAME, AssetStore
+from core.atomic import atomic_write
+from core.catalog import iter_note_files
+from core.index import INDEX_DIRNAME, NoteIndex
+from core.pdf import pdf_supported, render_pdf_page
+from core.trace import traced
+
+
+QUEUE_FILENAME = "jobs.sqlite"
+THUMB_WIDTH = 300
+OCR_TIMEOUT_S = 120
+# A job that keeps failing (e.g. a corrupt file) is given up on after this many tries
+MAX_ATTEMPTS = 3
+# A failed job is retried by a later run, this long after its first failure and
+# twice as long after each one after that
+RETRY_DELAY_S = 60
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp")
+TABLE_EXTS = (".pdf", ".docx", ".html", ".htm", ".nnote")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+Job = namedtuple("Job", ["kind", "source"])
+JobProgress = namedtuple("JobProgress", ["finished", "total", "kind", "source"])
+
+
+def ocr_supported():
+    return shutil.which("tesseract") is not None
+
+
+def output_stem(source):
+    name = os.path.basename(source)
+    # Asset names are 64-hex content hashes; a prefix is enough to tell them apart
+    if os.path.basename(os.path.dirname(os.path.dirname(source))) == ASSETS_DIRNAME:
+        stem, ext = os.path.splitext(name)
+        return f"image-{stem[:12]}{ext}"
+    return name
+
+
+class _HTMLTableParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tables = []
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self.tables.append([])
+        elif tag == "tr" and self.tables:
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self._row.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            if self._row:
+                self.tables[-1].append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def html_tables(markup):
+    parser = _HTMLTableParser()
+    parser.feed(markup)
+    parser.close()
+    return [table for table in parser.tables if table]
+
+
+def read_tables(source):
+    """Every table in a PDF, Word, HTML or .nnote note, as lists of rows of cell strings."""
+    ext = os.path.splitext(source)[1].lower()
+    if ext == ".pdf":
+        import pymupdf
+        tables = []
+        with pymupdf.open(source) as doc:
+            for page in doc:
+                tables += [table.extract() for table in page.find_tables().tables]
+        return [[["" if cell is None else str(cell) for cell in row] for row in table] for table in tables]
+    if ext == ".docx":
+        from docx import Document
+        return [[[cell.text for cell in row.cells] for row in table.rows] for table in Document(source).tables]
+    if ext == ".nnote":
+        from core.note_archive import read_note_body
+        return html_tables(read_note_body(source))
+    with open(source, "r", encoding="utf-8", errors="replace") as f:
+        return html_tables(f.read())
+
+
+# Processors run in worker processes and return the names of the files they wrote.
+def make_thumbnail(source, out_dir, stem):
+    # MuPDF opens images as one-page documents, so PDFs and screenshots share this path
+    _, _, png = render_pdf_page(source, 0, THUMB_WIDTH)
+    name = f"{stem}.thumb.png"
+    atomic_write(os.path.join(out_dir, name), png)
+    return [name]
+
+
+def run_ocr(source, out_dir, stem):
+    result = subprocess.run(
+        ["tesseract", source, "stdout"], capture_output=True, timeout=OCR_TIMEOUT_S, check=True
+    )
+    text = result.stdout.decode("utf-8", errors="replace").strip()
+    if not text:
+        return []
+    name = f"{stem}.ocr.txt"
+    atomic_write(os.path.join(out_dir, name), text + "\n")
+    return [name]
+
+
+def extract_tables(source, out_dir, stem):
+    names = []
+    for number, table in enumerate(read_tables(source), start=1):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(table)
+        name = f"{stem}.table{number}.csv"
+        atomic_write(os.path.join(out_dir, name), buffer.getvalue())
+        names.append(name)
+    return names
+
+
+PROCESSORS = {
+    "thumbnail": (make_thumbnail, pdf_supported),
+    "ocr": (run_ocr, ocr_supported),
+    "tables": (extract_tables, lambda: True),
+}
+
+
+def run_job(kind, source, out_dir):
+    return PROCESSORS[kind][0](source, out_dir, output_stem(source))
+
+
+def discover_jobs(database_folder):
+    """Yield a Job for every artifact the notes folder should have in the processed folder."""
+    for _, entry in iter_note_files(database_folder):
+        ext = os.path.splitext(entry.name)[1].lower()
+        if ext == ".pdf":
+            yield Job("thumbnail", entry.path)
+        if ext in TABLE_EXTS and (ext != ".pdf" or pdf_supported()):
+            yield Job("tables", entry.path)
+    # Screenshots pasted into notes live in the asset store
+    store = AssetStore(os.path.join(database_folder, ASSETS_DIRNAME))
+    for name in store.names():
+        if name.endswith(IMAGE_EXTS):
+            path = store.path_for(name)
+            yield Job("thumbnail", path)
+            yield Job("ocr", path)
+
+
+class JobQueue:
+    """Persistent queue of processing jobs, stored as SQLite in the processed folder.
+
+    A job is keyed by (kind, source) and remembers the source's size and mtime,
+    so enqueueing the same sources again only re-queues what changed. Progress
+    is committed after every job: a run that is cancelled or killed resumes
+    where it stopped.
+    """
+
+    def __init__(self, processed_folder, queue_path=None):
+        self.processed_folder = processed_folder
+        self.queue_path = queue_path or os.path.join(processed_folder, INDEX_DIRNAME, QUEUE_FILENAME)
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.queue_path), exist_ok=True)
+            conn = sqlite3.connect(self.queue_path)
+            conn.executescript("""
+                PRAGMA journal_mode = WAL;
+                PRAGMA synchronous = NORMAL;
+                CREATE TABLE IF NOT EXISTS jobs (
+                    kind TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    outputs TEXT NOT NULL DEFAULT '[]',
+                    error TEXT,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (kind, source)
+                );
+                CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state);
+            """)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+
+    def enqueue(self, jobs):
+        """Queue new and changed jobs and forget those whose source is gone; returns (queued, removed)."""
+        known = {
+            (kind, source): (size, mtime)
+            for kind, source, size, mtime in self.conn.execute("SELECT kind, source, size, mtime FROM jobs")
+        }
+        now = time.time()
+        queued, seen = [], set()
+        for job in jobs:
+            try:
+                stat = os.stat(job.source)
+            except OSError:
+                continue
+            seen.add(job)
+            if known.get(job) != (stat.st_size, stat.st_mtime):
+                queued.append((job.kind, job.source, stat.st_size, stat.st_mtime, PENDING, now))
+        gone = [job for job in known if job not in seen]
+        with self.conn:
+            # An upsert, so the outputs of the previous version can be cleaned up
+            self.conn.executemany(
+                """
+                INSERT INTO jobs(kind, source, size, mtime, state, updated) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(kind, source) DO UPDATE SET size = excluded.size, mtime = excluded.mtime,
+                    state = excluded.state, attempts = 0, error = NULL, updated = excluded.updated
+                """,
+                queued,
+            )
+            for job in gone:
+                for name in self._outputs(job):
+                    self._remove_output(name)
+                self.conn.execute("DELETE FROM jobs WHERE kind = ? AND source = ?", job)
+        return len(queued), len(gone)
+
+    def _outputs(self, job):
+        row = self.conn.execute("SELECT outputs FROM jobs WHERE kind = ? AND source = ?", job).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def _remove_output(self, name):
+        try:
+            os.remove(os.path.join(self.processed_folder, name))
+        except OSError:
+            pass
+
+    def pending(self):
+        # Jobs left running by a run that died are picked up again, as are skipped
+        # ones whose tool has been installed since and failed ones whose backoff is over
+        retry = [kind for kind, (_, supported) in PROCESSORS.items() if supported()]
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET state = ? WHERE state = ?", (PENDING, RUNNING))
+            self.conn.executemany(
+                "UPDATE jobs SET state = ? WHERE state = ? AND kind = ?", [(PENDING, SKIPPED, kind) for kind in retry]
+            )
+        rows = self.conn.execute(
+            """
+            SELECT kind, source FROM jobs
+            WHERE attempts < ? AND (state = ? OR (state = ? AND updated + ? * (1 << (attempts - 1)) <= ?))
+            ORDER BY kind, source
+            """,
+            (MAX_ATTEMPTS, PENDING, FAILED, RETRY_DELAY_S, time.time()),
+        )
+        return [Job(kind, source) for kind, source in rows]
+
+    def attempts(self, job):
+        row = self.conn.execute("SELECT attempts FROM jobs WHERE kind = ? AND source = ?", job).fetchone()
+        return 0 if row is None else row[0]
+
+    def mark(self, job, state, outputs=None, error=None, crashed=False):
+        # A failure, or a crash that took the job's worker down with it, uses up an attempt
+        with self.conn:
+            if outputs is not None:
+                # Tables and OCR text can shrink, so files the last run wrote go first
+                for name in set(self._outputs(job)) - set(outputs):
+                    self._remove_output(name)
+            self.conn.execute(
+                """
+                UPDATE jobs SET state = ?, outputs = COALESCE(?, outputs), error = ?, updated = ?,
+                       attempts = CASE WHEN ? = 'failed' OR ? THEN attempts + 1 WHEN ? = 'done' THEN 0 ELSE attempts END
+                WHERE kind = ? AND source = ?
+                """,
+                (state, None if outputs is None else json.dumps(outputs), error, time.time(), state, crashed, state, *job),
+            )
+
+    @traced("pipeline.run")
+    def run(self, workers=None, progress=None, cancelled=None):
+        """Work through pending jobs on a bounded process pool; returns per-state counts of this run."""
+        jobs = self.pending()
+        result = {DONE: 0, FAILED: 0, SKIPPED: 0}
+        runnable = []
+        for job in jobs:
+            if PROCESSORS[job.kind][1]():
+                runnable.append(job)
+            else:
+                self.mark(job, SKIPPED, error=f"{job.kind} is not available on this machine")
+                result[SKIPPED] += 1
+        if not runnable:
+            return result
+
+        os.makedirs(self.processed_folder, exist_ok=True)
+        total, finished = len(runnable), 0
+        workers = min(workers or os.cpu_count() or 1, total)
+        queue = iter(runnable)
+        # Jobs that were in flight when a worker crashed go first on the next pool,
+        # one at a time, so the job that crashes it does so on its own
+        requeued = deque()
+        suspects = set()
+        in_flight = {}
+        # Processes, not threads: OCR and PDF parsing are CPU-bound, and a crash in
+        # a native library must not take the app down. spawn, as the GUI runs Qt threads.
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            while True:
+                broken = False
+                # Only a couple of jobs per worker are handed out at once, so a
+                # cancel never has to wait for a long backlog
+                while len(in_flight) < (1 if suspects else workers * 2) and not (cancelled and cancelled()):
+                    job = requeued.popleft() if requeued else next(queue, None)
+                    if job is None:
+                        break
+                    self.mark(job, RUNNING)
+                    try:
+                        in_flight[pool.submit(run_job, job.kind, job.source, self.processed_folder)] = job
+                    except BrokenProcessPool:
+                        requeued.appendleft(job)
+                        broken = True
+                        break
+                if not in_flight and not broken:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED) if in_flight else ((), ())
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        self.mark(job, DONE, outputs=future.result())
+                        result[DONE] += 1
+                    except BrokenProcessPool:
+                        in_flight[future] = job
+                        broken = True
+                        continue
+                    except Exception as e:
+                        self.mark(job, FAILED, error=str(e) or type(e).__name__)
+                        result[FAILED] += 1
+                    suspects.discard(job)
+                    finished += 1
+                    if progress is not None:
+                        progress(JobProgress(finished, total, job.kind, os.path.basename(job.source)))
+                if not broken:
+                    continue
+
+                # Every job still in flight went down with the pool; which one crashed it
+                # isn't known, so each is tried again, alone. Crashes count as attempts,
+                # across runs too, so no job brings down more than MAX_ATTEMPTS pools.
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+                for job in in_flight.values():
+                    if self.attempts(job) + 1 < MAX_ATTEMPTS:
+                        self.mark(job, PENDING, crashed=True)
+                        requeued.append(job)
+                        suspects.add(job)
+                        continue
+                    suspects.discard(job)
+                    self.mark(job, FAILED, error="worker process crashed")
+                    result[FAILED] += 1
+                    finished += 1
+                    if progress is not None:
+                        progress(JobProgress(finished, total, job.kind, os.path.basename(job.source)))
+                in_flight.clear()
+        finally:
+            pool.shutdown(wait=True)
+        return result
+
+
+@traced("pipeline.process")
+def process_folder(database_folder, processed_folder, workers=None, progress=None, cancelled=None):
+    """Queue what changed in the notes folder, run the queue, then index the new artifacts."""
+    queue = JobQueue(processed_folder)
+    try:
+        queued, removed = queue.enqueue(discover_jobs(database_folder))
+        result = queue.run(workers, progress, cancelled)
+        result.update(queued=queued, removed=removed, states=queue.counts())
+    finally:
+        queue.close()
+    # OCR text and tables are searchable through their own index
+    index = NoteIndex(processed_folder)
+    try:
+        result["indexed"], result["unindexed"] = index.sync(workers=1)
+    finally:
+        index.close()
+    return result
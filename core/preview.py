@@ -0,0 +1,38 @@
+import html
+import os
+import re
+
+from core.clip import sanitize_html
+from core.extract import TEXT_EXTS, docx_paragraphs, read_text_file
+from core.note_archive import NOTE_EXT, read_note_body
+from core.render import page_html, render_csv, render_json, render_markdown, render_paragraphs, render_text
+from core.trace import traced
+
+
+# Part of the content cache key; changed whenever previews are built differently,
+# so none rendered the old way are served from disk
+PREVIEW_CACHE_KIND = "rendered-v2"
+
+RENDERERS = {".md": render_markdown, ".json": render_json, ".csv": render_csv}
+_IMG_RE = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+
+
+@traced("preview.render")
+def preview_html(file_path):
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in TEXT_EXTS:
+        render = RENDERERS.get(ext, render_text)
+        return page_html(render(read_text_file(file_path)))
+    if ext == ".docx":
+        return page_html(render_paragraphs(docx_paragraphs(file_path)))
+    if ext == NOTE_EXT:
+        # Inlining hundreds of screenshots would blow past what the viewer accepts;
+        # the preview shows the text and marks where pictures are. It is shown with
+        # scripts and the web channel on, so the note's own markup is sanitized first.
+        body = sanitize_html(read_note_body(file_path), "")
+        return _IMG_RE.sub("<span style='color: #777'>[image]</span>", body)
+    return "<h3>Unsupported file format</h3>"
+
+
+def error_html(message):
+    return f"<h3>Failed to load file:</h3><p>{html.escape(str(message))}</p>"
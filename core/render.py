@@ -0,0 +1,313 @@
+import csv
+import html
+import json
+import re
+from itertools import islice
+
+from core.paging import LARGE_FILE_BYTES
+
+
+# Tables and trees produce several times more markup than their source, and
+# QWebEngineView.setHtml() refuses documents over 2 MB, so bigger files are paged
+INLINE_RENDER_BYTES = {".csv": 256 * 1024, ".json": 256 * 1024}
+# Children listed per JSON object/array before a "more" marker
+JSON_CHILDREN_LIMIT = 500
+JSON_OPEN_DEPTH = 2
+
+RENDER_STYLE = """
+  body { font-family: sans-serif; padding: 10px; line-height: 1.45; color: #222; }
+  pre, code { font-family: monospace; }
+  pre.text { white-space: pre-wrap; margin: 0; }
+  pre.code { background: #f4f6f8; padding: 8px; border-radius: 4px; overflow-x: auto; }
+  code { background: #f4f6f8; padding: 0 3px; border-radius: 3px; }
+  blockquote { border-left: 3px solid #ccd; margin: 0; padding-left: 10px; color: #555; }
+  table { border-collapse: collapse; font-size: 13px; }
+  th, td { border: 1px solid #dde; padding: 3px 8px; text-align: left; vertical-align: top; }
+  th { background: #f4f6f8; position: sticky; top: 0; }
+  .tree { font-family: monospace; font-size: 13px; }
+  .tree details, .tree .leaf { margin-left: 16px; }
+  .tree summary { cursor: pointer; margin-left: -16px; }
+  .key { color: #7a3e9d; }
+  .str { color: #1a7f37; }
+  .num { color: #0550ae; }
+  .lit { color: #cf222e; }
+  .more, .count { color: #777; }
+"""
+
+
+def inline_limit(ext):
+    return INLINE_RENDER_BYTES.get(ext, LARGE_FILE_BYTES)
+
+
+def page_html(body, style=RENDER_STYLE):
+    return f"<!DOCTYPE html><html><head><meta charset='utf-8'><style>{style}</style></head><body>{body}</body></html>"
+
+
+def render_text(text):
+    return f"<pre class='text'>{html.escape(text)}</pre>"
+
+
+def render_paragraphs(paragraphs):
+    return "".join(f"<p>{html.escape(p)}</p>" for p in paragraphs)
+
+
+# Markdown: the common CommonMark/GFM subset people write notes in
+
+_FENCE_RE = re.compile(r"^\s*(```|~~~)\s*([\w+-]*)\s*$")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_HR_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_BULLET_RE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+_TABLE_SEP_RE = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+_CODE_SPAN_RE = re.compile(r"(`+)(.+?)\1")
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_AUTOLINK_RE = re.compile(r"&lt;(https?://[^\s&]+)&gt;")
+_STRONG_RE = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+_EM_RE = re.compile(r"(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])")
+_STRIKE_RE = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~")
+_SAFE_URL_RE = re.compile(r"^(https?:|mailto:|asset:|#|/|\.|[\w-]+(/|\.|$))", re.IGNORECASE)
+
+
+def _safe_url(url):
+    # The text was escaped already; anything script-like is dropped
+    return url if _SAFE_URL_RE.match(html.unescape(url)) else "#"
+
+
+def _inline(text):
+    parts = []
+    last = 0
+    # Code spans are taken out first so nothing inside them is formatted
+    for match in _CODE_SPAN_RE.finditer(text):
+        parts.append(_format_inline(text[last:match.start()]))
+        parts.append(f"<code>{html.escape(match.group(2).strip())}</code>")
+        last = match.end()
+    parts.append(_format_inline(text[last:]))
+    return "".join(parts)
+
+
+def _format_inline(text):
+    text = html.escape(text, quote=True)
+    text = _IMAGE_RE.sub(lambda m: f"<img alt='{m.group(1)}' src='{_safe_url(m.group(2))}'>", text)
+    text = _LINK_RE.sub(lambda m: f"<a href='{_safe_url(m.group(2))}'>{m.group(1)}</a>", text)
+    text = _AUTOLINK_RE.sub(r"<a href='\1'>\1</a>", text)
+    text = _STRONG_RE.sub(r"<strong>\2</strong>", text)
+    text = _EM_RE.sub(r"<em>\2</em>", text)
+    text = _STRIKE_RE.sub(r"<del>\1</del>", text)
+    return text
+
+
+def _table_cells(line):
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+def _render_list(items):
+    """items are (indent, ordered, text); deeper indents become nested lists."""
+    out = []
+    stack = []
+    for indent, ordered, text in items:
+        while stack and indent < stack[-1][0]:
+            out.append("</li></ol>" if stack.pop()[1] else "</li></ul>")
+        if stack and indent == stack[-1][0] and ordered != stack[-1][1]:
+            # A bullet list followed directly by a numbered one
+            out.append("</li></ol>" if stack.pop()[1] else "</li></ul>")
+        if not stack or indent > stack[-1][0]:
+            out.append("<ol>" if ordered else "<ul>")
+            stack.append((indent, ordered))
+        else:
+            out.append("</li>")
+        out.append(f"<li>{_inline(text)}")
+    while stack:
+        out.append("</li></ol>" if stack.pop()[1] else "</li></ul>")
+    return "".join(out)
+
+
+def render_markdown(text):
+    lines = text.splitlines()
+    out = []
+    paragraph = []
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(f"<p>{_inline(' '.join(line.strip() for line in paragraph))}</p>")
+            paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        fence = _FENCE_RE.match(line)
+        if fence:
+            flush_paragraph()
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                code.append(lines[i])
+                i += 1
+            out.append(f"<pre class='code'><code>{html.escape(chr(10).join(code))}</code></pre>")
+            i += 1
+            continue
+        if not line.strip():
+            flush_paragraph()
+            i += 1
+            continue
+        heading = _HEADING_RE.match(line)
+        if heading:
+            flush_paragraph()
+            level = len(heading.group(1))
+            out.append(f"<h{level}>{_inline(heading.group(2))}</h{level}>")
+            i += 1
+            continue
+        if _HR_RE.match(line):
+            flush_paragraph()
+            out.append("<hr>")
+            i += 1
+            continue
+        if line.lstrip().startswith(">"):
+            flush_paragraph()
+            quoted = []
+            while i < len(lines) and lines[i].lstrip().startswith(">"):
+                quoted.append(lines[i].lstrip()[1:].removeprefix(" "))
+                i += 1
+            out.append(f"<blockquote>{render_markdown(chr(10).join(quoted))}</blockquote>")
+            continue
+        if "|" in line and i + 1 < len(lines) and _TABLE_SEP_RE.match(lines[i + 1]):
+            flush_paragraph()
+            header = "".join(f"<th>{_inline(cell)}</th>" for cell in _table_cells(line))
+            rows = []
+            i += 2
+            while i < len(lines) and "|" in lines[i] and lines[i].strip():
+                rows.append("<tr>" + "".join(f"<td>{_inline(c)}</td>" for c in _table_cells(lines[i])) + "</tr>")
+                i += 1
+            out.append(f"<table><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>")
+            continue
+        bullet = _BULLET_RE.match(line)
+        # Only a bullet may interrupt a paragraph, "2016. was a year" must not
+        if bullet and not (paragraph and bullet.group(2)[0].isdigit()):
+            flush_paragraph()
+            items = []
+            while i < len(lines):
+                bullet = _BULLET_RE.match(lines[i])
+                if bullet:
+                    indent = len(bullet.group(1).expandtabs(4))
+                    items.append((indent, bullet.group(2)[0].isdigit(), bullet.group(3)))
+                elif lines[i].strip() and items and lines[i].startswith((" ", "\t")):
+                    # Continuation line of the previous item
+                    indent, ordered, item = items[-1]
+                    items[-1] = (indent, ordered, item + " " + lines[i].strip())
+                else:
+                    break
+                i += 1
+            out.append(_render_list(items))
+            continue
+        paragraph.append(line)
+        i += 1
+    flush_paragraph()
+    return "".join(out)
+
+
+# CSV
+
+def sniff_dialect(sample):
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        return csv.excel
+
+
+def csv_rows_html(text, dialect, cell="td"):
+    rows = []
+    for row in csv.reader(text.splitlines(), dialect):
+        cells = "".join(f"<{cell}>{html.escape(value)}</{cell}>" for value in row)
+        rows.append(f"<tr>{cells}</tr>")
+    return "".join(rows)
+
+
+def split_csv_header(text):
+    """Return (header_line, rest) so the header can be styled and repeated."""
+    header, _, rest = text.partition("\n")
+    return header, rest
+
+
+def render_csv(text):
+    dialect = sniff_dialect(text[:16384])
+    header, rest = split_csv_header(text)
+    return (
+        f"<table><thead>{csv_rows_html(header, dialect, 'th')}</thead>"
+        f"<tbody>{csv_rows_html(rest, dialect)}</tbody></table>"
+    )
+
+
+# JSON
+
+def _json_scalar(value):
+    if isinstance(value, str):
+        return f"<span class='str'>{html.escape(json.dumps(value, ensure_ascii=False))}</span>"
+    if isinstance(value, bool) or value is None:
+        return f"<span class='lit'>{json.dumps(value)}</span>"
+    return f"<span class='num'>{html.escape(json.dumps(value))}</span>"
+
+
+def _json_items(value):
+    return value.items() if isinstance(value, dict) else enumerate(value)
+
+
+def json_summary(key, value):
+    label = "" if key is None else f"<span class='key'>{html.escape(str(key))}</span>: "
+    if isinstance(value, dict):
+        return f"{label}{{…}} <span class='count'>{len(value)} keys</span>"
+    return f"{label}[…] <span class='count'>{len(value)} items</span>"
+
+
+def json_node_html(key, value, path, depth, lazy):
+    """One tree node; containers are <details> that are either filled or left for the viewer to load."""
+    if not isinstance(value, (dict, list)):
+        label = "" if key is None else f"<span class='key'>{html.escape(str(key))}</span>: "
+        return f"<div class='leaf'>{label}{_json_scalar(value)}</div>"
+    summary = json_summary(key, value)
+    if lazy:
+        data_path = html.escape(json.dumps(path), quote=True)
+        return f"<details data-path=\"{data_path}\"><summary>{summary}</summary></details>"
+    is_open = " open" if depth < JSON_OPEN_DEPTH else ""
+    children = json_children_html(value, path, 0, depth + 1, lazy)
+    return f"<details{is_open}><summary>{summary}</summary>{children}</details>"
+
+
+def json_children_html(value, path, start=0, depth=0, lazy=False):
+    parts = []
+    end = start + JSON_CHILDREN_LIMIT
+    for key, child in islice(_json_items(value), start, end):
+        parts.append(json_node_html(key, child, path + [key], depth, lazy))
+    remaining = len(value) - end
+    if remaining > 0:
+        if lazy:
+            data_path = html.escape(json.dumps(path), quote=True)
+            parts.append(
+                f"<div class='more' data-path=\"{data_path}\" data-start='{end}'>"
+                f"<a href='#'>Show {min(remaining, JSON_CHILDREN_LIMIT)} more of {remaining}</a></div>"
+            )
+        else:
+            parts.append(f"<div class='more'>… {remaining} more</div>")
+    return "".join(parts)
+
+
+def json_value_at(value, path):
+    for key in path:
+        value = value[key]
+    return value
+
+
+def render_json(text):
+    try:
+        value = json.loads(text)
+    except ValueError as e:
+        return f"<p class='more'>Not valid JSON ({html.escape(str(e))}), shown as text.</p>" + render_text(text)
+    return f"<div class='tree'>{json_node_html(None, value, [], 0, lazy=False)}</div>"
+
+
+def load_json_file(file_path):
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        return json.load(f)
@@ -0,0 +1,375 @@
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from core.index import INDEX_DIRNAME, NoteIndex
+
+
+SEMANTIC_DIRNAME = "semantic"
+VECTORS_FILENAME = "vectors.f32"
+META_FILENAME = "meta.json"
+IVF_FILENAME = "ivf.npz"
+
+DIMS = 384
+# Each term is spread over this many signed dimensions (sparse random projection)
+TERM_NONZEROS = 8
+CHUNK_WORDS = 80
+CHUNK_STRIDE = 60
+PASSAGE_CHARS = 300
+# Past this many chunks, queries probe k-means clusters instead of every row
+IVF_THRESHOLD = 100_000
+IVF_TRAIN_SAMPLE = 20_000
+IVF_ITERATIONS = 10
+# Projection noise alone produces scores around here, so weaker hits are dropped
+MIN_SCORE = 0.1
+# Changed notes are re-embedded with the IDF weights of the last full build; once
+# this fraction of the chunks has been replaced since then, everything is rebuilt
+REBUILD_FRACTION = 0.2
+# Rows are embedded, copied and assigned to clusters this many at a time
+BLOCK_ROWS = 8192
+
+SemanticHit = namedtuple("SemanticHit", ["name", "score", "passage"])
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset("""
+    a about above after again against all am an and any are as at be because been before
+    being below between both but by can could did do does doing down during each few for
+    from further had has have having he her here hers herself him himself his how i if in
+    into is it its itself just me more most my myself no nor not now of off on once only or
+    other our ours ourselves out over own same she should so some such than that the their
+    theirs them themselves then there these they this those through to too under until up
+    very was we were what when where which while who whom why will with would you your
+    yours yourself yourselves
+""".split())
+
+
+_SUFFIXES = ("ations", "ation", "ingly", "ings", "ing", "edly", "ed", "ies", "ly", "es", "s")
+
+
+def stem(word):
+    # Light suffix stripping so "quarterly", "quarters" and "quarter" meet
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return word
+
+
+def terms(text):
+    return [
+        stem(w) for w in _WORD_RE.findall(text.lower())
+        if w not in STOPWORDS and not w.isdigit()
+    ]
+
+
+def chunk_text(text, words=CHUNK_WORDS, stride=CHUNK_STRIDE):
+    """Split text into overlapping windows of words; yields (passage, chunk_terms)."""
+    spans = [m.span() for m in _WORD_RE.finditer(text)]
+    if not spans:
+        return
+    start = 0
+    while True:
+        window = spans[start:start + words]
+        passage = text[window[0][0]:window[-1][1]]
+        yield passage, terms(passage)
+        if start + words >= len(spans):
+            return
+        start += stride
+
+
+class _TermProjector:
+    # Maps each term to TERM_NONZEROS (dimension, sign) pairs derived from its hash,
+    # so vectors approximate TF-IDF cosine in DIMS floats without a vocabulary matrix.
+
+    def __init__(self, dims):
+        self.dims = dims
+        self._cache = {}
+
+    def lookup(self, term):
+        entry = self._cache.get(term)
+        if entry is None:
+            raw = hashlib.blake2b(term.encode("utf-8"), digest_size=TERM_NONZEROS * 4).digest()
+            values = np.frombuffer(raw, dtype=np.uint32)
+            dims = (values >> 1) % self.dims
+            signs = np.where(values & 1, 1.0, -1.0).astype(np.float32)
+            entry = self._cache[term] = (dims, signs)
+        return entry
+
+    def project(self, weights):
+        if not weights:
+            return np.zeros(self.dims, dtype=np.float32)
+        entries = [self.lookup(term) for term in weights]
+        dims = np.concatenate([term_dims for term_dims, _ in entries])
+        signs = np.concatenate([term_signs for _, term_signs in entries])
+        signs *= np.repeat(np.fromiter(weights.values(), dtype=np.float32, count=len(weights)), TERM_NONZEROS)
+        # bincount sums colliding dimensions in one pass, unlike the unbuffered np.add.at
+        vector = np.bincount(dims, weights=signs, minlength=self.dims).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class SemanticIndex:
+    """Offline contextual search over note chunks, stored as a memory-mapped float32 matrix.
+
+    Chunk vectors are sublinear-TF x IDF weights projected to DIMS dimensions;
+    a query is answered with one matrix-vector product, or through an IVF
+    (k-means) index once the corpus outgrows IVF_THRESHOLD chunks. When notes
+    change, only their chunks are re-embedded (see refresh()).
+    """
+
+    def __init__(self, index_dir, dims=DIMS):
+        self.index_dir = index_dir
+        self.dims = dims
+        self.projector = _TermProjector(dims)
+        self.meta = None
+        self.vectors = None
+        self.ivf = None
+
+    @property
+    def vectors_path(self):
+        return os.path.join(self.index_dir, VECTORS_FILENAME)
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.index_dir, META_FILENAME)
+
+    @property
+    def ivf_path(self):
+        return os.path.join(self.index_dir, IVF_FILENAME)
+
+    def __len__(self):
+        self.load()
+        return 0 if self.meta is None else len(self.meta["chunks"])
+
+    def source_signature(self):
+        self.load()
+        return None if self.meta is None else self.meta.get("source")
+
+    def load(self):
+        if self.meta is not None or not os.path.exists(self.meta_path):
+            return
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        count = len(meta["chunks"])
+        self.vectors = (
+            np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, meta["dims"]))
+            if count else np.zeros((0, meta["dims"]), dtype=np.float32)
+        )
+        self.ivf = None
+        if meta.get("ivf"):
+            with np.load(self.ivf_path) as data:
+                self.ivf = {key: data[key] for key in data.files}
+        self.meta = meta
+
+    def unload(self):
+        self.meta = None
+        self.vectors = None
+        self.ivf = None
+
+    def build(self, documents, source=None, notes=None):
+        """Rebuild from (name, text) pairs; returns the number of chunks indexed.
+
+        notes maps each note name to its (size, mtime) so refresh() can tell
+        which notes changed afterwards.
+        """
+        chunks, chunk_terms = _chunk_documents(documents)
+        df = Counter()
+        for counts in chunk_terms:
+            df.update(counts.keys())
+        total = len(chunks)
+        idf = {term: math.log(1 + total / count) for term, count in df.items()}
+        blocks = (self._embed(chunk_terms[i:i + BLOCK_ROWS], idf) for i in range(0, total, BLOCK_ROWS))
+        return self._write(chunks, blocks, idf, source, notes, built=total, stale=0)
+
+    def refresh(self, note_index):
+        """Bring the index up to date with note_index, re-embedding only the notes that changed."""
+        source = note_index.signature()
+        if self.source_signature() == source:
+            return len(self)
+        notes = note_index.indexed()
+        meta = self.meta
+        if meta is None or "notes" not in meta:
+            return self.build(note_index.documents(), source, notes)
+
+        known = meta["notes"]
+        changed = sorted(name for name, sig in notes.items() if tuple(known.get(name, ())) != tuple(sig))
+        gone = set(known).difference(notes).union(changed)
+        keep = np.fromiter(
+            (row for row, (name, _) in enumerate(meta["chunks"]) if name not in gone), dtype=np.int64
+        )
+        added, added_terms = _chunk_documents(note_index.documents(changed))
+        stale = meta["stale"] + len(meta["chunks"]) - len(keep) + len(added)
+        if stale > REBUILD_FRACTION * max(meta["built"], 1):
+            return self.build(note_index.documents(), source, notes)
+
+        # Terms first seen since the last build weigh as much as the rarest ones did then
+        idf = meta["idf"]
+        rare = math.log(1 + meta["built"])
+        for counts in added_terms:
+            for term in counts:
+                idf.setdefault(term, rare)
+        old = self.vectors
+        fresh = self._embed(added_terms, idf)
+        assign = None
+        if self.ivf is not None:
+            assign = np.empty(len(old), dtype=np.int64)
+            assign[self.ivf["order"]] = np.repeat(np.arange(len(self.ivf["centroids"])), np.diff(self.ivf["offsets"]))
+            assign = np.concatenate([assign[keep], np.argmax(fresh @ self.ivf["centroids"].T, axis=1)])
+        blocks = [old[keep[i:i + BLOCK_ROWS]] for i in range(0, len(keep), BLOCK_ROWS)] + [fresh]
+        chunks = [meta["chunks"][row] for row in keep] + added
+        centroids = None if self.ivf is None else self.ivf["centroids"]
+        return self._write(chunks, blocks, idf, source, notes, meta["built"], stale, centroids, assign)
+
+    def _embed(self, chunk_terms, idf):
+        vectors = np.zeros((len(chunk_terms), self.dims), dtype=np.float32)
+        for row, counts in enumerate(chunk_terms):
+            vectors[row] = self.projector.project({t: (1 + math.log(c)) * idf[t] for t, c in counts.items()})
+        return vectors
+
+    def _write(self, chunks, blocks, idf, source, notes, built, stale, centroids=None, assign=None):
+        total = len(chunks)
+        self.unload()
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_vectors = self.vectors_path + ".tmp"
+        has_ivf = False
+        if total:
+            matrix = np.memmap(tmp_vectors, dtype=np.float32, mode="w+", shape=(total, self.dims))
+            row = 0
+            for block in blocks:
+                matrix[row:row + len(block)] = block
+                row += len(block)
+            matrix.flush()
+            has_ivf = total > IVF_THRESHOLD
+            if has_ivf:
+                # Clusters trained before are kept while the index grows incrementally
+                ivf = _build_ivf(np.asarray(matrix)) if assign is None else _group_ivf(centroids, assign)
+                np.savez(self.ivf_path + ".tmp.npz", **ivf)
+                os.replace(self.ivf_path + ".tmp.npz", self.ivf_path)
+            del matrix
+            os.replace(tmp_vectors, self.vectors_path)
+
+        meta = {
+            "dims": self.dims,
+            "source": source,
+            "idf": idf,
+            "chunks": chunks,
+            "ivf": has_ivf,
+            "notes": notes or {},
+            "built": built,
+            "stale": stale,
+        }
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, self.meta_path)
+        return total
+
+    def query_vector(self, query):
+        self.load()
+        idf = self.meta["idf"] if self.meta else {}
+        # Unknown terms can't match anything, so they don't dilute the query
+        counts = Counter(t for t in terms(query) if t in idf)
+        return self.projector.project({t: (1 + math.log(c)) * idf[t] for t, c in counts.items()})
+
+    def search(self, query, k=10, per_note=True):
+        self.load()
+        if self.meta is None or not self.meta["chunks"]:
+            return []
+        vector = self.query_vector(query)
+        if not vector.any():
+            return []
+
+        if self.ivf is not None:
+            rows = _ivf_candidates(self.ivf, vector)
+            scores = self.vectors[rows] @ vector
+        else:
+            rows = None
+            scores = self.vectors @ vector
+
+        # Over-fetch so collapsing to one passage per note still fills k
+        want = min(len(scores), k * 4 if per_note else k)
+        if want == 0:
+            # The probed clusters were all empty
+            return []
+        top = np.argpartition(-scores, want - 1)[:want]
+        top = top[np.argsort(-scores[top])]
+
+        hits, seen = [], set()
+        for i in top:
+            score = float(scores[i])
+            if score < MIN_SCORE:
+                break
+            row = int(rows[i]) if rows is not None else int(i)
+            name, passage = self.meta["chunks"][row]
+            if per_note and name in seen:
+                continue
+            seen.add(name)
+            hits.append(SemanticHit(name, score, passage))
+            if len(hits) == k:
+                break
+        return hits
+
+
+def _build_ivf(matrix):
+    count = len(matrix)
+    clusters = max(1, int(math.sqrt(count)))
+    rng = np.random.default_rng(0)
+    sample = matrix[rng.choice(count, min(count, IVF_TRAIN_SAMPLE), replace=False)]
+    centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+    for _ in range(IVF_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(clusters):
+            members = sample[assign == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+
+    # Assign every row in blocks to bound memory
+    assign = np.concatenate([
+        np.argmax(matrix[i:i + BLOCK_ROWS] @ centroids.T, axis=1) for i in range(0, count, BLOCK_ROWS)
+    ])
+    return _group_ivf(centroids, assign)
+
+
+def _group_ivf(centroids, assign):
+    # Rows are stored grouped by cluster; offsets[c]:offsets[c + 1] are cluster c's
+    order = np.argsort(assign, kind="stable").astype(np.int64)
+    offsets = np.searchsorted(assign[order], np.arange(len(centroids) + 1)).astype(np.int64)
+    return {"centroids": centroids.astype(np.float32), "order": order, "offsets": offsets}
+
+
+def _ivf_candidates(ivf, vector, probe_fraction=0.1):
+    centroids, order, offsets = ivf["centroids"], ivf["order"], ivf["offsets"]
+    probes = max(4, int(len(centroids) * probe_fraction))
+    nearest = np.argsort(-(centroids @ vector))[:probes]
+    return np.concatenate([order[offsets[c]:offsets[c + 1]] for c in nearest])
+
+
+def default_semantic_dir(database_folder):
+    return os.path.join(database_folder, INDEX_DIRNAME, SEMANTIC_DIRNAME)
+
+
+def _chunk_documents(documents):
+    chunks, chunk_terms = [], []
+    for name, text in documents:
+        for passage, passage_terms in chunk_text(text or ""):
+            if passage_terms:
+                chunks.append([name, passage[:PASSAGE_CHARS]])
+                chunk_terms.append(Counter(passage_terms))
+    return chunks, chunk_terms
+
+
+def contextual_search(semantic, database_folder, query, k=10):
+    """Bring the semantic index up to date with the full-text index, then query it."""
+    note_index = NoteIndex(database_folder)
+    try:
+        semantic.refresh(note_index)
+    finally:
+        note_index.close()
+    return semantic.search(query, k)
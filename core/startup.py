@@ -0,0 +1,24 @@
+import time
+
+
+class StartupProfile:
+    """Wall-clock time per startup phase, for --profile-startup."""
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.last = self.origin
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.origin
+
+    def report(self):
+        width = max((len(phase) for phase, _ in self.phases), default=0)
+        lines = [f"{phase:<{width}}  {seconds * 1000:8.1f} ms" for phase, seconds in self.phases]
+        lines.append(f"{'total':<{width}}  {self.total() * 1000:8.1f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,133 @@
+"""Lightweight spans for hot paths.
+
+Tracing is off by default; span() then returns a shared no-op context manager,
+so instrumented code pays one function call. When enabled, finished spans go
+into a fixed-size ring buffer that can be summarized or exported as a Chrome
+trace (chrome://tracing, Perfetto).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+from core.timing import percentile
+
+
+RING_SIZE = 50_000
+
+SpanRecord = namedtuple("SpanRecord", ["name", "start_ns", "duration_ns", "thread_id"])
+
+_enabled = False
+_records = deque(maxlen=RING_SIZE)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start_ns")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end_ns = time.perf_counter_ns()
+        # deque.append is atomic, so worker threads can record without a lock
+        _records.append(SpanRecord(self.name, self.start_ns, end_ns - self.start_ns, threading.get_ident()))
+        return False
+
+
+def enable(ring_size=RING_SIZE):
+    global _enabled, _records
+    if _records.maxlen != ring_size:
+        _records = deque(_records, maxlen=ring_size)
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name):
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def traced(name):
+    """Decorator form of span() for plain functions (not Qt slots, whose arity PyQt inspects)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name, start_ns, duration_ns):
+    if _enabled:
+        _records.append(SpanRecord(name, start_ns, duration_ns, threading.get_ident()))
+
+
+def records():
+    return list(_records)
+
+
+def clear():
+    _records.clear()
+
+
+def summary():
+    """{name: {count, p50_ms, p95_ms, max_ms, total_ms}} over the spans in the buffer."""
+    durations = {}
+    for rec in records():
+        durations.setdefault(rec.name, []).append(rec.duration_ns / 1e6)
+    return {
+        name: {
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "max_ms": max(values),
+            "total_ms": sum(values),
+        }
+        for name, values in durations.items()
+    }
+
+
+def export_chrome_trace(file_path):
+    pid = os.getpid()
+    events = [
+        {
+            "name": rec.name,
+            "cat": rec.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": rec.start_ns / 1000,
+            "dur": rec.duration_ns / 1000,
+            "pid": pid,
+            "tid": rec.thread_id,
+        }
+        for rec in records()
+    ]
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
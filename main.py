@@ -1,18 +1,71 @@
+import time
+STARTED_AT = time.perf_counter()
+
 import sys
 import os
 from PyQt5.QtWidgets import QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout
 from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt, QCoreApplication, QTimer
+
+from core.startup import StartupProfile
+
+
+class LazyTab(QWidget):
+    """Placeholder that builds the real tab widget the first time it is shown."""
+
+    def __init__(self, factory):
+        super().__init__()
+        self.factory = factory
+        self.widget = None
+        self.page_layout = QVBoxLayout(self)
+        self.page_layout.setContentsMargins(0, 0, 0, 0)
+
+    def ensure_built(self):
+        if self.widget is None:
+            self.widget = self.factory()
+            self.page_layout.addWidget(self.widget)
+        return self.widget
+
+
+# Tab modules are imported inside the factories so their dependencies
+# (QtWebEngine in particular) load only when the tab is first opened.
+def create_search_tab():
+    from ui.search_tab import NotesSearchTab
+    return NotesSearchTab()
+
+
+def create_editor_tab():
+    from ui.editor_tab import TextEditorTab
+    return TextEditorTab()
+
 
-from ui.web_tab import WebViewTab
-from ui.search_tab import NotesSearchTab
-from ui.editor_tab import TextEditorTab
+def performance_enabled():
+    return "--perf" in sys.argv or os.environ.get("NOTENINJA_PERF") == "1"
 
 
 class NoteNinja(QMainWindow):
-    def __init__(self):
+    def __init__(self, profile=None, show_performance=False):
         super().__init__()
+        self.profile = profile
+        self.show_performance = show_performance
         self.init_ui()
 
+    def mark(self, phase):
+        if self.profile is not None:
+            self.profile.mark(phase)
+
+    @property
+    def search_tab(self):
+        return self.search_page.ensure_built()
+
+    @property
+    def editor_tab(self):
+        return self.editor_page.ensure_built()
+
+    @property
+    def web_tab(self):
+        return self.web_page.ensure_built()
+
     def init_ui(self):
         self.setWindowTitle("🪶 NoteNinja")
         self.setGeometry(100, 100, 1200, 800)
@@ -30,31 +83,84 @@ class NoteNinja(QMainWindow):
 
         # Tabs
         self.tab_widget = QTabWidget()
-        self.web_tab = WebViewTab()
-        self.search_tab = NotesSearchTab()
-        self.editor_tab = TextEditorTab()
+        self.search_page = LazyTab(create_search_tab)
+        self.editor_page = LazyTab(create_editor_tab)
+        self.web_page = LazyTab(self.create_web_tab)
+
+        self.tab_widget.addTab(self.search_page, "🔍 Search Notes")
+        self.tab_widget.addTab(self.editor_page, "📝 Text Editor")
+        self.tab_widget.addTab(self.web_page, "🌐 Web Browser")
+        if self.show_performance:
+            self.perf_page = LazyTab(self.create_performance_tab)
+            self.tab_widget.addTab(self.perf_page, "⏱ Performance")
+        self.mark("main window")
 
-        self.tab_widget.addTab(self.search_tab, "🔍 Search Notes")
-        self.tab_widget.addTab(self.editor_tab, "📝 Text Editor")
-        self.tab_widget.addTab(self.web_tab, "🌐 Web Browser")
+        # The search tab is what the user sees first, everything else waits
+        self.search_page.ensure_built()
+        self.mark("search tab")
 
         self.tab_widget.currentChanged.connect(self.on_tab_changed)
         layout.addWidget(self.tab_widget)
 
+    def create_web_tab(self):
+        from ui.web_tab import WebViewTab
+        tab = WebViewTab()
+        # Clipped pages are indexed right away rather than when the watcher notices them
+        tab.clip_writer.written.connect(lambda names: self.search_tab.refresh_notes())
+        return tab
+
+    def create_performance_tab(self):
+        from ui.perf_panel import PerformancePanel
+        return PerformancePanel({"Preview cache": self.search_tab.content_cache.stats})
+
+    def closeEvent(self, event):
+        # Let a pending autosave reach the disk before the process exits
+        if self.editor_page.widget is not None:
+            self.editor_tab.autosaver.flush()
+        if self.search_page.widget is not None:
+            # Jobs already running finish; the rest stay queued for next start
+            self.search_tab.stop_processing()
+            self.search_tab.pdf_bridge.shutdown()
+        super().closeEvent(event)
+
     def on_tab_changed(self, index):
-        if index == 1:
-            print("Switched to Search Notes tab")
-            # Optional: refresh dummy list if needed
-            if hasattr(self.search_tab, 'populate_dummy_notes'):
-                self.search_tab.populate_dummy_notes()
+        page = self.tab_widget.widget(index)
+        if isinstance(page, LazyTab):
+            page.ensure_built()
+
+
+def print_startup_report(profile):
+    profile.mark("first event loop turn")
+    print("Startup profile:")
+    print(profile.report())
 
 
 if __name__ == "__main__":
+    profile = StartupProfile(STARTED_AT) if "--profile-startup" in sys.argv else None
+    if profile is not None:
+        sys.argv.remove("--profile-startup")
+        profile.mark("python imports")
+
+    # Lets QtWebEngine be imported after the QApplication exists
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     app.setApplicationName("NoteNinja")
     app.setApplicationVersion("1.0")
+    if profile is not None:
+        profile.mark("QApplication")
+
+    show_performance = performance_enabled()
+    if show_performance:
+        # Spans cost one function call while tracing is off, so it is only switched on here
+        from core import trace
+        trace.enable()
+        if "--perf" in sys.argv:
+            sys.argv.remove("--perf")
 
-    window = NoteNinja()
+    window = NoteNinja(profile, show_performance)
     window.show()
+    if profile is not None:
+        profile.mark("show window")
+        QTimer.singleShot(0, lambda: print_startup_report(profile))
 
     sys.exit(app.exec_())
@@ -0,0 +1,6 @@
+import sys
+
+from noteninja.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,291 @@
+"""Headless NoteNinja: build and query the same indexes the desktop app uses.
+
+    python -m noteninja index  [--folder database] [--workers N] [--rebuild] [--semantic]
+    python -m noteninja search QUERY [--limit 20] [--semantic]
+    python -m noteninja stats
+    python -m noteninja migrate [--shard]
+    python -m noteninja process [--out opencv] [--workers N]
+    python -m noteninja history NOTE [--restore REVISION]
+    python -m noteninja trash [--restore ID]
+    python -m noteninja gc [--min-age HOURS]
+    python -m noteninja bench  [--queries 20] [--repeat 5] [--semantic]
+
+Every command prints one JSON object on stdout, with timings in milliseconds.
+"""
+import argparse
+import json
+import os
+import time
+
+from core.cache import CACHE_DIRNAME
+from core.catalog import iter_note_files
+from core.history import HISTORY_FILENAME, TRASH_DIRNAME, VersionStore
+from core.index import INDEX_DIRNAME, NoteIndex, load_catalog, snippet_to_text, update_index
+from core.timing import elapsed_ms, summarize
+
+
+def folder_bytes(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def open_semantic(folder):
+    # NumPy is only imported by the commands that need it
+    from core.semantic import SemanticIndex, default_semantic_dir
+    return SemanticIndex(default_semantic_dir(folder))
+
+
+def build_semantic(folder):
+    from core.semantic import contextual_search
+    semantic = open_semantic(folder)
+    start = time.perf_counter()
+    # An empty query still brings the semantic index up to date
+    contextual_search(semantic, folder, "")
+    return {"chunks": len(semantic), "ms": elapsed_ms(start)}
+
+
+def cmd_index(args):
+    catalog = load_catalog(args.folder)
+    if args.rebuild:
+        # An empty index is rebuilt from every note in the catalog
+        index = NoteIndex(args.folder)
+        index.clear()
+        index.close()
+
+    start = time.perf_counter()
+    update = update_index(args.folder, catalog, workers=args.workers)
+    result = {
+        "command": "index",
+        "folder": args.folder,
+        "files": len(catalog),
+        "added": len(update.delta.added),
+        "modified": len(update.delta.modified),
+        "deleted": len(update.delta.deleted),
+        "ms": elapsed_ms(start),
+        "error": None if update.error is None else str(update.error),
+    }
+    if args.semantic and update.error is None:
+        result["semantic"] = build_semantic(args.folder)
+    return result
+
+
+def cmd_search(args):
+    start = time.perf_counter()
+    if args.semantic:
+        from core.semantic import contextual_search
+        hits = contextual_search(open_semantic(args.folder), args.folder, args.query, args.limit)
+        rows = [{"name": h.name, "score": round(h.score, 4), "snippet": h.passage} for h in hits]
+    else:
+        index = NoteIndex(args.folder)
+        hits = index.search(args.query, args.limit)
+        index.close()
+        rows = [
+            {"name": h.name, "score": round(h.score, 4), "snippet": snippet_to_text(h.snippet)}
+            for h in hits
+        ]
+    return {
+        "command": "search",
+        "query": args.query,
+        "semantic": args.semantic,
+        "hits": rows,
+        "ms": elapsed_ms(start),
+    }
+
+
+def cmd_stats(args):
+    index = NoteIndex(args.folder)
+    data_dir = os.path.join(args.folder, INDEX_DIRNAME)
+    cache_bytes = folder_bytes(os.path.join(data_dir, CACHE_DIRNAME))
+    trash_bytes = folder_bytes(os.path.join(data_dir, TRASH_DIRNAME))
+    history_bytes = sum(
+        os.path.getsize(path) for path in (os.path.join(data_dir, HISTORY_FILENAME + suffix) for suffix in ("", "-wal"))
+        if os.path.exists(path)
+    )
+    result = {
+        "command": "stats",
+        "folder": args.folder,
+        "indexed_notes": len(index),
+        "catalog_entries": len(load_catalog(args.folder)),
+        "index_bytes": folder_bytes(data_dir) - cache_bytes - trash_bytes - history_bytes,
+        "cache_bytes": cache_bytes,
+        "history_bytes": history_bytes,
+        "trash_bytes": trash_bytes,
+        "notes_bytes": sum(
+            entry.stat().st_size for _, entry in iter_note_files(args.folder)
+        ),
+    }
+    index.close()
+    return result
+
+
+def cmd_bench(args):
+    catalog = load_catalog(args.folder)
+    start = time.perf_counter()
+    update = update_index(args.folder, catalog, workers=args.workers)
+    result = {
+        "command": "bench",
+        "folder": args.folder,
+        "files": len(catalog),
+        "index_update_ms": elapsed_ms(start),
+        "reindexed": len(update.delta.added) + len(update.delta.modified),
+    }
+
+    index = NoteIndex(args.folder)
+    queries = index.sample_terms(args.queries)
+    timings = []
+    for query in queries:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            index.search(query)
+            timings.append(elapsed_ms(start))
+    index.close()
+    result["keyword"] = dict(summarize(timings), queries=len(queries))
+
+    if args.semantic:
+        result["semantic_build"] = build_semantic(args.folder)
+        semantic = open_semantic(args.folder)
+        timings = []
+        for query in queries:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                semantic.search(query)
+                timings.append(elapsed_ms(start))
+        result["semantic"] = dict(summarize(timings), queries=len(queries))
+    return result
+
+
+def cmd_migrate(args):
+    catalog = load_catalog(args.folder)
+    start = time.perf_counter()
+    update = update_index(args.folder, catalog, workers=args.workers)
+    result = {
+        "command": "migrate",
+        "folder": args.folder,
+        "imported": len(update.delta.added),
+        "files": len(catalog),
+        "error": None if update.error is None else str(update.error),
+    }
+    if args.shard and update.error is None:
+        result["sharded"] = catalog.shard_existing()
+    result["ms"] = elapsed_ms(start)
+    return result
+
+
+def cmd_process(args):
+    # Imported here: only this command needs the processing pipeline
+    from core.pipeline import process_folder
+    start = time.perf_counter()
+    result = process_folder(args.folder, args.out, workers=args.workers)
+    return dict({"command": "process", "folder": args.folder, "out": args.out}, **result, ms=elapsed_ms(start))
+
+
+def note_path(folder, note):
+    # A note's name in the catalog, or a path to any note file
+    if os.path.exists(note):
+        return note
+    return load_catalog(folder).path_for(note)
+
+
+def cmd_history(args):
+    history = VersionStore(args.folder)
+    file_path = note_path(args.folder, args.note)
+    result = {"command": "history", "note": file_path}
+    if args.restore is not None:
+        history.restore(args.restore)
+        result["restored"] = args.restore
+    result["revisions"] = [
+        {"id": r.id, "saved": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(r.saved)), "bytes": r.size}
+        for r in history.revisions(file_path)
+    ]
+    history.close()
+    return result
+
+
+def cmd_trash(args):
+    history = VersionStore(args.folder)
+    result = {"command": "trash"}
+    if args.restore is not None:
+        result["restored"] = history.untrash(args.restore)
+    result["notes"] = [
+        {"id": e.id, "note": e.note, "deleted": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(e.deleted)), "bytes": e.size}
+        for e in history.trashed()
+    ]
+    history.close()
+    return result
+
+
+def cmd_gc(args):
+    # Imported here: only this command sweeps the asset store
+    from core.assets import collect_unused_assets
+    start = time.perf_counter()
+    removed = collect_unused_assets(args.folder, min_age=args.min_age * 3600)
+    return {"command": "gc", "folder": args.folder, "removed": len(removed), "assets": removed, "ms": elapsed_ms(start)}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="noteninja", description="Headless NoteNinja indexer and search.")
+    parser.add_argument("--folder", default="database", help="notes folder (default: database)")
+    parser.add_argument("--pretty", action="store_true", help="indent the JSON output")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index = commands.add_parser("index", help="bring the search index up to date")
+    index.add_argument("--workers", type=int, default=None, help="extraction processes (default: all cores)")
+    index.add_argument("--rebuild", action="store_true", help="re-extract every note")
+    index.add_argument("--semantic", action="store_true", help="also build the contextual index")
+    index.set_defaults(handler=cmd_index)
+
+    search = commands.add_parser("search", help="query the index")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--semantic", action="store_true", help="contextual instead of keyword search")
+    search.set_defaults(handler=cmd_search)
+
+    stats = commands.add_parser("stats", help="index and cache sizes")
+    stats.set_defaults(handler=cmd_stats)
+
+    bench = commands.add_parser("bench", help="time index updates and queries")
+    bench.add_argument("--workers", type=int, default=None)
+    bench.add_argument("--queries", type=int, default=20, help="number of sampled query terms")
+    bench.add_argument("--repeat", type=int, default=5)
+    bench.add_argument("--semantic", action="store_true")
+    bench.set_defaults(handler=cmd_bench)
+
+    migrate = commands.add_parser("migrate", help="import the folder into the catalog")
+    migrate.add_argument("--workers", type=int, default=None)
+    migrate.add_argument("--shard", action="store_true", help="move notes into hashed subfolders")
+    migrate.set_defaults(handler=cmd_migrate)
+
+    process = commands.add_parser("process", help="derive thumbnails, OCR text and tables from the notes")
+    process.add_argument("--out", default="opencv", help="processed data folder (default: opencv)")
+    process.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    process.set_defaults(handler=cmd_process)
+
+    history = commands.add_parser("history", help="list a note's revisions, or restore one")
+    history.add_argument("note", help="note name or path")
+    history.add_argument("--restore", type=int, default=None, metavar="REVISION", help="write this revision back")
+    history.set_defaults(handler=cmd_history)
+
+    trash = commands.add_parser("trash", help="list deleted notes, or restore one")
+    trash.add_argument("--restore", type=int, default=None, metavar="ID", help="move this note back")
+    trash.set_defaults(handler=cmd_trash)
+
+    gc = commands.add_parser("gc", help="delete pictures no note, revision or trashed note uses")
+    gc.add_argument("--min-age", type=float, default=24, metavar="HOURS", help="keep assets newer than this (default: 24)")
+    gc.set_defaults(handler=cmd_gc)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not os.path.isdir(args.folder):
+        print(json.dumps({"command": args.command, "error": f"No such folder: {args.folder}"}))
+        return 1
+    result = args.handler(args)
+    print(json.dumps(result, indent=2 if args.pretty else None, ensure_ascii=False))
+    return 1 if result.get("error") else 0
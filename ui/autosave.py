@@ -0,0 +1,84 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from core.atomic import content_digest, write_if_changed
+from core.trace import span
+from ui.workers import TaskRunner
+
+
+AUTOSAVE_DELAY_MS = 1500
+
+
+class AutoSaver(QObject):
+    """Saves an editor's document a moment after typing stops, without blocking the GUI.
+
+    Only the snapshot (serialize()) runs on the GUI thread; hashing and the
+    atomic write happen on a single worker thread, so saves land in order and
+    unchanged content is never rewritten.
+    """
+
+    saved = pyqtSignal(str, bool)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, document, get_path, serialize, delay_ms=AUTOSAVE_DELAY_MS, write=write_if_changed, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.get_path = get_path
+        self.serialize = serialize
+        # write(path, data, previous_digest) -> (digest, written), run on the writer thread
+        self.write = write
+        self.digests = {}
+        self.writer = TaskRunner(max_threads=1, parent=self)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.save_if_modified)
+        self.document.contentsChanged.connect(self.timer.start)
+
+    def set_document(self, document):
+        """Follow another editor's document, e.g. when switching to the large-file editor."""
+        if document is self.document:
+            return
+        self.document.contentsChanged.disconnect(self.timer.start)
+        self.document = document
+        self.document.contentsChanged.connect(self.timer.start)
+
+    def mark_clean(self, path, content=None, digest=None):
+        """Record content (or its digest) as what is on disk at path, e.g. right after opening it."""
+        self.digests[path] = digest if digest is not None else content_digest(content)
+        self.document.setModified(False)
+
+    def save_if_modified(self):
+        if self.document.isModified():
+            self.save_now()
+
+    def save_now(self):
+        with span("save.snapshot"):
+            path = self.get_path()
+            if not path:
+                return
+            self.timer.stop()
+            # The text itself is the snapshot. QTextDocument.clone() would let the worker
+            # serialize, but copying the document costs far more than exporting it
+            # (~1 s against ~25 ms for toPlainText() at 5 MB), so only this copy stays here.
+            data = self.serialize()
+            self.document.setModified(False)
+            self.writer.submit(
+                self.write, (path, data, self.digests.get(path)),
+                on_result=lambda result: self._on_written(path, result),
+                on_error=lambda e: self._on_failed(path, e),
+            )
+
+    def _on_written(self, path, result):
+        digest, written = result
+        self.digests[path] = digest
+        self.saved.emit(path, written)
+
+    def _on_failed(self, path, error):
+        # Keep the edits flagged so the next save tries again
+        self.document.setModified(True)
+        self.failed.emit(path, str(error))
+
+    def flush(self, msecs=-1):
+        self.save_if_modified()
+        return self.writer.wait(msecs)
@@ -0,0 +1,117 @@
+import os
+import time
+from collections import deque
+
+from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt5.QtWebEngineWidgets import QWebEnginePage
+
+from core.catalog import CATALOG_FILENAME, Catalog
+from core.clip import Clip, write_clips
+from core.index import INDEX_DIRNAME
+from ui.workers import TaskRunner
+
+
+# Clips arriving within this window are written in one batch
+CLIP_BATCH_MS = 300
+CLIP_LOAD_TIMEOUT_MS = 30_000
+
+
+class ClipWriter(QObject):
+    """Writes web clips into the notes folder on a background thread, in batches.
+
+    written carries the names of the new notes once they are on disk, so the
+    notes list can index just those instead of waiting for the folder watcher.
+    """
+
+    written = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, database_folder, parent=None):
+        super().__init__(parent)
+        # Only read here, to place new notes where the catalog expects them
+        self.catalog = Catalog(database_folder, os.path.join(database_folder, INDEX_DIRNAME, CATALOG_FILENAME))
+        self.queue = []
+        self.writer = TaskRunner(max_threads=1, parent=self)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(CLIP_BATCH_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def add(self, clip):
+        self.queue.append(clip)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def pending(self):
+        return len(self.queue) + len(self.writer.active)
+
+    def flush(self):
+        batch, self.queue = self.queue, []
+        if batch:
+            self.writer.submit(
+                write_clips, (self.catalog, batch),
+                on_result=self.written.emit,
+                on_error=lambda e: self.failed.emit(str(e)),
+            )
+
+
+class PageClipper(QObject):
+    """Clips a list of URLs by loading them one after another in a hidden page.
+
+    Only one page is ever loading, however many URLs are queued, so bulk
+    clipping costs one renderer and never blocks the GUI.
+    """
+
+    clipped = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, writer, profile, parent=None):
+        super().__init__(parent)
+        self.writer = writer
+        self.profile = profile
+        self.page = None
+        self.urls = deque()
+        self.current = None
+
+        self.timeout = QTimer(self)
+        self.timeout.setSingleShot(True)
+        self.timeout.setInterval(CLIP_LOAD_TIMEOUT_MS)
+        self.timeout.timeout.connect(lambda: self.page.triggerAction(QWebEnginePage.Stop))
+
+    def clip_urls(self, urls):
+        self.urls.extend(urls)
+        if self.current is None:
+            self.load_next()
+
+    def remaining(self):
+        return len(self.urls) + (self.current is not None)
+
+    def load_next(self):
+        self.current = self.urls.popleft() if self.urls else None
+        if self.current is None:
+            if self.page is not None:
+                # Give the renderer back once the queue is empty
+                self.page.deleteLater()
+                self.page = None
+            return
+        if self.page is None:
+            self.page = QWebEnginePage(self.profile, self)
+            self.page.loadFinished.connect(self.on_load_finished)
+        self.timeout.start()
+        self.page.load(QUrl(self.current))
+
+    def on_load_finished(self, ok):
+        self.timeout.stop()
+        url = self.current
+        if not ok:
+            self.failed.emit(url, "page did not load")
+            self.load_next()
+            return
+        # The next URL is only loaded once this page's HTML has been read
+        self.page.toHtml(lambda markup: self.on_html(url, markup))
+
+    def on_html(self, url, markup):
+        self.writer.add(Clip(self.page.title(), url, markup, time.time()))
+        self.clipped.emit(url)
+        self.load_next()
@@ -1,39 +1,125 @@
 import os
+import time
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QLabel,
-    QMessageBox, QFileDialog
+    QMessageBox, QFileDialog, QStackedWidget, QInputDialog
 )
 from PyQt5.QtGui import (
     QFont, QIcon, QTextCharFormat, QTextCursor,
-    QTextImageFormat, QPixmap
+    QTextImageFormat, QTextDocument, QImage, QColor
 )
-from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtCore import QPoint, QSize, Qt, QUrl
+
+from core.assets import ASSET_SCHEME, ASSETS_DIRNAME, AssetStore, asset_url
+from core.atomic import write_if_changed
+from core.extract import read_text_file
+from core.history import VersionStore
+from core.note_archive import NOTE_EXT, NoteArchive, is_note_archive, read_note_body, save_note_archive
+from core.trace import span
+from ui.autosave import AUTOSAVE_DELAY_MS, AutoSaver
+from ui.image_assets import import_image, import_image_file, load_thumbnail
+from ui.large_editor import LARGE_AUTOSAVE_DELAY_MS, LARGE_EDIT_BYTES, LargeTextEdit
+from ui.workers import TaskRunner
+
+
+NOTE_FILE_FILTERS = "NoteNinja Notes (*.nnote);;Text Files (*.txt);;All Files (*)"
 
 
 class ImageTextEdit(QTextEdit):
+    def __init__(self, asset_store, parent=None):
+        super().__init__(parent)
+        self.asset_store = asset_store
+        # Set while a .nnote is open, so its pictures are read from the archive
+        self.archive = None
+        self.image_tasks = TaskRunner(parent=self)
+        self.placeholder = QImage(1, 1, QImage.Format_RGB32)
+        self.placeholder.fill(QColor("#e4e4e4"))
+        self.unloaded = set()
+
     def insertFromMimeData(self, source):
         if source.hasImage():
             image = source.imageData()
             if image:
-                cursor = self.textCursor()
-                pixmap = QPixmap.fromImage(image)
-                scaled_pixmap = pixmap.scaledToWidth(300, Qt.SmoothTransformation)
-                image_name = f'image_{id(image)}.png'
-                scaled_pixmap.save(image_name, "PNG")
-
-                image_format = QTextImageFormat()
-                image_format.setName(image_name)
-                image_format.setWidth(scaled_pixmap.width())
-                image_format.setHeight(scaled_pixmap.height())
-                cursor.insertImage(image_format)
+                self.insert_asset(import_image, QImage(image))
         else:
             super().insertFromMimeData(source)
 
+    def insert_asset(self, importer, source):
+        # Hashing, storing and scaling happen on a worker; the cursor keeps
+        # its place if the user goes on typing in the meantime
+        cursor = QTextCursor(self.textCursor())
+        self.image_tasks.submit(
+            importer, (self.asset_store, source),
+            on_result=lambda result: self.place_image(cursor, *result),
+            on_error=lambda e: QMessageBox.warning(self, "Error", f"Failed to insert image:\n{e}"),
+        )
+
+    def place_image(self, cursor, name, thumbnail):
+        with span("image.place"):
+            url = asset_url(name)
+            # Registered once, so repaints reuse the decoded thumbnail
+            self.document().addResource(QTextDocument.ImageResource, QUrl(url), thumbnail)
+
+            image_format = QTextImageFormat()
+            image_format.setName(url)
+            image_format.setWidth(thumbnail.width())
+            image_format.setHeight(thumbnail.height())
+            cursor.insertImage(image_format)
+
+    def loadResource(self, resource_type, url):
+        if resource_type == QTextDocument.ImageResource and url.scheme() == ASSET_SCHEME:
+            # Qt asks for every image while laying the document out; decoding waits
+            # until the image is actually on screen (see paintEvent)
+            self.unloaded.add(url.toString())
+            return self.placeholder
+        return super().loadResource(resource_type, url)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.unloaded:
+            self.load_visible_images()
+
+    def load_visible_images(self):
+        viewport = self.viewport()
+        block = self.cursorForPosition(QPoint(0, 0)).block()
+        last = self.cursorForPosition(QPoint(viewport.width(), viewport.height())).block().blockNumber()
+        if block.blockNumber() > last:
+            # Hit-testing the top edge is unreliable while the layout is still running
+            block = self.document().firstBlock()
+        while block.isValid() and block.blockNumber() <= last:
+            fragments = block.begin()
+            while not fragments.atEnd():
+                char_format = fragments.fragment().charFormat()
+                name = char_format.toImageFormat().name() if char_format.isImageFormat() else None
+                if name in self.unloaded:
+                    self.unloaded.discard(name)
+                    self.image_tasks.submit(
+                        load_thumbnail, (self.asset_store, QUrl(name).path(), self.archive),
+                        on_result=lambda image, name=name: self.show_resource(name, image),
+                        on_error=lambda e: None,
+                    )
+                fragments += 1
+            block = block.next()
+
+    def show_resource(self, name, image):
+        # Asset names are content hashes, so a late result can't land on the wrong picture
+        self.document().addResource(QTextDocument.ImageResource, QUrl(name), image)
+        self.viewport().update()
+
+    def set_archive(self, archive):
+        if self.archive is not None and self.archive is not archive:
+            self.archive.close()
+        self.archive = archive
+
 
 class TextEditorTab(QWidget):
     def __init__(self):
         super().__init__()
         self.current_filename = None
+        self.large_mode = False
+        # Line endings of large notes other than "\n", restored when they are saved
+        self.line_endings = {}
+        self.toolbar_buttons = {}
         self.init_ui()
 
     def init_ui(self):
@@ -41,7 +127,7 @@ class TextEditorTab(QWidget):
             QWidget {
                 background-color: #e8faff;
             }
-            QTextEdit {
+            QTextEdit, QPlainTextEdit {
                 background-color: rgba(255, 255, 255, 0.65);
                 border: none;
                 border-radius: 10px;
@@ -94,6 +180,7 @@ class TextEditorTab(QWidget):
 
             container = QWidget()
             container.setLayout(v_layout)
+            self.toolbar_buttons[label_text] = button
             return container
 
         buttons_with_labels = [
@@ -104,6 +191,7 @@ class TextEditorTab(QWidget):
             ("undo.png", "Undo", self.text_editor_undo, "Undo"),
             ("bold.png", "Bold Selected Text", self.toggle_bold, "Bold"),
             ("camera.png", "Insert Image from File", self.insert_image_from_file, "Image"),
+            ("undo.png", "Earlier Versions of This Note", self.show_history, "History"),
         ]
 
         for icon_file, tooltip, callback, label_text in buttons_with_labels:
@@ -112,48 +200,224 @@ class TextEditorTab(QWidget):
 
         toolbar_layout.addStretch()
 
-        self.text_editor = ImageTextEdit()
+        self.save_status = QLabel("")
+        toolbar_layout.addWidget(self.save_status)
+
+        self.asset_store = AssetStore(os.path.join("database", ASSETS_DIRNAME))
+        self.history = VersionStore("database")
+        self.text_editor = ImageTextEdit(self.asset_store)
         self.text_editor.setPlaceholderText("Start typing your note here...")
         self.text_editor.setFont(QFont("Arial", 12))
 
+        self.large_editor = LargeTextEdit()
+        self.large_editor.setFont(QFont("Monospace", 11))
+        self.large_editor.loadProgress.connect(lambda percent: self.save_status.setText(f"Loading {percent}%…"))
+        self.large_editor.loaded.connect(self.on_large_note_loaded)
+        self.large_editor.loadFailed.connect(self.on_large_note_failed)
+        self.large_editor.undoHistoryCleared.connect(
+            lambda: self.save_status.setText("Undo history cleared to free memory")
+        )
+
+        self.editor_stack = QStackedWidget()
+        self.editor_stack.addWidget(self.text_editor)
+        self.editor_stack.addWidget(self.large_editor)
+
+        self.autosaver = AutoSaver(
+            self.text_editor.document(), lambda: self.current_filename, self.serialize_note,
+            write=self.write_note, parent=self
+        )
+        self.autosaver.saved.connect(self.on_note_saved)
+        self.autosaver.failed.connect(self.on_save_failed)
+        self.explicit_save = False
+
         layout.addLayout(toolbar_layout)
-        layout.addWidget(self.text_editor)
+        layout.addWidget(self.editor_stack)
         layout.setContentsMargins(10, 10, 10, 10)
         layout.setSpacing(12)
         self.setLayout(layout)
 
+    def editor(self):
+        return self.large_editor if self.large_mode else self.text_editor
+
+    def set_large_mode(self, enabled):
+        """Switch between the rich editor and the plain one used for very large notes."""
+        if enabled == self.large_mode:
+            return
+        self.large_mode = enabled
+        self.editor_stack.setCurrentWidget(self.editor())
+        self.autosaver.set_document(self.editor().document())
+        self.autosaver.timer.setInterval(LARGE_AUTOSAVE_DELAY_MS if enabled else AUTOSAVE_DELAY_MS)
+        for label in ("Bold", "Image"):
+            self.toolbar_buttons[label].setEnabled(not enabled)
+        if not enabled:
+            self.large_editor.cancel_load()
+            # Don't keep megabytes of text around once the note is closed
+            self.large_editor.clear()
+
     def new_note(self):
+        self.autosaver.flush()
+        self.set_large_mode(False)
         self.text_editor.clear()
+        self.text_editor.set_archive(None)
         self.current_filename = None
+        self.text_editor.document().setModified(False)
+        self.save_status.setText("")
 
     def open_note(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Open Note", "", "Text Files (*.txt);;All Files (*)"
+            self, "Open Note", "", NOTE_FILE_FILTERS
         )
         if file_path:
+            self.autosaver.flush()
             try:
-                with open(file_path, "r", encoding="utf-8") as file:
-                    content = file.read()
+                large = os.path.getsize(file_path) >= LARGE_EDIT_BYTES
+            except OSError:
+                large = False
+            if large and not file_path.lower().endswith((".html", ".htm", NOTE_EXT)):
+                self.open_large_note(file_path)
+                return
+            self.set_large_mode(False)
+            try:
+                if is_note_archive(file_path):
+                    self.open_archive(file_path)
+                else:
+                    with open(file_path, "r", encoding="utf-8") as file:
+                        content = file.read()
+                    self.text_editor.set_archive(None)
                     self.text_editor.setText(content)
-                    self.current_filename = file_path
+                self.current_filename = file_path
+                self.autosaver.mark_clean(file_path, self.serialize_note())
+                self.save_status.setText("")
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Failed to open file:\n{str(e)}")
 
+    def open_archive(self, file_path):
+        # Only the index and the body are read here; pictures follow as they scroll into view
+        with span("editor.open_archive"):
+            archive = NoteArchive(file_path)
+            try:
+                body = archive.read_body()
+            except Exception:
+                archive.close()
+                raise
+            self.text_editor.set_archive(archive)
+            self.text_editor.setHtml(body)
+
+    def open_large_note(self, file_path):
+        self.set_large_mode(True)
+        # Nothing is autosaved until the whole file is in the editor
+        self.current_filename = None
+        self.save_status.setText("Loading…")
+        self.large_editor.load_file(file_path)
+
+    def on_large_note_loaded(self, file_path, digest):
+        self.current_filename = file_path
+        self.line_endings[file_path] = self.large_editor.newline
+        self.autosaver.mark_clean(file_path, digest=digest)
+        self.save_status.setText("Large note: plain text editing")
+
+    def on_large_note_failed(self, file_path, message):
+        self.save_status.setText("")
+        QMessageBox.warning(self, "Error", f"Failed to open file:\n{message}")
+
     def save_note(self):
+        if self.large_editor.is_loading():
+            return
         if self.current_filename is None:
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, "Save Note", "", "Text Files (*.txt);;All Files (*)"
+            file_path, selected_filter = QFileDialog.getSaveFileName(
+                self, "Save Note", "", NOTE_FILE_FILTERS
             )
             if not file_path:
                 return
+            if selected_filter.startswith("NoteNinja") and not os.path.splitext(file_path)[1]:
+                file_path += NOTE_EXT
             self.current_filename = file_path
 
+        # The write happens in the background; the status label reports the outcome
+        with span("editor.save"):
+            self.explicit_save = True
+            self.save_status.setText("Saving…")
+            self.autosaver.save_now()
+
+    def serialize_note(self):
+        if self.large_mode:
+            return self.large_editor.toPlainText()
+        if self.current_filename and self.current_filename.lower().endswith((".html", ".htm", NOTE_EXT)):
+            return self.text_editor.toHtml()
+        return self.text_editor.toPlainText()
+
+    def write_note(self, path, data, previous_digest):
+        # Runs on the autosaver's writer thread
+        newline = self.line_endings.get(path, "\n")
+        if newline != "\n":
+            # The editor works with "\n"; the file keeps the line endings it came with
+            data = data.replace("\n", newline)
+        self.keep_original(path)
+        if is_note_archive(path):
+            result = save_note_archive(path, data, previous_digest, self.asset_store, self.text_editor.archive)
+        else:
+            result = write_if_changed(path, data, previous_digest)
+        if result[1]:
+            try:
+                self.history.record(path, data)
+            except Exception as e:
+                # The note itself is saved; only its history is behind
+                print(f"Could not record a revision of {path}: {e}")
+        return result
+
+    def keep_original(self, path):
+        # A note saved for the first time since history began keeps what it was before
         try:
-            with open(self.current_filename, "w", encoding="utf-8") as file:
-                file.write(self.text_editor.toPlainText())
-                QMessageBox.information(self, "Saved", "Note saved successfully!")
+            if os.path.exists(path) and not self.history.has_history(path):
+                original = read_note_body(path) if is_note_archive(path) else read_text_file(path)
+                self.history.record(path, original, saved=os.path.getmtime(path))
         except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to save file:\n{str(e)}")
+            print(f"Could not record the original of {path}: {e}")
+
+    def show_history(self):
+        path = self.current_filename
+        if path is None or self.large_editor.is_loading():
+            return
+        self.autosaver.flush()
+        # Whatever gets loaded, the version open now stays in the history
+        self.history.seal(path)
+        revisions = self.history.revisions(path)
+        if not revisions:
+            QMessageBox.information(self, "History", "This note has no earlier versions yet.")
+            return
+        # Numbered, so two versions saved in the same minute still have distinct labels
+        labels = [
+            f"{len(revisions) - i}.  {time.strftime('%Y-%m-%d %H:%M', time.localtime(revision.saved))}"
+            f"  ·  {revision.size / 1024:.1f} KB"
+            for i, revision in enumerate(revisions)
+        ]
+        label, ok = QInputDialog.getItem(self, "History", "Load an earlier version of this note:", labels, 0, False)
+        if not ok:
+            return
+        try:
+            content = self.history.read(revisions[labels.index(label)].id)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Could not read that version:\n{e}")
+            return
+        # Loaded as an edit, so it is saved (and recorded) like any other change
+        if self.large_mode:
+            self.large_editor.setPlainText(content)
+        elif is_note_archive(path) or path.lower().endswith((".html", ".htm")):
+            self.text_editor.setHtml(content)
+        else:
+            self.text_editor.setText(content)
+        self.editor().document().setModified(True)
+
+    def on_note_saved(self, path, written):
+        self.explicit_save = False
+        if path == self.current_filename:
+            self.save_status.setText("Saved" if written else "No changes")
+
+    def on_save_failed(self, path, message):
+        self.save_status.setText("Save failed")
+        if self.explicit_save:
+            self.explicit_save = False
+            QMessageBox.warning(self, "Error", f"Failed to save file:\n{message}")
 
     def clear_editor(self):
         reply = QMessageBox.question(
@@ -164,9 +428,11 @@ class TextEditorTab(QWidget):
             self.new_note()
 
     def text_editor_undo(self):
-        self.text_editor.undo()
+        self.editor().undo()
 
     def toggle_bold(self):
+        if self.large_mode:
+            return
         cursor = self.text_editor.textCursor()
         if not cursor.hasSelection():
             return
@@ -182,12 +448,4 @@ class TextEditorTab(QWidget):
             self, "Insert Image", "", "Images (*.png *.jpg *.bmp *.gif);;All Files (*)"
         )
         if file_path:
-            cursor = self.text_editor.textCursor()
-            pixmap = QPixmap(file_path)
-            scaled = pixmap.scaledToWidth(300, Qt.SmoothTransformation)
-
-            image_format = QTextImageFormat()
-            image_format.setName(file_path)
-            image_format.setWidth(scaled.width())
-            image_format.setHeight(scaled.height())
-            cursor.insertImage(image_format)
+            self.text_editor.insert_asset(import_image_file, file_path)
@@ -0,0 +1,71 @@
+import os
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, Qt
+from PyQt5.QtGui import QImage
+
+from core.atomic import atomic_write
+from core.trace import traced
+
+
+THUMB_WIDTH = 300
+
+
+# These run on worker threads: QImage (unlike QPixmap) is safe off the GUI thread.
+def png_bytes(image):
+    """The image encoded as PNG, or None if Qt could not encode it."""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    ok = image.save(buffer, "PNG")
+    buffer.close()
+    return bytes(data) if ok else None
+
+
+def make_thumbnail(store, name, width=THUMB_WIDTH):
+    thumb_path = store.thumbnail_path(name, width)
+    thumbnail = QImage(thumb_path)
+    if not thumbnail.isNull():
+        return thumbnail
+
+    image = QImage(store.path_for(name))
+    if image.isNull():
+        raise ValueError(f"Unsupported image: {name}")
+    thumbnail = image.scaledToWidth(width, Qt.SmoothTransformation) if image.width() > width else image
+
+    data = png_bytes(thumbnail)
+    if data is not None:
+        # Two workers may make the same thumbnail; each writes its own temporary file
+        os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+        atomic_write(thumb_path, data)
+    return thumbnail
+
+
+@traced("image.import")
+def import_image(store, image):
+    data = png_bytes(image)
+    if data is None:
+        raise ValueError("Could not encode the image")
+    name = store.put_bytes(data, "png")
+    return name, make_thumbnail(store, name)
+
+
+@traced("image.import")
+def import_image_file(store, file_path):
+    if QImage(file_path).isNull():
+        raise ValueError("Not an image file")
+    name = store.put_file(file_path)
+    return name, make_thumbnail(store, name)
+
+
+@traced("image.decode")
+def load_thumbnail(store, name, archive=None, width=THUMB_WIDTH):
+    """Thumbnail for an image shown in a note, from the note's own archive if it has one."""
+    if archive is not None and archive.has_asset(name):
+        thumbnail = QImage.fromData(archive.read_thumbnail(name) or b"")
+        if not thumbnail.isNull():
+            return thumbnail
+        image = QImage.fromData(archive.read_asset(name))
+        if image.isNull():
+            raise ValueError(f"Unsupported image: {name}")
+        return image.scaledToWidth(width, Qt.SmoothTransformation) if image.width() > width else image
+    return make_thumbnail(store, name, width)
@@ -0,0 +1,172 @@
+import codecs
+import hashlib
+import io
+import os
+from collections import deque
+
+from PyQt5.QtCore import QTimer, pyqtSignal
+from PyQt5.QtGui import QTextCursor, QTextDocument
+from PyQt5.QtWidgets import QPlainTextEdit
+
+from core.trace import span
+from ui.workers import TaskRunner
+
+
+# Notes at least this big open in the plain-text editor
+LARGE_EDIT_BYTES = 2 * 1024 * 1024
+READ_CHUNK_BYTES = 1024 * 1024
+# Text appended per event loop turn; small enough to stay within a frame or two
+APPEND_CHUNK_CHARS = 64 * 1024
+# Undo keeps the text of every edit; past this many changed characters (~64 MB),
+# which typing never reaches, the history is dropped rather than grow without end
+UNDO_BUDGET_CHARS = 32 * 1024 * 1024
+# Snapshotting a huge document takes a noticeable moment, so it happens less often
+LARGE_AUTOSAVE_DELAY_MS = 10000
+
+
+def newline_style(seen):
+    # What IncrementalNewlineDecoder.newlines saw; a mixed file is saved with CRLF if it had any
+    if isinstance(seen, tuple):
+        return "\r\n" if "\r\n" in seen else seen[0]
+    return seen or "\n"
+
+
+def read_text_chunks(file_path, chunk_bytes, task):
+    """Report the text chunk by chunk with "\n" line breaks; returns (digest, newline).
+
+    The digest is the one autosave compares against; newline is the file's own
+    line ending, which saves put back.
+    """
+    # Translating here also keeps a "\r\n" split across two chunks from becoming two breaks
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True)
+    # Same digest as core.atomic.content_digest, without re-encoding the whole text on the GUI thread
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        while not task.is_cancelled():
+            data = f.read(chunk_bytes)
+            digest.update(data)
+            text = decoder.decode(data, final=not data)
+            if text:
+                task.report(text)
+            if not data:
+                break
+    return digest.hexdigest(), newline_style(decoder.newlines)
+
+
+class LargeTextEdit(QPlainTextEdit):
+    """Plain-text editor for multi-megabyte notes.
+
+    The file is read on a worker and appended a slice per event loop turn, so
+    the window keeps painting while it loads. Loading bypasses the undo stack,
+    and undo history is only dropped, with undoHistoryCleared, once the edits in
+    it add up to UNDO_BUDGET_CHARS.
+    """
+
+    loadProgress = pyqtSignal(int)
+    loaded = pyqtSignal(str, str)
+    loadFailed = pyqtSignal(str, str)
+    undoHistoryCleared = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Unwrapped lines keep relayout cheap on huge documents
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.reader = TaskRunner(max_threads=1, parent=self)
+        self.loading_path = None
+        self.expected_chars = 1
+        self.appended_chars = 0
+        self.read_done = False
+        self.digest = None
+        self.newline = "\n"
+        self.pending = deque()
+        self.undo_chars = 0
+
+        self.append_timer = QTimer(self)
+        self.append_timer.setInterval(0)
+        self.append_timer.timeout.connect(self.append_next)
+        self.document().contentsChange.connect(self.count_undo_chars)
+        self.document().undoCommandAdded.connect(self.limit_undo)
+
+    def is_loading(self):
+        return self.loading_path is not None
+
+    def load_file(self, file_path):
+        self.cancel_load()
+        self.setUndoRedoEnabled(False)
+        self.clear()
+        self.setReadOnly(True)
+        self.loading_path = file_path
+        self.expected_chars = max(1, os.path.getsize(file_path))
+        self.appended_chars = 0
+        self.read_done = False
+        self.digest = None
+        self.newline = "\n"
+        self.reader.submit(
+            read_text_chunks, (file_path, READ_CHUNK_BYTES),
+            on_progress=self.enqueue,
+            on_result=lambda result: self.on_read_finished(file_path, *result),
+            on_error=lambda e: self.on_read_failed(file_path, e),
+            channel="load",
+        )
+
+    def cancel_load(self):
+        self.reader.cancel("load")
+        self.append_timer.stop()
+        self.pending.clear()
+        if self.loading_path is not None:
+            self.loading_path = None
+            self.setReadOnly(False)
+            self.setUndoRedoEnabled(True)
+
+    def enqueue(self, text):
+        for start in range(0, len(text), APPEND_CHUNK_CHARS):
+            self.pending.append(text[start:start + APPEND_CHUNK_CHARS])
+        self.append_timer.start()
+
+    def append_next(self):
+        if self.pending:
+            with span("editor.large_append"):
+                text = self.pending.popleft()
+                cursor = QTextCursor(self.document())
+                cursor.movePosition(QTextCursor.End)
+                cursor.insertText(text)
+                self.appended_chars += len(text)
+            self.loadProgress.emit(min(99, self.appended_chars * 100 // self.expected_chars))
+        elif self.read_done:
+            self.finish_load()
+        else:
+            self.append_timer.stop()
+
+    def on_read_finished(self, file_path, digest, newline):
+        if file_path == self.loading_path:
+            self.read_done = True
+            self.digest = digest
+            self.newline = newline
+            self.append_timer.start()
+
+    def on_read_failed(self, file_path, error):
+        if file_path == self.loading_path:
+            self.cancel_load()
+            self.loadFailed.emit(file_path, str(error))
+
+    def finish_load(self):
+        file_path = self.loading_path
+        self.append_timer.stop()
+        self.loading_path = None
+        self.setUndoRedoEnabled(True)
+        self.undo_chars = 0
+        self.setReadOnly(False)
+        self.document().setModified(False)
+        self.moveCursor(QTextCursor.Start)
+        self.loaded.emit(file_path, self.digest)
+
+    def count_undo_chars(self, position, removed, added):
+        if self.isUndoRedoEnabled():
+            self.undo_chars += removed + added
+
+    def limit_undo(self):
+        # QTextDocument can't drop single old steps, only the whole stack
+        if self.undo_chars > UNDO_BUDGET_CHARS:
+            self.document().clearUndoRedoStacks(QTextDocument.UndoStack)
+            self.undo_chars = 0
+            self.undoHistoryCleared.emit()
@@ -0,0 +1,185 @@
+from bisect import bisect_left
+
+from PyQt5.QtCore import QStringListModel, Qt
+from PyQt5.QtGui import QFont, QFontMetrics, QPalette
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate
+
+from ui.workers import TaskRunner
+
+# Character positions to draw in bold, for rows matched by the name filter
+HighlightRole = Qt.UserRole + 1
+
+
+def build_name_index(names):
+    # NumPy is imported on the worker thread rather than during startup
+    from core.fuzzy import TrigramIndex
+    return TrigramIndex(names)
+
+
+class NotesListModel(QStringListModel):
+    """Note names for a QListView, filtered on plain Python lists.
+
+    Rows live in QStringListModel's C++ storage so the view's layout pass never
+    calls back into Python; only data() for the rows being painted does.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.lowered = []
+        self.filtered = False
+        self.tooltips = {}
+        self.highlights = {}
+        # Built in the background; inserts and removals made meanwhile are replayed on it
+        self.fuzzy = None
+        self.fuzzy_edits = []
+        self.fuzzy_tasks = TaskRunner(max_threads=1, parent=self)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.ToolTipRole:
+            return self.tooltips.get(super().data(index, Qt.DisplayRole))
+        if role == HighlightRole:
+            return self.highlights.get(super().data(index, Qt.DisplayRole))
+        return super().data(index, role)
+
+    def flags(self, index):
+        return super().flags(index) & ~Qt.ItemIsEditable
+
+    def is_filtered(self):
+        return self.filtered
+
+    def contains(self, name):
+        row = bisect_left(self.names, name)
+        return row < len(self.names) and self.names[row] == name
+
+    def name_at(self, row):
+        return self.index(row).data()
+
+    def set_names(self, names):
+        self.names = sorted(names)
+        self.lowered = [name.lower() for name in self.names]
+        self.filtered = False
+        self.tooltips = {}
+        self.highlights = {}
+        self.setStringList(self.names)
+        self.fuzzy = None
+        self.fuzzy_edits = []
+        self.fuzzy_tasks.submit(
+            build_name_index, (list(self.names),),
+            on_result=self.on_fuzzy_built,
+            on_error=lambda e: print(f"Fuzzy name index unavailable: {e}"),
+            channel="build",
+        )
+
+    def on_fuzzy_built(self, fuzzy):
+        for insert, name in self.fuzzy_edits:
+            if insert:
+                fuzzy.add(name)
+            else:
+                fuzzy.remove(name)
+        self.fuzzy_edits = []
+        self.fuzzy = fuzzy
+
+    def fuzzy_matches(self, term, limit):
+        """Ranked, typo-tolerant matches, or None while the index is still being built."""
+        if self.fuzzy is None:
+            return None
+        return self.fuzzy.search(term, limit)
+
+    def name_matches(self, term, within=None):
+        term = term.lower()
+        if within is not None:
+            # A narrower query only needs to re-check the previous matches
+            return [name for name in within if term in name.lower()]
+        return [name for name, low in zip(self.names, self.lowered) if term in low]
+
+    def show_all(self):
+        if not self.filtered and not self.tooltips:
+            return
+        self.filtered = False
+        self.tooltips = {}
+        self.highlights = {}
+        self.setStringList(self.names)
+
+    def show_results(self, names, tooltips=None, highlights=None):
+        self.filtered = True
+        self.tooltips = tooltips or {}
+        self.highlights = highlights or {}
+        self.setStringList(names)
+
+    def append_results(self, names, tooltips=None):
+        # Rows are added rather than reset so scroll position and selection survive
+        row = self.rowCount()
+        self.tooltips.update(tooltips or {})
+        self.insertRows(row, len(names))
+        for offset, name in enumerate(names):
+            self.setData(self.index(row + offset), name)
+
+    def insert_name(self, name):
+        row = bisect_left(self.names, name)
+        if row < len(self.names) and self.names[row] == name:
+            return False
+        self.names.insert(row, name)
+        self.lowered.insert(row, name.lower())
+        self.edit_fuzzy(True, name)
+        if not self.filtered:
+            self.insertRows(row, 1)
+            self.setData(self.index(row), name)
+        return True
+
+    def remove_name(self, name):
+        row = bisect_left(self.names, name)
+        if row == len(self.names) or self.names[row] != name:
+            return False
+        del self.names[row]
+        del self.lowered[row]
+        self.edit_fuzzy(False, name)
+        if not self.filtered:
+            self.removeRows(row, 1)
+        return True
+
+    def edit_fuzzy(self, insert, name):
+        if self.fuzzy is None:
+            self.fuzzy_edits.append((insert, name))
+        elif insert:
+            self.fuzzy.add(name)
+        else:
+            self.fuzzy.remove(name)
+
+
+class HighlightDelegate(QStyledItemDelegate):
+    """Draws the characters a name filter matched in bold, like a quick-open list."""
+
+    def paint(self, painter, option, index):
+        positions = index.data(HighlightRole)
+        if not positions:
+            super().paint(painter, option, index)
+            return
+        self.initStyleOption(option, index)
+        text, option.text = option.text, ""
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+        rect = style.subElementRect(QStyle.SE_ItemViewItemText, option, option.widget).adjusted(3, 0, -3, 0)
+        role = QPalette.HighlightedText if option.state & QStyle.State_Selected else QPalette.Text
+        bold = QFont(option.font)
+        bold.setBold(True)
+        painter.save()
+        painter.setClipRect(rect)
+        painter.setPen(option.palette.color(role))
+        x = rect.left()
+        for start, end, marked in _runs(text, positions):
+            font = bold if marked else option.font
+            painter.setFont(font)
+            painter.drawText(x, rect.top(), rect.right() - x, rect.height(), Qt.AlignVCenter, text[start:end])
+            x += QFontMetrics(font).horizontalAdvance(text[start:end])
+        painter.restore()
+
+
+def _runs(text, positions):
+    marked = set(positions)
+    start = 0
+    for i in range(1, len(text) + 1):
+        if i == len(text) or (i in marked) != (start in marked):
+            yield start, i, start in marked
+            start = i
@@ -0,0 +1,209 @@
+import html
+import json
+
+from PyQt5.QtCore import QObject, QUrl, pyqtSlot
+from PyQt5.QtWebChannel import QWebChannel
+
+from core.paging import PagedTextFile
+from core.render import (
+    RENDER_STYLE, csv_rows_html, json_children_html, json_node_html, json_summary, json_value_at, sniff_dialect,
+    split_csv_header
+)
+
+
+# qwebchannel.js is loaded from Qt's resources, so the page must be allowed to see qrc:
+PAGED_BASE_URL = QUrl("qrc:///")
+
+PAGED_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+<style>{style}
+  #status {{ font-family: sans-serif; font-size: 11px; color: #777; padding: 6px 0; }}
+</style></head>
+<body>
+{body}
+<div id="status"></div>
+<script>
+  var token = {token};
+  var next = {next};
+  var size = {size};
+  var pager = null;
+  var loading = false;
+  var content = document.getElementById("content");
+  var statusLine = document.getElementById("status");
+
+  function showStatus() {{
+    statusLine.textContent = next < 0 ? "" :
+      "Loaded " + (next / 1048576).toFixed(1) + " of " + (size / 1048576).toFixed(1) + " MB, scroll for more";
+  }}
+
+  // Keep roughly two screens of text below the viewport
+  function loadMore() {{
+    if (loading || next < 0 || pager === null) return;
+    var remaining = document.body.scrollHeight - (window.scrollY + window.innerHeight);
+    if (remaining > 2 * window.innerHeight) return;
+    loading = true;
+    pager.read_page(token, next, function (reply) {{
+      var page = JSON.parse(reply);
+      loading = false;
+      if (page.token !== token) return;
+      content.insertAdjacentHTML("beforeend", page.html);
+      next = page.next;
+      showStatus();
+      loadMore();
+    }});
+  }}
+
+  showStatus();
+  window.addEventListener("scroll", loadMore);
+  window.addEventListener("resize", loadMore);
+  new QWebChannel(qt.webChannelTransport, function (channel) {{
+    pager = channel.objects.pager;
+    loadMore();
+  }});
+</script>
+</body></html>
+"""
+
+
+class PagedTextBridge(QObject):
+    """Serves pages of the currently shown large note to the viewer's JavaScript.
+
+    Text is sent escaped; CSV pages are turned into table rows here, so the
+    viewer only ever holds the rows that have been scrolled to.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.paged_file = None
+        self.token = 0
+        self.dialect = None
+
+    def open(self, file_path, mode="text"):
+        """Open file_path and return the viewer HTML with its first page inlined."""
+        self.close()
+        self.paged_file = PagedTextFile(file_path)
+        self.token += 1
+        text, next_offset = self.paged_file.read_page(0)
+        if mode == "csv":
+            self.dialect = sniff_dialect(text[:16384])
+            header, rest = split_csv_header(text)
+            body = (
+                f"<table><thead>{csv_rows_html(header, self.dialect, 'th')}</thead>"
+                f"<tbody id='content'>{csv_rows_html(rest, self.dialect)}</tbody></table>"
+            )
+        else:
+            self.dialect = None
+            body = f"<pre class='text' id='content'>{html.escape(text)}</pre>"
+        return PAGED_TEMPLATE.format(
+            style=RENDER_STYLE,
+            body=body,
+            token=self.token,
+            next=next_offset,
+            size=self.paged_file.size,
+        )
+
+    def close(self):
+        if self.paged_file is not None:
+            self.paged_file.close()
+            self.paged_file = None
+        # Pages still in flight for the old file are ignored by token
+        self.token += 1
+
+    def page_html(self, text):
+        # Pages end on a newline, so a quoted CSV field spanning two pages is split in two rows
+        if self.dialect is not None:
+            return csv_rows_html(text, self.dialect)
+        return html.escape(text)
+
+    # Offsets arrive as JavaScript numbers, which are doubles
+    @pyqtSlot(int, float, result=str)
+    def read_page(self, token, offset):
+        if token != self.token or self.paged_file is None:
+            return json.dumps({"token": token, "html": "", "next": -1})
+        text, next_offset = self.paged_file.read_page(int(offset))
+        return json.dumps({"token": token, "html": self.page_html(text), "next": next_offset})
+
+
+JSON_TREE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+<style>{style}</style></head>
+<body>
+<div class="tree" id="root">{root}</div>
+<script>
+  var token = {token};
+  var tree = null;
+
+  // Children of a node are only built when it is first expanded
+  document.addEventListener("toggle", function (event) {{
+    var details = event.target;
+    if (!details.open || details.dataset.loaded || !details.dataset.path || tree === null) return;
+    details.dataset.loaded = "1";
+    tree.children(token, details.dataset.path, 0, function (reply) {{
+      var page = JSON.parse(reply);
+      if (page.token === token) details.insertAdjacentHTML("beforeend", page.html);
+    }});
+  }}, true);
+
+  document.addEventListener("click", function (event) {{
+    var more = event.target.closest(".more[data-start]");
+    if (!more || tree === null) return;
+    event.preventDefault();
+    tree.children(token, more.dataset.path, parseInt(more.dataset.start), function (reply) {{
+      var page = JSON.parse(reply);
+      if (page.token === token) more.outerHTML = page.html;
+    }});
+  }});
+
+  new QWebChannel(qt.webChannelTransport, function (channel) {{
+    tree = channel.objects.tree;
+  }});
+</script>
+</body></html>
+"""
+
+
+class JsonTreeBridge(QObject):
+    """Holds a parsed JSON document and renders its nodes as the viewer expands them."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.value = None
+        self.token = 0
+
+    def open(self, value):
+        self.close()
+        self.value = value
+        if isinstance(value, (dict, list)):
+            root = (
+                f"<details open data-loaded='1'><summary>{json_summary(None, value)}</summary>"
+                f"{json_children_html(value, [], 0, lazy=True)}</details>"
+            )
+        else:
+            root = json_node_html(None, value, [], 0, lazy=False)
+        return JSON_TREE_TEMPLATE.format(style=RENDER_STYLE, root=root, token=self.token)
+
+    def close(self):
+        self.value = None
+        self.token += 1
+
+    @pyqtSlot(int, str, int, result=str)
+    def children(self, token, path, start):
+        if token != self.token or self.value is None:
+            return json.dumps({"token": token, "html": ""})
+        try:
+            node = json_value_at(self.value, json.loads(path))
+            rendered = json_children_html(node, json.loads(path), start, lazy=True)
+        except (KeyError, IndexError, TypeError, ValueError):
+            rendered = ""
+        return json.dumps({"token": token, "html": rendered})
+
+
+def create_paged_channel(parent=None):
+    """A PagedTextBridge registered as `pager` on a channel to give to the viewer's page."""
+    bridge = PagedTextBridge(parent)
+    channel = QWebChannel(parent)
+    channel.registerObject("pager", bridge)
+    return bridge, channel
+
@@ -0,0 +1,179 @@
+import html
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from core.pdf import PREVIEW_WIDTH, render_page_json
+
+
+# Rasterizing holds the GIL for the whole page, so it happens in its own process
+RENDER_PROCESSES = 1
+
+
+PDF_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<script src="qrc:///qtwebchannel/qwebchannel.js"></script>
+<style>
+  body {{ font-family: sans-serif; background: #f4f6f8; margin: 0; padding: 10px; }}
+  #header {{ display: flex; justify-content: space-between; align-items: center; padding-bottom: 8px; }}
+  #header a {{ color: #3a47d5; cursor: pointer; font-size: 12px; }}
+  .page {{ background: white; margin: 0 auto 14px auto; max-width: {width}px; box-shadow: 0 1px 3px #aaa; }}
+  .page img {{ width: 100%; display: block; }}
+  .page details {{ padding: 4px 8px; font-size: 12px; }}
+  .page pre {{ white-space: pre-wrap; font-family: monospace; }}
+  #status {{ font-size: 11px; color: #777; text-align: center; padding: 6px 0; }}
+</style></head>
+<body>
+<div id="header"><b>{title}</b><a id="original">Open in full PDF viewer</a></div>
+<div id="pages"></div>
+<div id="status">Loading first page…</div>
+<script>
+  var token = {token};
+  var pdf = null;
+  var pageCount = -1;
+  var nextPage = 0;
+  var loading = false;
+  var pages = document.getElementById("pages");
+  var statusLine = document.getElementById("status");
+
+  function loadMore() {{
+    if (loading || pdf === null) return;
+    if (pageCount >= 0 && nextPage >= pageCount) {{ statusLine.textContent = ""; return; }}
+    var remaining = document.body.scrollHeight - (window.scrollY + window.innerHeight);
+    if (nextPage > 0 && remaining > 2 * window.innerHeight) return;
+    loading = true;
+    pdf.request_page(token, nextPage);
+  }}
+
+  function addPage(page) {{
+    var box = document.createElement("div");
+    box.className = "page";
+    var img = document.createElement("img");
+    img.src = page.image;
+    box.appendChild(img);
+    if (page.text) {{
+      var details = document.createElement("details");
+      var summary = document.createElement("summary");
+      summary.textContent = "Page " + (page.index + 1) + " text";
+      var pre = document.createElement("pre");
+      pre.textContent = page.text;
+      details.appendChild(summary);
+      details.appendChild(pre);
+      box.appendChild(details);
+    }}
+    pages.appendChild(box);
+  }}
+
+  window.addEventListener("scroll", loadMore);
+  window.addEventListener("resize", loadMore);
+  new QWebChannel(qt.webChannelTransport, function (channel) {{
+    pdf = channel.objects.pdf;
+    pdf.pageReady.connect(function (replyToken, reply) {{
+      if (replyToken !== token) return;
+      var page = JSON.parse(reply);
+      if (page.index !== nextPage) return;
+      pageCount = page.count;
+      addPage(page);
+      nextPage += 1;
+      statusLine.textContent = nextPage < pageCount ?
+        "Page " + nextPage + " of " + pageCount + ", scroll for more" : "";
+      loading = false;
+      loadMore();
+    }});
+    pdf.pageFailed.connect(function (replyToken, message) {{
+      if (replyToken !== token) return;
+      statusLine.textContent = "Could not render page: " + message;
+      // Scrolling again retries the page
+      loading = false;
+    }});
+    document.getElementById("original").onclick = function () {{ pdf.open_original(token); }};
+    loadMore();
+  }});
+</script>
+</body></html>
+"""
+
+
+class PdfPreviewBridge(QObject):
+    """Renders pages of the shown PDF on demand for the viewer's JavaScript.
+
+    Pages are rendered in a helper process, waited for on the preview workers,
+    and cached per file revision, so only what is scrolled into view is ever
+    rasterized and the GUI thread never competes with it for the GIL.
+    """
+
+    pageReady = pyqtSignal(int, str)
+    pageFailed = pyqtSignal(int, str)
+    openOriginalRequested = pyqtSignal(str)
+
+    def __init__(self, runner, cache, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.cache = cache
+        self.file_path = None
+        self.token = 0
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def open(self, file_path):
+        self.token += 1
+        self.file_path = file_path
+        return PDF_TEMPLATE.format(
+            title=html.escape(os.path.basename(file_path)),
+            token=self.token,
+            width=PREVIEW_WIDTH,
+        )
+
+    def close(self):
+        self.file_path = None
+        self.token += 1
+
+    @pyqtSlot(int, int)
+    def request_page(self, token, index):
+        if token != self.token or self.file_path is None:
+            return
+        self.runner.submit(
+            self.cached_page, (self.file_path, index),
+            on_result=lambda reply: self._reply(token, reply),
+            on_error=lambda e: self.pageFailed.emit(token, str(e)),
+        )
+
+    @pyqtSlot(int)
+    def open_original(self, token):
+        if token == self.token and self.file_path is not None:
+            self.openOriginalRequested.emit(self.file_path)
+
+    def cached_page(self, file_path, index):
+        return self.cache.get_or_compute(
+            file_path, f"pdf-page-{index}", lambda path: self.render_page(path, index)
+        )
+
+    def render_page(self, file_path, index):
+        with self._pool_lock:
+            if self._pool is None:
+                context = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES, mp_context=context)
+            pool = self._pool
+        try:
+            return pool.submit(render_page_json, file_path, index).result()
+        except BrokenProcessPool:
+            # A PDF that crashes the renderer only costs that page; the next one starts afresh
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise RuntimeError("the PDF renderer crashed") from None
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _reply(self, token, reply):
+        if token == self.token:
+            self.pageReady.emit(token, reply)
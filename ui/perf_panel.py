@@ -0,0 +1,125 @@
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTableWidget, QTableWidgetItem,
+    QHeaderView, QFileDialog
+)
+
+from core import trace
+
+
+STALL_CHECK_MS = 50
+# A tick this late means the GUI thread was busy and the window froze
+STALL_THRESHOLD_MS = 100
+REFRESH_MS = 1000
+
+
+class StallDetector(QObject):
+    """Records an `eventloop.stall` span whenever a short timer fires much later than asked."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stalls = 0
+        self.worst_ms = 0.0
+        self.last_ns = time.perf_counter_ns()
+        self.timer = QTimer(self)
+        self.timer.setInterval(STALL_CHECK_MS)
+        self.timer.timeout.connect(self.tick)
+
+    def start(self):
+        self.last_ns = time.perf_counter_ns()
+        self.timer.start()
+
+    def tick(self):
+        now = time.perf_counter_ns()
+        late_ms = (now - self.last_ns) / 1e6 - STALL_CHECK_MS
+        if late_ms > STALL_THRESHOLD_MS:
+            self.stalls += 1
+            self.worst_ms = max(self.worst_ms, late_ms)
+            trace.record("eventloop.stall", self.last_ns, now - self.last_ns)
+        self.last_ns = now
+
+
+class PerformancePanel(QWidget):
+    def __init__(self, stats_sources=None):
+        super().__init__()
+        # name -> callable returning a dict, e.g. cache hit/miss counters
+        self.stats_sources = stats_sources or {}
+        self.stall_detector = StallDetector(self)
+        self.stall_detector.start()
+        self.init_ui()
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start()
+        self.refresh()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        toolbar = QHBoxLayout()
+        self.summary_label = QLabel()
+        export_button = QPushButton("Export Chrome trace…")
+        export_button.clicked.connect(self.export_trace)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        toolbar.addWidget(self.summary_label, 1)
+        toolbar.addWidget(export_button)
+        toolbar.addWidget(clear_button)
+
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["Span", "Count", "p50 ms", "p95 ms", "Max ms", "Total ms"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+
+        self.sources_label = QLabel()
+        self.sources_label.setWordWrap(True)
+
+        layout.addLayout(toolbar)
+        layout.addWidget(self.table)
+        layout.addWidget(self.sources_label)
+        layout.setContentsMargins(10, 10, 10, 10)
+        self.setLayout(layout)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        rows = sorted(trace.summary().items(), key=lambda item: -item[1]["total_ms"])
+        self.table.setRowCount(len(rows))
+        for row, (name, stats) in enumerate(rows):
+            values = [name, stats["count"], stats["p50_ms"], stats["p95_ms"], stats["max_ms"], stats["total_ms"]]
+            for column, value in enumerate(values):
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                self.table.setItem(row, column, QTableWidgetItem(text))
+
+        detector = self.stall_detector
+        self.summary_label.setText(
+            f"{len(trace.records())} spans buffered · {detector.stalls} event loop stalls"
+            f" (worst {detector.worst_ms:.0f} ms)"
+        )
+        lines = []
+        for name, source in self.stats_sources.items():
+            try:
+                values = source()
+            except Exception as e:
+                values = {"error": e}
+            if values:
+                lines.append(f"<b>{name}</b>: " + ", ".join(f"{k} {v}" for k, v in values.items()))
+        self.sources_label.setText("<br>".join(lines))
+
+    def clear(self):
+        trace.clear()
+        self.stall_detector.stalls = 0
+        self.stall_detector.worst_ms = 0.0
+        self.refresh()
+
+    def export_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Chrome Trace", "noteninja-trace.json", "Trace Files (*.json)"
+        )
+        if file_path:
+            count = trace.export_chrome_trace(file_path)
+            self.summary_label.setText(f"Exported {count} spans to {file_path}")
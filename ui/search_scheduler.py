@@ -0,0 +1,131 @@
+from PyQt5.QtCore import QObject, QTimer
+
+from core.index import snippet_to_html
+from core.trace import span
+from ui.workers import TaskRunner
+
+# Name matches are shown on every keystroke; the full-text query waits for a pause
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_LIMIT = 100
+# Name matches are ranked, so only the best ones are listed
+NAME_MATCH_LIMIT = 500
+
+
+def run_search(index, term, within, limit, task):
+    with span("search.query"):
+        names = []
+        for batch in index.iter_search(term, limit, within, cancelled=task.is_cancelled):
+            task.report(batch)
+            names.extend(hit.name for hit in batch)
+        return names
+
+
+class SearchScheduler(QObject):
+    """Search-as-you-type for the notes list.
+
+    Name matches come ranked and typo-tolerant from the model's trigram index;
+    until that is built, typing more characters re-filters the last match list
+    instead. When the last full-text query returned every hit, the next one is
+    restricted to those notes. Content hits
+    are streamed into the list in batches; a newer query cancels the older one,
+    including the SQLite statement that is still running.
+    """
+
+    def __init__(self, notes_model, index, parent=None):
+        super().__init__(parent)
+        self.notes_model = notes_model
+        self.index = index
+        # One thread, so the index connection is never used concurrently
+        self.runner = TaskRunner(max_threads=1, parent=self)
+        self.term = ""
+        self.shown = set()
+        self.last_names = None
+        self.last_hits = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.timer.timeout.connect(self.start_query)
+
+    def invalidate(self):
+        self.last_names = None
+        self.last_hits = None
+
+    def schedule(self, text):
+        with span("search.keystroke"):
+            self.show_name_matches(text)
+            if self.term:
+                self.timer.start()
+
+    def refresh(self, text):
+        # The notes changed, so nothing from earlier queries can be reused
+        self.invalidate()
+        self.show_name_matches(text)
+        if self.term:
+            self.start_query()
+
+    def show_name_matches(self, text):
+        self.runner.cancel("search")
+        self.timer.stop()
+        self.term = text.strip()
+        if not self.term:
+            self.invalidate()
+            self.notes_model.show_all()
+            return
+
+        matches = self.notes_model.fuzzy_matches(self.term, NAME_MATCH_LIMIT)
+        if matches is not None:
+            self.last_names = None
+            self.shown = {match.name for match in matches}
+            self.notes_model.show_results(
+                [match.name for match in matches],
+                highlights={match.name: match.positions for match in matches},
+            )
+            return
+
+        lowered = self.term.lower()
+        within = None
+        if self.last_names is not None and self.last_names[0] in lowered:
+            within = self.last_names[1]
+        names = self.notes_model.name_matches(self.term, within)
+        self.last_names = (lowered, names)
+        self.shown = set(names)
+        self.notes_model.show_results(names)
+
+    def start_query(self):
+        term = self.term
+        lowered = term.lower()
+        within = None
+        if self.last_hits is not None and lowered.startswith(self.last_hits[0]):
+            within = self.last_hits[1]
+            if not within:
+                return
+        self.runner.submit(
+            run_search, (self.index, term, within, SEARCH_LIMIT),
+            on_progress=self.add_hits,
+            on_result=lambda names: self.on_query_finished(lowered, names),
+            on_error=lambda e: print(f"Search failed: {e}"),
+            channel="search",
+        )
+
+    def add_hits(self, hits):
+        names = []
+        tooltips = {}
+        for hit in hits:
+            if hit.name not in self.shown and self.notes_model.contains(hit.name):
+                names.append(hit.name)
+                tooltips[hit.name] = snippet_to_html(hit.snippet)
+                self.shown.add(hit.name)
+        if names:
+            self.notes_model.append_results(names, tooltips)
+
+    def on_query_finished(self, lowered, names):
+        # A truncated result can't be used to narrow the next query
+        if len(names) < SEARCH_LIMIT:
+            self.last_hits = (lowered, names)
+        else:
+            self.last_hits = None
+
+    def cancel(self):
+        self.timer.stop()
+        self.runner.cancel("search")
@@ -1,12 +1,49 @@
+import html
 import os
+import time
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLineEdit, QToolButton, QListWidget, QSplitter, QMenu,
-    QAction, QMessageBox, QLabel
+    QWidget, QVBoxLayout, QLineEdit, QToolButton, QListWidget, QListView, QSplitter, QMenu,
+    QAction, QMessageBox, QLabel, QProgressBar, QInputDialog
 )
-from PyQt5.QtCore import Qt, QSize, QPoint, QFileSystemWatcher, QUrl
+from PyQt5.QtCore import Qt, QSize, QPoint, QFileSystemWatcher, QUrl, QTimer
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-from docx import Document
+
+from core.assets import assets_gc_due, collect_unused_assets
+from core.cache import CACHE_DIRNAME, ContentCache, cache_key
+from core.extract import TEXT_EXTS, is_supported
+from core.history import VersionStore
+from core.index import INDEX_DIRNAME, NoteIndex, load_catalog, update_index
+from core.manifest import delta_is_empty
+from core.pdf import pdf_supported
+from core.pipeline import process_folder
+from core.preview import PREVIEW_CACHE_KIND, error_html, preview_html
+from core.render import inline_limit, load_json_file, page_html
+from core.trace import span
+from ui.notes_model import HighlightDelegate, NotesListModel
+from ui.paged_viewer import PAGED_BASE_URL, JsonTreeBridge, create_paged_channel
+from ui.pdf_viewer import PdfPreviewBridge
+from ui.search_scheduler import SEARCH_DEBOUNCE_MS, SEARCH_LIMIT, SearchScheduler
+from ui.workers import TaskRunner
+
+# Watcher events are coalesced until the folder has been quiet for this long,
+# but a continuous burst (bulk copy) is still flushed at least this often.
+REFRESH_DEBOUNCE_MS = 250
+REFRESH_MAX_DELAY_S = 2.0
+# Processing runs in the background, so it leaves half the cores to everything else
+PIPELINE_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+PROCESSED_EXTS = (".txt", ".csv")
+
+
+def run_pipeline(database_folder, processed_folder, task):
+    return process_folder(database_folder, processed_folder, PIPELINE_WORKERS, task.report, task.is_cancelled)
+
+
+def search_processed(index, term, names):
+    # Thumbnails have no text, so file names are matched as well
+    lowered = term.lower()
+    matches = [name for name in names if lowered in name.lower()]
+    shown = set(matches)
+    return matches + [hit.name for hit in index.search(term, SEARCH_LIMIT) if hit.name not in shown]
 
 
 class NotesSearchTab(QWidget):
@@ -14,11 +51,43 @@ class NotesSearchTab(QWidget):
         super().__init__()
         self.database_folder = "database"
         self.processed_folder = "opencv"
-        self.watcher = QFileSystemWatcher([self.database_folder, self.processed_folder])
-        self.watcher.directoryChanged.connect(self.load_all_lists)
+        self.notes_model = NotesListModel(self)
+        self.catalog = load_catalog(self.database_folder)
+        self.index = NoteIndex(self.database_folder, locate=self.catalog.path_for)
+        self.search_scheduler = SearchScheduler(self.notes_model, self.index, self)
+        # Revisions of saved notes, and the trash deleted notes are moved to
+        self.history = VersionStore(self.database_folder)
+        self.semantic_index = None
+        self._note_viewer = None
+        self.content_cache = ContentCache(
+            cache_dir=os.path.join(self.database_folder, INDEX_DIRNAME, CACHE_DIRNAME)
+        )
+
+        # Previews may run concurrently; index updates are serialized on one thread
+        # and are the only code that writes the catalog
+        self.preview_tasks = TaskRunner(parent=self)
+        self.index_tasks = TaskRunner(max_threads=1, parent=self)
+        # OCR text and tables derived from the notes have their own index in the processed folder
+        self.processed_index = NoteIndex(self.processed_folder)
+        self.processed_search = TaskRunner(max_threads=1, parent=self)
+        self.pipeline_tasks = TaskRunner(max_threads=1, parent=self)
+        self.pipeline_again = False
+        self.gc_tasks = TaskRunner(max_threads=1, parent=self)
+
+        self.pending_folders = set()
+        self.pending_since = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(REFRESH_DEBOUNCE_MS)
+        self.refresh_timer.timeout.connect(self.flush_pending_changes)
+
+        self.watcher = QFileSystemWatcher([self.processed_folder] + self.catalog.storage_dirs())
+        self.watcher.directoryChanged.connect(self.schedule_refresh)
 
         self.init_ui()
         self.load_all_lists()
+        # Open and refresh the full-text index once the window is up
+        QTimer.singleShot(0, self.sync_index)
 
     def init_ui(self):
         main_layout = QVBoxLayout()
@@ -55,7 +124,7 @@ class NotesSearchTab(QWidget):
                 background-color: rgba(0, 210, 255, 0.2);
                 border-radius: 10px;
             }
-            QListWidget {
+            QListView {
                 background-color: #eeeeee;
                 border: none;
                 border-radius: 10px;
@@ -74,7 +143,12 @@ class NotesSearchTab(QWidget):
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search your notes...")
         self.search_bar.setMinimumHeight(36)
-        self.search_bar.textChanged.connect(self.filter_notes_only)
+        self.search_bar.textChanged.connect(self.search_scheduler.schedule)
+        self.processed_timer = QTimer(self)
+        self.processed_timer.setSingleShot(True)
+        self.processed_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.processed_timer.timeout.connect(self.filter_processed)
+        self.search_bar.textChanged.connect(self.processed_timer.start)
 
         self.search_button = QToolButton(self.search_bar)
         icon = QIcon.fromTheme("system-search")
@@ -96,8 +170,11 @@ class NotesSearchTab(QWidget):
         self.context_search_button.clicked.connect(self.context_search_clicked)
 
         # Notes list
-        self.notes_list = QListWidget()
-        self.notes_list.itemClicked.connect(self.load_note_content)
+        self.notes_list = QListView()
+        self.notes_list.setModel(self.notes_model)
+        self.notes_list.setUniformItemSizes(True)
+        self.notes_list.setItemDelegate(HighlightDelegate(self.notes_list))
+        self.notes_list.clicked.connect(self.load_note_content)
         self.notes_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.notes_list.customContextMenuRequested.connect(self.show_context_menu)
 
@@ -105,6 +182,11 @@ class NotesSearchTab(QWidget):
         self.processed_label = QLabel("Processed Data")
         self.processed_label.setObjectName("processed_label")
 
+        self.processed_progress = QProgressBar()
+        self.processed_progress.setMaximumHeight(12)
+        self.processed_progress.setTextVisible(False)
+        self.processed_progress.hide()
+
         self.processed_list = QListWidget()
         self.processed_list.setMaximumHeight(80)
         self.processed_list.itemClicked.connect(self.load_processed_content)
@@ -117,24 +199,66 @@ class NotesSearchTab(QWidget):
         left_panel_layout.setSpacing(6)
         left_panel_layout.addWidget(self.notes_list, 1)
         left_panel_layout.addWidget(self.processed_label)
+        left_panel_layout.addWidget(self.processed_progress)
         left_panel_layout.addWidget(self.processed_list, 0)
 
         left_container = QWidget()
         left_container.setLayout(left_panel_layout)
 
-        # Right panel using QWebEngineView
-        self.note_viewer = QWebEngineView()
+        # Right panel: a QWebEngineView, created the first time a note is shown
+        self.pager, self.web_channel = create_paged_channel(self)
+        self.pdf_bridge = PdfPreviewBridge(self.preview_tasks, self.content_cache, self)
+        self.pdf_bridge.openOriginalRequested.connect(self.open_original)
+        self.web_channel.registerObject("pdf", self.pdf_bridge)
+        self.json_tree = JsonTreeBridge(self)
+        self.web_channel.registerObject("tree", self.json_tree)
+        self.viewer_placeholder = QWidget()
 
-        splitter = QSplitter(Qt.Horizontal)
-        splitter.addWidget(left_container)
-        splitter.addWidget(self.note_viewer)
-        splitter.setSizes([300, 600])
+        self.splitter = QSplitter(Qt.Horizontal)
+        self.splitter.addWidget(left_container)
+        self.splitter.addWidget(self.viewer_placeholder)
+        self.splitter.setSizes([300, 600])
 
         main_layout.addWidget(self.search_bar)
-        main_layout.addWidget(splitter)
+        main_layout.addWidget(self.splitter)
         main_layout.setContentsMargins(10, 10, 10, 10)
         main_layout.setSpacing(12)
 
+    @property
+    def note_viewer(self):
+        if self._note_viewer is None:
+            # Importing QtWebEngine and starting Chromium costs more than the rest of startup.
+            # Every preview reuses this one page; it is frozen, never discarded, while
+            # hidden, since its setHtml content could not be reloaded. Notes and clips are
+            # shown offline, so the page has a profile that blocks every remote request.
+            from ui.web_engine import create_web_view, local_profile
+            self._note_viewer = create_web_view(discard=False, profile=local_profile())
+            self._note_viewer.page().setWebChannel(self.web_channel)
+            self._viewer_trusted = True
+            self.splitter.replaceWidget(1, self._note_viewer)
+            self.viewer_placeholder.deleteLater()
+        return self._note_viewer
+
+    def set_viewer_trusted(self, trusted):
+        if trusted != self._viewer_trusted:
+            from ui.web_engine import set_page_trusted
+            set_page_trusted(self.note_viewer.page(), trusted, self.web_channel)
+            self._viewer_trusted = trusted
+
+    def show_html(self, markup, base_url=None):
+        viewer = self.note_viewer
+        self.set_viewer_trusted(True)
+        if base_url is None:
+            viewer.setHtml(markup)
+        else:
+            viewer.setHtml(markup, base_url)
+
+    def show_document(self, file_path):
+        # HTML notes, clips and originals are someone else's markup: no scripts, no bridge
+        viewer = self.note_viewer
+        self.set_viewer_trusted(False)
+        viewer.load(QUrl.fromLocalFile(os.path.abspath(file_path)))
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
         self.search_button.move(8, (self.search_bar.height() - 20) // 2)
@@ -145,70 +269,261 @@ class NotesSearchTab(QWidget):
         self.load_processed()
 
     def load_notes(self):
-        self.notes_list.clear()
-        if not os.path.exists(self.database_folder):
-            os.makedirs(self.database_folder)
+        with span("search.load_notes"):
+            if not os.path.exists(self.database_folder):
+                os.makedirs(self.database_folder)
+
+            # The catalog is the listing; only a folder that was never scanned is read directly
+            names = self.catalog.names()
+            if not names:
+                names = [f for f in os.listdir(self.database_folder) if is_supported(f)]
+            self.notes_model.set_names(names)
+            self.filter_notes_only()
+
+    def sync_index(self):
+        self.refresh_notes()
+        # Picks up where an interrupted run stopped
+        self.start_processing()
+
+    def schedule_refresh(self, folder):
+        with span("watcher.event"):
+            self.pending_folders.add(os.path.normpath(folder))
+            now = time.monotonic()
+            if self.pending_since is None:
+                self.pending_since = now
+            if now - self.pending_since < REFRESH_MAX_DELAY_S or not self.refresh_timer.isActive():
+                self.refresh_timer.start()
+
+    def flush_pending_changes(self):
+        with span("watcher.flush"):
+            folders = self.pending_folders
+            self.pending_folders = set()
+            self.pending_since = None
+            if os.path.normpath(self.processed_folder) in folders:
+                self.load_processed()
+            if any(self.is_notes_folder(folder) for folder in folders):
+                self.refresh_notes()
+
+    def is_notes_folder(self, folder):
+        notes = os.path.normpath(self.database_folder)
+        return folder == notes or os.path.dirname(folder) == notes
+
+    def refresh_notes(self):
+        self.index_tasks.submit(
+            update_index, (self.database_folder, self.catalog),
+            on_result=self.on_index_updated,
+            on_error=lambda e: print(f"Failed to scan notes: {e}"),
+        )
+
+    def on_index_updated(self, update):
+        with span("index.apply_to_list"):
+            if update.error is not None:
+                print(f"Search index unavailable: {update.error}")
+            if not delta_is_empty(update.delta):
+                self.apply_list_delta(update.delta)
+                self.start_processing()
+            # Shard folders appear as notes are written into them
+            new_dirs = set(self.catalog.storage_dirs()) - set(self.watcher.directories())
+            if new_dirs:
+                self.watcher.addPaths(sorted(new_dirs))
+        self.collect_assets()
+
+    def collect_assets(self):
+        # Checked after every scan (startup and saves), swept at most once a day
+        if self.gc_tasks.active or not assets_gc_due(self.database_folder):
+            return
+        self.gc_tasks.submit(
+            collect_unused_assets, (self.database_folder,),
+            on_result=lambda removed: removed and print(f"Removed {len(removed)} unused asset(s)"),
+            on_error=lambda e: print(f"Asset cleanup failed: {e}"),
+        )
 
-        supported_exts = (".txt", ".docx", ".pdf", ".html", ".htm", ".md", ".json", ".csv")
-        for filename in sorted(os.listdir(self.database_folder)):
-            if filename.lower().endswith(supported_exts) and not filename.startswith("."):
-                self.notes_list.addItem(filename)
+    def apply_list_delta(self, delta):
+        self.search_scheduler.invalidate()
+        for name in delta.deleted:
+            self.notes_model.remove_name(name)
+        for name in delta.added:
+            self.notes_model.insert_name(name)
+        if self.notes_model.is_filtered():
+            # Hits may have changed for any of the touched files
+            self.filter_notes_only()
 
     def load_processed(self):
-        self.processed_list.clear()
         if not os.path.exists(self.processed_folder):
             os.makedirs(self.processed_folder)
 
-        for filename in sorted(os.listdir(self.processed_folder)):
-            if not filename.startswith("."):
-                self.processed_list.addItem(filename)
+        self.processed_names = sorted(
+            filename for filename in os.listdir(self.processed_folder) if not filename.startswith(".")
+        )
+        self.filter_processed()
+
+    def filter_processed(self):
+        term = self.search_bar.text().strip()
+        if not term:
+            self.show_processed(self.processed_names)
+            return
+        self.processed_search.submit(
+            search_processed, (self.processed_index, term, self.processed_names),
+            on_result=self.show_processed,
+            on_error=lambda e: print(f"Processed data search failed: {e}"),
+            channel="search",
+        )
 
-    def filter_notes_only(self):
-        term = self.search_bar.text().lower()
-        for i in range(self.notes_list.count()):
-            item = self.notes_list.item(i)
-            item.setHidden(term not in item.text().lower())
+    def show_processed(self, names):
+        self.processed_list.clear()
+        self.processed_list.addItems(names)
+
+    def start_processing(self):
+        if self.pipeline_tasks.active:
+            # Changes that arrive mid-run are handled by one more run afterwards
+            self.pipeline_again = True
+            return
+        self.pipeline_again = False
+        self.pipeline_tasks.submit(
+            run_pipeline, (self.database_folder, self.processed_folder),
+            on_progress=self.on_processing_progress,
+            on_result=self.on_processing_finished,
+            on_error=lambda e: self.on_processing_finished(None, e),
+            channel="pipeline",
+        )
 
-    def load_note_content(self, item):
-        filename = item.text()
-        file_path = os.path.join(self.database_folder, filename)
-        ext = os.path.splitext(filename)[1].lower()
+    def on_processing_progress(self, progress):
+        self.processed_progress.setMaximum(progress.total)
+        self.processed_progress.setValue(progress.finished)
+        self.processed_progress.show()
+        self.processed_label.setText(f"Processed Data ({progress.finished}/{progress.total})")
+        self.processed_label.setToolTip(f"{progress.kind}: {progress.source}")
+
+    def on_processing_finished(self, result, error=None):
+        self.processed_progress.hide()
+        self.processed_label.setText("Processed Data")
+        self.processed_label.setToolTip("")
+        if error is not None:
+            print(f"Processing failed: {error}")
+        elif result["failed"]:
+            self.processed_label.setToolTip(f"{result['failed']} file(s) could not be processed")
+        self.load_processed()
+        if self.pipeline_again:
+            self.start_processing()
 
-        try:
-            if ext in [".html", ".htm", ".pdf"]:
-                self.note_viewer.load(QUrl.fromLocalFile(os.path.abspath(file_path)))
+    def stop_processing(self):
+        self.pipeline_again = False
+        self.pipeline_tasks.cancel_all()
+        # The run stops between jobs; waiting here means nothing outlives the tab
+        self.pipeline_tasks.wait()
+
+    def filter_notes_only(self):
+        with span("search.filter"):
+            self.search_scheduler.refresh(self.search_bar.text())
+
+    def load_note_content(self, index):
+        with span("search.open_note"):
+            filename = self.notes_model.name_at(index.row())
+            file_path = self.catalog.path_for(filename)
+            ext = os.path.splitext(filename)[1].lower()
+
+            self.pager.close()
+            self.pdf_bridge.close()
+            self.json_tree.close()
+            # Pages are rendered on demand instead of starting Chromium's PDF viewer
+            if ext == ".pdf" and pdf_supported():
+                self.preview_tasks.cancel("preview")
+                self.show_html(self.pdf_bridge.open(file_path), PAGED_BASE_URL)
+                return
 
-            elif ext in [".txt", ".md", ".json", ".csv"]:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                html = f"<pre style='font-family: monospace; white-space: pre-wrap;'>{content}</pre>"
-                self.note_viewer.setHtml(html)
+            if ext in [".html", ".htm", ".pdf"]:
+                self.preview_tasks.cancel("preview")
+                self.show_document(file_path)
+                return
+
+            # Big logs and CSVs are mapped and paged in as the viewer scrolls,
+            # big JSON is parsed off-thread and expanded node by node
+            if ext in TEXT_EXTS and self.file_size(file_path) >= inline_limit(ext):
+                self.preview_tasks.cancel("preview")
+                if ext == ".json":
+                    self.open_json_tree(file_path)
+                else:
+                    self.open_paged(file_path, "csv" if ext == ".csv" else "text")
+                return
+
+            # Flipping back to a note already seen is served without a round trip
+            try:
+                cached = self.content_cache.peek(cache_key(file_path, PREVIEW_CACHE_KIND))
+            except OSError:
+                cached = None
+            if cached is not None:
+                self.preview_tasks.cancel("preview")
+                self.show_html(cached)
+                return
+
+            # Parsing happens off the GUI thread; clicking another note drops this one
+            self.preview_tasks.submit(
+                self.cached_preview, (file_path,),
+                on_result=self.show_html,
+                on_error=lambda e: self.show_html(error_html(e)),
+                channel="preview",
+            )
+
+    def open_paged(self, file_path, mode="text"):
+        try:
+            self.show_html(self.pager.open(file_path, mode), PAGED_BASE_URL)
+        except OSError as e:
+            self.show_html(error_html(e))
+
+    def open_json_tree(self, file_path):
+        self.show_html(page_html("<p class='more'>Reading JSON…</p>"))
+        self.preview_tasks.submit(
+            load_json_file, (file_path,),
+            on_result=lambda value: self.show_html(self.json_tree.open(value), PAGED_BASE_URL),
+            # Not valid JSON after all, show it as text
+            on_error=lambda e: self.open_paged(file_path),
+            channel="preview",
+        )
 
-            elif ext == ".docx":
-                doc = Document(file_path)
-                content = "<br>".join(p.text for p in doc.paragraphs)
-                html = f"<div style='font-family: sans-serif; padding:10px;'>{content}</div>"
-                self.note_viewer.setHtml(html)
+    def open_original(self, file_path):
+        self.show_document(file_path)
 
-            else:
-                self.note_viewer.setHtml("<h3>Unsupported file format</h3>")
+    def file_size(self, file_path):
+        try:
+            return os.path.getsize(file_path)
+        except OSError:
+            return 0
 
-        except Exception as e:
-            error_html = f"<h3>Failed to load file:</h3><p>{str(e)}</p>"
-            self.note_viewer.setHtml(error_html)
+    def cached_preview(self, file_path):
+        # Parsed and rendered formats are worth keeping across restarts, plain text is not
+        persist = file_path.lower().endswith((".docx", ".md", ".csv", ".json", ".nnote"))
+        return self.content_cache.get_or_compute(file_path, PREVIEW_CACHE_KIND, preview_html, persist)
 
     def load_processed_content(self, item):
-        filename = item.text()
-        self.note_viewer.setHtml(f"<h3>Processed File Selected</h3><p>{filename}</p>")
+        file_path = os.path.join(self.processed_folder, item.text())
+        self.pager.close()
+        self.pdf_bridge.close()
+        self.json_tree.close()
+        if not file_path.lower().endswith(PROCESSED_EXTS):
+            # Thumbnails
+            self.preview_tasks.cancel("preview")
+            self.show_document(file_path)
+            return
+        self.preview_tasks.submit(
+            self.cached_preview, (file_path,),
+            on_result=self.show_html,
+            on_error=lambda e: self.show_html(error_html(e)),
+            channel="preview",
+        )
 
     def show_context_menu(self, position: QPoint):
-        item = self.notes_list.itemAt(position)
-        if item:
-            menu = QMenu()
-            delete_action = QAction("🗑️ Delete", self)
-            delete_action.triggered.connect(lambda: self.delete_file(item.text(), self.database_folder))
+        index = self.notes_list.indexAt(position)
+        menu = QMenu()
+        if index.isValid():
+            filename = self.notes_model.name_at(index.row())
+            delete_action = QAction("🗑️ Move to Trash", self)
+            file_path = self.catalog.path_for(filename)
+            delete_action.triggered.connect(lambda: self.delete_file(filename, os.path.dirname(file_path)))
             menu.addAction(delete_action)
-            menu.exec_(self.notes_list.viewport().mapToGlobal(position))
+        restore_action = QAction("♻️ Restore from Trash…", self)
+        restore_action.triggered.connect(self.restore_from_trash)
+        menu.addAction(restore_action)
+        menu.exec_(self.notes_list.viewport().mapToGlobal(position))
 
     def show_processed_context_menu(self, position: QPoint):
         item = self.processed_list.itemAt(position)
@@ -221,18 +536,85 @@ class NotesSearchTab(QWidget):
 
     def delete_file(self, filename, folder):
         file_path = os.path.join(folder, filename)
+        # Notes go to the trash; processed data can always be derived again
+        note = self.is_notes_folder(os.path.normpath(folder))
         reply = QMessageBox.question(
-            self, "Delete File",
-            f"Are you sure you want to delete:\n{filename}?",
+            self, "Move to Trash" if note else "Delete File",
+            f"Move to the trash:\n{filename}?" if note else f"Are you sure you want to delete:\n{filename}?",
             QMessageBox.Yes | QMessageBox.No
         )
         if reply == QMessageBox.Yes:
             try:
-                os.remove(file_path)
-                self.load_all_lists()
-                self.note_viewer.setHtml("")
+                if note:
+                    self.history.trash(file_path)
+                else:
+                    os.remove(file_path)
+                self.schedule_refresh(folder)
+                self.show_html("")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Could not delete file:\n{e}")
 
+    def restore_from_trash(self):
+        entries = self.history.trashed()
+        if not entries:
+            QMessageBox.information(self, "Trash", "The trash is empty.")
+            return
+        labels = [
+            f"{i + 1}.  {os.path.basename(entry.note)}"
+            f"  ·  deleted {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.deleted))}"
+            for i, entry in enumerate(entries)
+        ]
+        label, ok = QInputDialog.getItem(self, "Trash", "Restore a deleted note:", labels, 0, False)
+        if not ok:
+            return
+        try:
+            self.history.untrash(entries[labels.index(label)].id)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Could not restore note:\n{e}")
+            return
+        self.refresh_notes()
+
     def context_search_clicked(self):
-        self.note_viewer.setHtml("<h3>Contextual search button clicked.</h3>")
+        query = self.search_bar.text().strip()
+        if not query:
+            self.show_html("<h3>Type a question or phrase to search by meaning.</h3>")
+            return
+
+        # NumPy is only needed once someone searches by meaning
+        from core.semantic import SemanticIndex, contextual_search, default_semantic_dir
+        if self.semantic_index is None:
+            self.semantic_index = SemanticIndex(default_semantic_dir(self.database_folder))
+
+        self.pager.close()
+        self.pdf_bridge.close()
+        self.json_tree.close()
+        self.preview_tasks.cancel("preview")
+        self.search_scheduler.cancel()
+        self.show_html("<h3>Searching…</h3>")
+        # Queued behind index updates so it always sees the latest notes
+        self.index_tasks.submit(
+            contextual_search, (self.semantic_index, self.database_folder, query),
+            on_result=lambda hits: self.show_context_results(query, hits),
+            on_error=lambda e: self.show_html(f"<h3>Contextual search failed:</h3><p>{html.escape(str(e))}</p>"),
+            channel="context",
+        )
+
+    def show_context_results(self, query, hits):
+        if not hits:
+            self.show_html(f"<h3>No notes found about “{html.escape(query)}”.</h3>")
+            return
+
+        self.notes_model.show_results(
+            [hit.name for hit in hits],
+            {hit.name: html.escape(hit.passage) for hit in hits},
+        )
+        rows = "".join(
+            f"<div style='margin-bottom:14px;'><b>{html.escape(hit.name)}</b>"
+            f" <span style='color:#777;'>{hit.score:.2f}</span>"
+            f"<div>{html.escape(hit.passage)}…</div></div>"
+            for hit in hits
+        )
+        self.show_html(
+            f"<div style='font-family: sans-serif; padding:10px;'>"
+            f"<h3>Notes about “{html.escape(query)}”</h3>{rows}</div>"
+        )
@@ -0,0 +1,108 @@
+import os
+
+from PyQt5.QtCore import QObject, QStandardPaths, QTimer
+from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor
+from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile, QWebEngineSettings, QWebEngineView
+from PyQt5.QtWidgets import QApplication
+
+
+PROFILE_NAME = "NoteNinja"
+HTTP_CACHE_BYTES = 64 * 1024 * 1024
+# Chromium starts a renderer process per site; past this many, sites share one
+RENDERER_PROCESS_LIMIT = 2
+# A view hidden for this long is frozen, and later discarded if allowed
+SUSPEND_DELAY_MS = 30_000
+# Everything a note preview may fetch lives on disk or inside the app
+LOCAL_SCHEMES = {"file", "qrc", "data", "blob", "chrome", "chrome-extension"}
+
+_profile = None
+_local_profile = None
+
+
+def _limit_renderer_processes():
+    # Read once, when the first profile starts Chromium; a user's own flags win
+    flags = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "")
+    if "--renderer-process-limit" not in flags:
+        os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = f"{flags} --renderer-process-limit={RENDERER_PROCESS_LIMIT}".strip()
+
+
+def shared_profile():
+    """The one QWebEngineProfile every view uses, so they share a network stack and disk cache."""
+    global _profile
+    if _profile is None:
+        _limit_renderer_processes()
+        _profile = QWebEngineProfile(PROFILE_NAME, QApplication.instance())
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+        cache_dir = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        _profile.setPersistentStoragePath(os.path.join(data_dir, "web"))
+        _profile.setCachePath(os.path.join(cache_dir, "web"))
+        _profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+        _profile.setHttpCacheMaximumSize(HTTP_CACHE_BYTES)
+        _profile.setPersistentCookiesPolicy(QWebEngineProfile.AllowPersistentCookies)
+    return _profile
+
+
+class LocalOnlyInterceptor(QWebEngineUrlRequestInterceptor):
+    def interceptRequest(self, info):
+        if info.requestUrl().scheme() not in LOCAL_SCHEMES:
+            info.block(True)
+
+
+def local_profile():
+    """An off-the-record profile that never touches the network, for viewing notes and clips."""
+    global _local_profile
+    if _local_profile is None:
+        _limit_renderer_processes()
+        _local_profile = QWebEngineProfile(QApplication.instance())
+        _local_profile.interceptor = LocalOnlyInterceptor(_local_profile)
+        _local_profile.setUrlRequestInterceptor(_local_profile.interceptor)
+    return _local_profile
+
+
+def set_page_trusted(page, trusted, channel=None):
+    """Our own pages get scripts and the web channel; documents from disk get neither."""
+    page.setWebChannel(channel if trusted else None)
+    page.settings().setAttribute(QWebEngineSettings.JavascriptEnabled, trusted)
+
+
+class PageSuspender(QObject):
+    """Follows Chromium's recommended lifecycle state for a page, after a grace period.
+
+    Hidden pages are frozen (no timers or scripts run) and, when discard is
+    allowed, later discarded, which frees their renderer memory; a discarded
+    page reloads its URL when it is shown again. Pages built with setHtml lose
+    their content on discard, so those should only be frozen.
+    """
+
+    def __init__(self, page, discard=True, delay_ms=SUSPEND_DELAY_MS):
+        super().__init__(page)
+        self.page = page
+        self.discard = discard
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.apply)
+        page.recommendedStateChanged.connect(self.on_recommended_state)
+
+    def on_recommended_state(self, state):
+        if state == QWebEnginePage.Active:
+            # Coming back into view must never wait
+            self.timer.stop()
+            self.apply()
+        else:
+            self.timer.start()
+
+    def apply(self):
+        state = self.page.recommendedState()
+        if state == QWebEnginePage.Discarded and not self.discard:
+            state = QWebEnginePage.Frozen
+        if state != self.page.lifecycleState():
+            self.page.setLifecycleState(state)
+
+
+def create_web_view(parent=None, discard=True, profile=None):
+    view = QWebEngineView(parent)
+    page = QWebEnginePage(profile or shared_profile(), view)
+    view.setPage(page)
+    view.suspender = PageSuspender(page, discard)
+    return view
@@ -1,12 +1,25 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+import time
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QLabel
 from PyQt5.QtCore import Qt, QUrl, QSize
 from PyQt5.QtGui import QIcon
 
+from core.clip import Clip
+from ui.clipper import ClipWriter, PageClipper
+from ui.web_engine import create_web_view, shared_profile
+
+
+HOME_URL = "https://www.google.com"
+
 
 class WebViewTab(QWidget):
-    def __init__(self):
+    def __init__(self, database_folder="database"):
         super().__init__()
+        self.clip_writer = ClipWriter(database_folder, self)
+        self.clip_writer.written.connect(self.on_clips_written)
+        self.clip_writer.failed.connect(lambda message: self.clip_status.setText(f"Clip failed: {message}"))
+        self.page_clipper = PageClipper(self.clip_writer, shared_profile(), self)
+        self.page_clipper.failed.connect(lambda url, message: print(f"Could not clip {url}: {message}"))
         self.init_ui()
 
     def init_ui(self):
@@ -60,7 +73,8 @@ class WebViewTab(QWidget):
             ("back", "Back", self.web_view_back),
             ("forward", "Forward", self.web_view_forward),
             ("refresh", "Refresh", self.web_view_reload),
-            ("go", "Go", self.navigate_to_url)
+            ("go", "Go", self.navigate_to_url),
+            ("save", "Clip this page to your notes (or every URL typed in the address bar)", self.clip_page),
         ]
         for name, tip, handler in icons:
             btn = QPushButton()
@@ -79,12 +93,13 @@ class WebViewTab(QWidget):
         self.url_bar.returnPressed.connect(self.navigate_to_url)
 
         nav_layout.insertWidget(3, self.url_bar, 1)
+        self.clip_status = QLabel("")
+        nav_layout.addWidget(self.clip_status)
         nav_layout.setSpacing(8)
         nav_layout.setContentsMargins(12, 12, 12, 12)
 
         # Web View
-        self.web_view = QWebEngineView()
-        self.web_view.setUrl(QUrl("https://www.google.com"))
+        self.web_view = create_web_view()
         self.web_view.urlChanged.connect(self.update_url_bar)
         self.web_view.setStyleSheet("border: none; background-color: #f8fcff;")
 
@@ -95,6 +110,30 @@ class WebViewTab(QWidget):
         layout.setSpacing(0)
         self.setLayout(layout)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        # The home page is only requested once the tab is actually on screen
+        if self.web_view.url().isEmpty():
+            self.web_view.setUrl(QUrl(HOME_URL))
+
+    def clip_page(self):
+        urls = [url for url in self.url_bar.text().split() if url.startswith(("http://", "https://"))]
+        if len(urls) > 1:
+            # Bulk clips load one by one in the background, the current page stays put
+            self.page_clipper.clip_urls(urls)
+            self.clip_status.setText(f"Clipping {self.page_clipper.remaining()}…")
+            return
+        page = self.web_view.page()
+        url = page.url().toString()
+        if not url or url == "about:blank":
+            return
+        self.clip_status.setText("Clipping…")
+        page.toHtml(lambda markup: self.clip_writer.add(Clip(page.title(), url, markup, time.time())))
+
+    def on_clips_written(self, names):
+        remaining = self.page_clipper.remaining()
+        self.clip_status.setText(f"Clipping {remaining}…" if remaining else f"Clipped {names[-1]}")
+
     def web_view_back(self):
         if self.web_view.history().canGoBack():
             self.web_view.back()
@@ -0,0 +1,148 @@
+import atexit
+import threading
+
+from PyQt5.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, pyqtSignal
+
+# Workers queued or running, held here until they are done whatever happens to
+# their runner, so exit can wait for them before PyQt deletes the Python-owned
+# Qt objects they emit through
+_in_flight = set()
+_in_flight_changed = threading.Condition()
+
+
+def _release(worker):
+    with _in_flight_changed:
+        _in_flight.discard(worker)
+        _in_flight_changed.notify_all()
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    progress = pyqtSignal(object)
+    done = pyqtSignal()
+
+
+class Worker(QRunnable):
+    def __init__(self, fn, args=(), kwargs=None):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.cancelled = False
+        self.signals = WorkerSignals()
+        # Python owns the runnable, so cancel() can still reach it after it ran
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        # A running parse can't be interrupted, its result is just dropped
+        self.cancelled = True
+
+    def is_cancelled(self):
+        return self.cancelled
+
+    def report(self, value):
+        if not self.cancelled:
+            self.signals.progress.emit(value)
+
+    def run(self):
+        # Held by this frame, so the signals outlive the runner dropping the worker
+        signals = self.signals
+        try:
+            if self.cancelled:
+                return
+            try:
+                result = self.fn(*self.args, **self.kwargs)
+            except Exception as e:
+                if not self.cancelled:
+                    signals.failed.emit(e)
+                return
+            if not self.cancelled:
+                signals.finished.emit(result)
+        finally:
+            signals.done.emit()
+            _release(self)
+
+
+class TaskRunner(QObject):
+    """Runs callables on a thread pool and delivers results on the GUI thread.
+
+    Submitting on a channel cancels whatever was previously queued or running
+    on that channel, so only the latest request's result is ever delivered.
+    Functions submitted with on_progress get the worker as a `task` keyword and
+    can stream partial results with task.report() and poll task.is_cancelled().
+    """
+
+    def __init__(self, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self.latest = {}
+        self.active = set()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.shutdown)
+
+    def submit(self, fn, args=(), on_result=None, on_error=None, channel=None, on_progress=None):
+        if channel is not None:
+            self.cancel(channel)
+
+        worker = Worker(fn, args)
+        if on_progress is not None:
+            worker.kwargs["task"] = worker
+            worker.signals.progress.connect(lambda value: self._deliver(worker, on_progress, value))
+        if on_result is not None:
+            worker.signals.finished.connect(lambda result: self._deliver(worker, on_result, result))
+        if on_error is not None:
+            worker.signals.failed.connect(lambda error: self._deliver(worker, on_error, error))
+        worker.signals.done.connect(lambda: self._finish(worker, channel))
+
+        self.active.add(worker)
+        with _in_flight_changed:
+            _in_flight.add(worker)
+        if channel is not None:
+            self.latest[channel] = worker
+        self.pool.start(worker)
+        return worker
+
+    def _finish(self, worker, channel):
+        self.active.discard(worker)
+        if channel is not None and self.latest.get(channel) is worker:
+            del self.latest[channel]
+
+    def _deliver(self, worker, callback, value):
+        # The signal may have been queued before cancel() was called
+        if not worker.cancelled:
+            callback(value)
+
+    def cancel(self, channel):
+        worker = self.latest.pop(channel, None)
+        if worker is None:
+            return
+        worker.cancel()
+        if self.pool.tryTake(worker):
+            self.active.discard(worker)
+            _release(worker)
+
+    def cancel_all(self):
+        for channel in list(self.latest):
+            self.cancel(channel)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def shutdown(self, msecs=-1):
+        """Cancel the work on channels and wait for everything else (saves) to land."""
+        self.cancel_all()
+        return self.wait(msecs)
+
+
+@atexit.register
+def _drain_workers():
+    # Scripts such as the benchmarks exit without ever running the event loop, and a
+    # runner dropped with its tab no longer reaches its workers; they are all here
+    with _in_flight_changed:
+        for worker in _in_flight:
+            worker.cancel()
+        _in_flight_changed.wait_for(lambda: not _in_flight)